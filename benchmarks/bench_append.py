@@ -0,0 +1,90 @@
+"""Save latency of ``append_result`` as the results history grows.
+
+Run with ``python -m benchmarks.bench_append``. The results file is grown to
+each size in turn (1k … 1M rows) and a batch of single-row saves is timed at
+that size. With the append-only log the median should stay flat; pass
+``--legacy`` to time the old read/concat/rewrite path for comparison.
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+SIZES = [1_000, 10_000, 100_000, 1_000_000]
+
+
+def _row(i: int) -> dict:
+    scores = {f"q{k}": (i + k) % 5 for k in range(1, 11)}
+    return {
+        "timestamp": f"2024-01-01T00:00:{i % 60:02d}",
+        "date": "2024-01-01",
+        "user": f"pacjent{i % 500}",
+        "role": "user",
+        "objaw": "Obsesje agresywne:Lęk, że może skrzywdzić siebie",
+        **scores,
+        "suma": sum(scores.values()),
+    }
+
+
+def _grow(storage, current: int, target: int):
+    chunk = 50_000
+    while current < target:
+        n = min(chunk, target - current)
+        with open(storage.RESULTS_FILE, "a", encoding="utf-8", newline="") as f:
+            f.write(storage._format_rows(_row(current + i) for i in range(n)))
+        current += n
+    return current
+
+
+def _legacy_append(storage, row: dict):
+    import pandas as pd
+
+    df = pd.read_csv(storage.RESULTS_FILE, dtype=str, keep_default_na=False, encoding="utf-8")
+    df = pd.concat([df, pd.DataFrame([row])], ignore_index=True)
+    df.to_csv(storage.RESULTS_FILE, index=False, encoding="utf-8")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--saves", type=int, default=200, help="saves timed at each size")
+    parser.add_argument("--legacy", action="store_true", help="also time the old rewrite path")
+    parser.add_argument("--legacy-max", type=int, default=100_000, help="largest size for --legacy")
+    args = parser.parse_args(argv)
+
+    os.environ["YBOCS_DATA_DIR"] = tempfile.mkdtemp(prefix="ybocs-bench-")
+    from ybocs import storage
+
+    storage.init_results_file()
+    rows = 0
+    report = []
+    for size in SIZES:
+        rows = _grow(storage, rows, size)
+        modes = [("append_only", storage.append_result)]
+        if args.legacy and size <= args.legacy_max:
+            modes.append(("legacy_rewrite", lambda r: _legacy_append(storage, r)))
+        for mode, fn in modes:
+            saves = args.saves if mode == "append_only" else max(3, args.saves // 50)
+            timings = []
+            for i in range(saves):
+                t0 = time.perf_counter()
+                fn(_row(rows + i))
+                timings.append(time.perf_counter() - t0)
+            rows += saves
+            timings.sort()
+            report.append({
+                "mode": mode,
+                "rows": size,
+                "saves": saves,
+                "median_ms": round(statistics.median(timings) * 1000, 4),
+                "p99_ms": round(timings[min(len(timings) - 1, int(len(timings) * 0.99))] * 1000, 4),
+            })
+            print(json.dumps(report[-1]), file=sys.stderr)
+    json.dump(report, sys.stdout, indent=2)
+    print()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,162 @@
+"""Deterministic synthetic clinic: accounts, symptom lists and Y-BOCS results.
+
+Run with ``python -m benchmarks.clinic DIR [--patients N] [--rows M]``, then
+point the app at it::
+
+    YBOCS_USERS_FILE=DIR/users.yaml YBOCS_DATA_DIR=DIR/data streamlit run app.py
+
+``DIR/users.yaml`` holds the admin ``ADMIN`` and the patients
+``pacjent0001``…, all with the password ``PASSWORD``. Every patient gets
+2–6 checklist items drawn from ``SYMPTOMS`` and results for them in
+``DIR/data/wyniki.csv``: one course per symptom, assessed every week or
+two, with scores drifting down from a severe baseline the way treated
+patients do. The same arguments always produce the same files.
+"""
+import argparse
+import json
+from pathlib import Path
+
+import bcrypt
+import numpy as np
+import pandas as pd
+import yaml
+
+from ybocs.domain import CATALOG
+from ybocs.schema import QUESTION_COLUMNS, RESULTS_COLUMNS
+
+ADMIN = "admin"
+PASSWORD = "bench"
+# Fixed salt and low cost: same file every time, quick logins.
+_SALT = b"$2b$04$benchmarkclinicsalt0.u"
+END_DATE = pd.Timestamp("2024-12-31")
+
+
+def patient_login(i: int) -> str:
+    return f"pacjent{i + 1:04d}"
+
+
+def _symptom_keys() -> list:
+    return [item.key for group in CATALOG for item in group.items if not item.is_other]
+
+
+def _users(patients: int) -> dict:
+    hashed = bcrypt.hashpw(PASSWORD.encode(), _SALT).decode()
+    users = {
+        ADMIN: {
+            "email": f"{ADMIN}@example.com",
+            "name": "Administrator",
+            "password": hashed,
+            "role": "admin",
+            "force_password_reset": False,
+        }
+    }
+    for i in range(patients):
+        login = patient_login(i)
+        users[login] = {
+            "email": f"{login}@example.com",
+            "name": f"Pacjent {i + 1:04d}",
+            "password": hashed,
+            "role": "user",
+            "force_password_reset": False,
+        }
+    return {"credentials": {"usernames": users}}
+
+
+def _assign_symptoms(rng, patients: int) -> list:
+    keys = np.array(_symptom_keys(), dtype=object)
+    counts = rng.integers(2, 7, patients)
+    return [sorted(rng.choice(keys, size=k, replace=False)) for k in counts]
+
+
+def _results(rng, symptoms: list, rows: int) -> pd.DataFrame:
+    courses = [(p, objaw) for p, keys in enumerate(symptoms) for objaw in keys]
+    course = rng.integers(0, len(courses), rows)
+    # Position of every row within its course, in time order.
+    order = np.argsort(course, kind="stable")
+    sizes = np.bincount(course, minlength=len(courses))
+    starts = np.concatenate([[0], np.cumsum(sizes)[:-1]])
+    step = np.empty(rows, dtype=np.int64)
+    step[order] = np.arange(rows) - np.repeat(starts, sizes)
+
+    # Each course starts on its own day and is assessed every 7–14 days.
+    first_day = rng.integers(0, 3 * 365, len(courses))
+    interval = rng.integers(7, 15, len(courses))
+    day = first_day[course] + step * interval[course]
+    dates = END_DATE - pd.to_timedelta(day.max() - day, unit="D")
+    seconds = pd.to_timedelta(rng.integers(8 * 3600, 20 * 3600, rows), unit="s")
+
+    # Severe baseline, improving by up to ~60% over the course, plus noise.
+    baseline = rng.integers(16, 33, len(courses))[course]
+    progress = step / np.maximum(1, sizes[course] - 1)
+    target = baseline * (1 - 0.6 * progress * rng.uniform(0.3, 1.0, len(courses))[course])
+    items = np.clip(np.rint(target[:, None] / 10 + rng.normal(0, 0.6, (rows, 10))), 0, 4).astype(np.int64)
+
+    users = np.array([patient_login(p) for p, _ in courses], dtype=object)[course]
+    objawy = np.array([objaw for _, objaw in courses], dtype=object)[course]
+    df = pd.DataFrame({
+        "timestamp": (dates + seconds).strftime("%Y-%m-%dT%H:%M:%S"),
+        "date": dates.strftime("%Y-%m-%d"),
+        "user": users,
+        "role": "user",
+        "objaw": objawy,
+        **{q: items[:, i] for i, q in enumerate(QUESTION_COLUMNS)},
+        "suma": items.sum(axis=1),
+    })
+    # The log is written in the order results are saved.
+    return df.sort_values("timestamp", kind="stable")[RESULTS_COLUMNS]
+
+
+def generate(root, patients: int = 200, rows: int = 100_000, seed: int = 0, per_user_symptoms: bool = False) -> dict:
+    """Write ``root/users.yaml`` and ``root/data``; returns a description.
+
+    ``per_user_symptoms`` writes the symptom lists in the layout of older
+    versions (``data/users/<login>/objawy.json``), which the app migrates
+    on first use.
+    """
+    root = Path(root)
+    data = root / "data"
+    data.mkdir(parents=True, exist_ok=True)
+    rng = np.random.default_rng(seed)
+
+    users_file = root / "users.yaml"
+    users_file.write_text(yaml.safe_dump(_users(patients), allow_unicode=True, sort_keys=False), encoding="utf-8")
+
+    symptoms = _assign_symptoms(rng, patients)
+    by_login = {patient_login(i): keys for i, keys in enumerate(symptoms)}
+    if per_user_symptoms:
+        for login, keys in by_login.items():
+            path = data / "users" / login / "objawy.json"
+            path.parent.mkdir(parents=True, exist_ok=True)
+            path.write_text(json.dumps(keys, ensure_ascii=False), encoding="utf-8")
+    else:
+        payload = {"version": 1, "users": by_login}
+        (data / "objawy.json").write_text(json.dumps(payload, ensure_ascii=False, indent=1), encoding="utf-8")
+
+    results = _results(rng, symptoms, rows) if rows else pd.DataFrame(columns=RESULTS_COLUMNS)
+    results.to_csv(data / "wyniki.csv", index=False, lineterminator="\n", encoding="utf-8")
+    return {
+        "users_file": str(users_file),
+        "data_dir": str(data),
+        "patients": patients,
+        "rows": rows,
+        "seed": seed,
+        "admin": ADMIN,
+        "password": PASSWORD,
+        "sample_patient": patient_login(0) if patients else None,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("dir")
+    parser.add_argument("--patients", type=int, default=200)
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--per-user-symptoms", action="store_true", help="old per-patient symptom files")
+    args = parser.parse_args(argv)
+    info = generate(args.dir, args.patients, args.rows, args.seed, args.per_user_symptoms)
+    print(json.dumps(info, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,378 @@
+"""Concurrent sessions against ``app.py``: throughput, latency, memory, lost saves.
+
+Run with ``python -m benchmarks.load [--sessions 40] [--duration 60]``. A
+synthetic clinic is generated (``benchmarks.clinic``) and every session is
+an ``AppTest`` in its own process, all sharing the clinic's data directory
+the way replicas of the app do. ``AppTest`` drives a process-wide Streamlit
+runtime, so two sessions in one process would tear down each other's
+runtime; the price is that sessions do not share the module caches as they
+would in one Streamlit server.
+
+Patient sessions log in, pick a symptom and then alternate questionnaire
+submissions with plain reruns; admin sessions (``--admins``) pick patients,
+symptoms and dates in the results tab. Every session logs in again after
+``--actions-per-login`` actions, so logins stay in the mix.
+
+The report gives reruns and saves per second, p50/p99 latency per action and
+per tenth of the run (drift during a soak), and the RSS of each process over
+time. Every submission carries a unique answer pattern; at the end each one
+must be found in ``wyniki.csv``, otherwise it is reported as lost. Lost
+saves and app failures (a rerun that raised, an unconfirmed save) give exit
+status 1; problems of the harness itself (a widget not found, a timeout, a
+crashed session process) are reported as ``harness_errors`` and give 2.
+"""
+import argparse
+import json
+import os
+import random
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import zlib
+from collections import Counter
+from datetime import timedelta
+from pathlib import Path
+
+from . import clinic
+
+ROOT = Path(__file__).resolve().parent.parent
+QUESTIONS = 10
+
+
+def _rss() -> int:
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except OSError:
+        import resource
+
+        # Peak, not current, where /proc is missing; still shows growth.
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+def answers_for(n: int) -> list:
+    """Answers of a session's ``n``-th submission: ``n`` in base 5."""
+    return [(n // 5**k) % 5 for k in range(QUESTIONS)]
+
+
+class AppFailure(Exception):
+    """The app raised during a rerun."""
+
+
+class _Session:
+    def __init__(self, login: str, log, seed: int):
+        self.login = login
+        self.log = log
+        self.rng = random.Random(seed)
+        self.at = None
+
+    def step(self, action: str, run):
+        t0 = time.perf_counter()
+        run()
+        self.log.timing(action, t0, time.perf_counter() - t0)
+        if self.at.exception:
+            raise AppFailure(f"{action}: {self.at.exception}")
+
+    def log_in(self):
+        from streamlit.testing.v1 import AppTest
+
+        self.at = AppTest.from_file(str(ROOT / "app.py"), default_timeout=300)
+        self.step("login_page", self.at.run)
+        self.at.text_input[0].input(self.login)
+        self.at.text_input[1].input(clinic.PASSWORD)
+        self.step("login", self.at.button[0].click().run)
+
+
+class _Patient(_Session):
+    def __init__(self, login, log, seed, submit_share: float):
+        super().__init__(login, log, seed)
+        self.submit_share = submit_share
+        self.submissions = 0
+
+    def log_in(self):
+        from ybocs.domain import symptom_label
+        from ybocs.user_symptoms import load_user_symptoms
+
+        super().log_in()
+        picker = next(s for s in self.at.selectbox if s.label == "Objaw")
+        label = picker.options[1]
+        self.step("select_symptom", picker.select(label).run)
+        # The picker shows labels; the log stores the key.
+        self.objaw = {symptom_label(k): k for k in load_user_symptoms(self.login)}[label]
+
+    def act(self):
+        if self.rng.random() >= self.submit_share:
+            self.step("view", self.at.run)
+            return
+        radios = [r for r in self.at.radio if r.label.split(".", 1)[0].isdigit()]
+        for radio, value in zip(radios, answers_for(self.submissions)):
+            radio.set_value(value)
+        button = next(b for b in self.at.button if b.label == "Zapisz wynik")
+        self.step("submit", button.click().run)
+        if any(s.value == "Wynik zapisany." for s in self.at.success):
+            self.log.submitted(self.login, self.objaw, answers_for(self.submissions))
+        else:
+            self.log.failure(f"{self.login}: submission {self.submissions} not confirmed")
+        self.submissions += 1
+
+
+class _Admin(_Session):
+    def act(self):
+        picker = [s for s in self.at.selectbox if s.label == "Pacjent"][1]
+        choice = self.rng.random()
+        current = picker.value
+        if current not in picker.options[1:] or choice < 0.4:
+            self.step("admin_patient", picker.select(self.rng.choice(picker.options[1:])).run)
+            return
+        if choice < 0.7:
+            symptom = [s for s in self.at.selectbox if s.label == "Objaw"][-1]
+            self.step("admin_symptom", symptom.select(self.rng.choice(symptom.options)).run)
+            return
+        start = next(d for d in self.at.date_input if d.label == "Od")
+        self.step("admin_dates", start.set_value(start.value + timedelta(days=self.rng.randint(-60, 60))).run)
+
+
+class _Log:
+    """What one session process collected; written as JSON at the end."""
+
+    def __init__(self, t_start: float):
+        self.t_start = t_start
+        self.lock = threading.Lock()
+        self.timings = []
+        self.saves = []
+        self.failures = []
+        self.errors = []
+        self.rss = []
+
+    def timing(self, action: str, t0: float, seconds: float):
+        with self.lock:
+            self.timings.append((action, round(t0 - self.t_start, 3), round(seconds * 1000, 3)))
+
+    def submitted(self, user: str, objaw: str, answers: list):
+        with self.lock:
+            self.saves.append((user, objaw, answers))
+
+    def failure(self, message: str):
+        with self.lock:
+            self.failures.append(message)
+
+    def error(self, message: str):
+        with self.lock:
+            self.errors.append(message)
+
+
+def _session_loop(session: _Session, deadline: float, actions_per_login: int, think: float):
+    try:
+        while time.monotonic() < deadline:
+            session.log_in()
+            for _ in range(actions_per_login):
+                if time.monotonic() >= deadline:
+                    break
+                session.act()
+                if think:
+                    time.sleep(session.rng.uniform(0, 2 * think))
+    except AppFailure as exc:
+        session.log.failure(f"{session.login}: {exc}")
+    except Exception as exc:
+        session.log.error(f"{session.login}: {exc!r}")
+
+
+def _child(args) -> dict:
+    spec = json.loads(Path(args.child).read_text(encoding="utf-8"))
+    t_start = time.perf_counter()
+    log = _Log(t_start)
+    deadline = time.monotonic() + spec["duration"]
+    done = threading.Event()
+
+    def sample():
+        while not done.is_set():
+            log.rss.append((round(time.perf_counter() - t_start, 1), _rss()))
+            done.wait(spec["sample_every"])
+
+    sampler = threading.Thread(target=sample, daemon=True)
+    sampler.start()
+    role, login = spec["session"]
+    seed = spec["seed"] * 1_000_003 + zlib.crc32(login.encode()) + spec["index"]
+    if role == "admin":
+        session = _Admin(login, log, seed)
+    else:
+        session = _Patient(login, log, seed, spec["submit_share"])
+    _session_loop(session, deadline, spec["actions_per_login"], spec["think"])
+    done.set()
+    sampler.join()
+    log.rss.append((round(time.perf_counter() - t_start, 1), _rss()))
+    return {
+        "t0": time.time() - (time.perf_counter() - t_start),
+        "wall_s": time.perf_counter() - t_start,
+        "timings": log.timings,
+        "saves": log.saves,
+        "failures": log.failures,
+        "errors": log.errors,
+        "rss": log.rss,
+    }
+
+
+def _percentiles(ms: list) -> dict:
+    ms = sorted(ms)
+    if not ms:
+        return {"n": 0}
+    return {
+        "n": len(ms),
+        "p50_ms": round(statistics.median(ms), 2),
+        "p99_ms": round(ms[min(len(ms) - 1, int(len(ms) * 0.99))], 2),
+        "max_ms": round(ms[-1], 2),
+    }
+
+
+def _saved_rows(results_file) -> Counter:
+    import pandas as pd
+
+    df = pd.read_csv(results_file, dtype=str, keep_default_na=False)
+    columns = ["user", "objaw"] + [f"q{k}" for k in range(1, QUESTIONS + 1)]
+    return Counter(map(tuple, df[columns].to_numpy().tolist()))
+
+
+def _signature(user: str, objaw: str, answers: list) -> tuple:
+    return (user, objaw, *map(str, answers))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sessions", type=int, default=40, help="simultaneous sessions in total")
+    parser.add_argument("--admins", type=int, help="admin sessions among them (default: 1 in 10)")
+    parser.add_argument("--duration", type=float, default=60, help="seconds")
+    parser.add_argument("--ramp", type=float, default=5, help="seconds over which session processes start")
+    parser.add_argument("--think", type=float, default=0.5, help="mean pause between actions, seconds")
+    parser.add_argument("--submit-share", type=float, default=0.5, help="patient actions that are saves")
+    parser.add_argument("--actions-per-login", type=int, default=20)
+    parser.add_argument("--sample-every", type=float, default=1.0, help="RSS sampling interval, seconds")
+    parser.add_argument("--patients", type=int, help="patients in the clinic (default: max(sessions, 200))")
+    parser.add_argument("--rows", type=int, default=50_000, help="results in the clinic")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--out", help="write the report here instead of stdout")
+    parser.add_argument("--child", help=argparse.SUPPRESS)
+    parser.add_argument("--child-out", help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.child:
+        Path(args.child_out).write_text(json.dumps(_child(args)), encoding="utf-8")
+        return 0
+
+    admins = args.admins if args.admins is not None else max(1, args.sessions // 10)
+    patients = max(args.patients or 200, args.sessions)
+    work = Path(tempfile.mkdtemp(prefix="ybocs-load-"))
+    info = clinic.generate(work, patients, args.rows, args.seed)
+    results_file = Path(info["data_dir"]) / "wyniki.csv"
+    before = _saved_rows(results_file)
+
+    sessions = [("admin", clinic.ADMIN)] * admins
+    sessions += [("user", clinic.patient_login(i)) for i in range(args.sessions - admins)]
+    env = dict(os.environ, YBOCS_DATA_DIR=info["data_dir"], YBOCS_USERS_FILE=info["users_file"])
+    children = []
+    try:
+        for i, session in enumerate(sessions):
+            spec = work / f"session{i}.json"
+            spec.write_text(json.dumps({
+                "session": session,
+                "index": i,
+                "duration": args.duration,
+                "think": args.think,
+                "submit_share": args.submit_share,
+                "actions_per_login": args.actions_per_login,
+                "sample_every": args.sample_every,
+                "seed": args.seed,
+            }), encoding="utf-8")
+            out = work / f"session{i}.out.json"
+            # stderr goes to a file: a pipe nobody reads until the end could fill up.
+            log = open(work / f"session{i}.err", "w+", encoding="utf-8")
+            proc = subprocess.Popen(
+                [sys.executable, "-m", "benchmarks.load", "--child", str(spec), "--child-out", str(out)],
+                cwd=ROOT, env=env, stdout=subprocess.DEVNULL, stderr=log, text=True,
+            )
+            children.append((session, proc, out, log))
+            # Spread the first logins over the ramp-up.
+            time.sleep(args.ramp / max(1, len(sessions)))
+        reports, crashed = [], []
+        for (_, login), proc, out, log in children:
+            proc.wait()
+            if proc.returncode != 0 or not out.exists():
+                log.seek(0)
+                crashed.append(f"{login}: session process failed ({proc.returncode}): {log.read()[-2000:]}")
+            else:
+                reports.append(json.loads(out.read_text(encoding="utf-8")))
+        after = _saved_rows(results_file)
+    finally:
+        for _, proc, _, log in children:
+            proc.kill()
+            log.close()
+        shutil.rmtree(work, ignore_errors=True)
+    if not reports:
+        raise SystemExit("every session process failed:\n" + "\n".join(crashed))
+
+    # Session processes start apart; put every timing on the first one's clock.
+    t0 = min(r["t0"] for r in reports)
+    timings = [(a, round(r["t0"] - t0 + t, 3), ms) for r in reports for a, t, ms in r["timings"]]
+    wall = max(r["t0"] - t0 + r["wall_s"] for r in reports)
+    saves = [_signature(*s) for r in reports for s in r["saves"]]
+    expected = Counter(saves)
+    lost = [list(sig) for sig, n in expected.items() if after[sig] - before[sig] < n]
+    failures = [e for r in reports for e in r["failures"]]
+    harness_errors = crashed + [e for r in reports for e in r["errors"]]
+
+    by_action = {}
+    for action, _, ms in timings:
+        by_action.setdefault(action, []).append(ms)
+    tenths = [[] for _ in range(10)]
+    for _, t, ms in timings:
+        tenths[min(9, int(10 * t / wall))].append(ms)
+    report = {
+        "meta": {
+            "sessions": args.sessions,
+            "admins": admins,
+            "duration_s": args.duration,
+            "think_s": args.think,
+            "patients": patients,
+            "rows": args.rows,
+            "seed": args.seed,
+            "cpus": os.cpu_count(),
+        },
+        "wall_s": round(wall, 1),
+        "reruns": len(timings),
+        "reruns_per_s": round(len(timings) / wall, 2),
+        "saves": len(saves),
+        "saves_per_s": round(len(saves) / wall, 2),
+        "latency": _percentiles([ms for _, _, ms in timings]),
+        "latency_by_action": {a: _percentiles(ms) for a, ms in sorted(by_action.items())},
+        "latency_over_time": [_percentiles(ms) for ms in tenths],
+        "rss_mb": [
+            {
+                "start": round(r["rss"][0][1] / 2**20, 1),
+                "end": round(r["rss"][-1][1] / 2**20, 1),
+                "max": round(max(b for _, b in r["rss"]) / 2**20, 1),
+                "samples": [[t, round(b / 2**20, 1)] for t, b in r["rss"]],
+            }
+            for r in reports
+        ],
+        "lost_saves": lost,
+        "failures": failures,
+        "harness_errors": harness_errors,
+    }
+    report["ok"] = not lost and not failures and not harness_errors
+
+    text = json.dumps(report, indent=2, ensure_ascii=False)
+    if args.out:
+        Path(args.out).write_text(text + "\n", encoding="utf-8")
+        print(f"Report written to {args.out}", file=sys.stderr)
+    else:
+        print(text)
+    if lost or failures:
+        return 1
+    return 2 if harness_errors else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
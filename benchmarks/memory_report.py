@@ -0,0 +1,69 @@
+"""In-memory footprint of the results: old object/float64 layout vs the schema.
+
+Run with ``python -m benchmarks.memory_report [--rows N]``. A synthetic
+dataset (default 1M rows) is built once in the old layout — strings as
+Python objects, scores as float64 after ``pd.to_numeric`` — and once through
+``ybocs.schema.coerce_results``; deep memory usage of both is reported as
+JSON.
+"""
+import argparse
+import json
+
+import numpy as np
+import pandas as pd
+
+from ybocs.schema import QUESTION_COLUMNS, SCORE_COLUMNS, coerce_results
+
+
+def synthetic_raw(rows: int, patients: int = 2_000, symptoms: int = 60, seed: int = 0) -> pd.DataFrame:
+    """Raw string results, as read from ``wyniki.csv``."""
+    rng = np.random.default_rng(seed)
+    days = pd.Timestamp("2020-01-01") + pd.to_timedelta(rng.integers(0, 5 * 365, rows), unit="D")
+    seconds = pd.to_timedelta(rng.integers(0, 86_400, rows), unit="s")
+    items = rng.integers(0, 5, size=(rows, len(QUESTION_COLUMNS)))
+    raw = {
+        "timestamp": (days + seconds).strftime("%Y-%m-%dT%H:%M:%S"),
+        "date": days.strftime("%Y-%m-%d"),
+        "user": np.char.add("pacjent", rng.integers(0, patients, rows).astype(str)),
+        "role": np.full(rows, "user"),
+        "objaw": np.char.add("Grupa:objaw ", rng.integers(0, symptoms, rows).astype(str)),
+    }
+    raw.update({q: items[:, i].astype(str) for i, q in enumerate(QUESTION_COLUMNS)})
+    raw["suma"] = items.sum(axis=1).astype(str)
+    return pd.DataFrame({c: pd.Series(v, dtype=object) for c, v in raw.items()})
+
+
+def legacy_layout(raw: pd.DataFrame) -> pd.DataFrame:
+    """What the pre-schema ``load_results`` produced."""
+    df = raw.copy()
+    for q in SCORE_COLUMNS:
+        df[q] = pd.to_numeric(df[q], errors="coerce").astype("float64")
+    return df
+
+
+def _mb(df: pd.DataFrame) -> float:
+    return round(df.memory_usage(deep=True).sum() / 2**20, 1)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    args = parser.parse_args(argv)
+
+    raw = synthetic_raw(args.rows)
+    legacy = legacy_layout(raw)
+    typed = coerce_results(raw)
+    assert len(typed) == len(raw)
+    report = {
+        "rows": args.rows,
+        "legacy_mb": _mb(legacy),
+        "schema_mb": _mb(typed),
+        "per_column_legacy_mb": {c: round(v / 2**20, 1) for c, v in legacy.memory_usage(deep=True, index=False).items()},
+        "per_column_schema_mb": {c: round(v / 2**20, 1) for c, v in typed.memory_usage(deep=True, index=False).items()},
+    }
+    report["ratio"] = round(report["legacy_mb"] / report["schema_mb"], 1)
+    print(json.dumps(report, indent=2, ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+"""Cold-start and login-page rerun time of ``app.py``, checked against a budget.
+
+Run with ``python -m benchmarks.startup_budget``. Each sample starts a fresh
+interpreter that renders the login page once through Streamlit's
+``AppTest`` (the cold start: importing the app's modules and the first
+script run) and then reruns it ``--reruns`` times, the way every widget
+interaction on the login page does. The login page must not import
+matplotlib or the results store. Results are printed as JSON; the exit
+status is 1 when a median exceeds its budget or a heavy module was imported.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+# Modules the login page must not load. (pandas itself is loaded anyway:
+# Streamlit imports pyarrow for the cookie component of the login widget.)
+HEAVY_MODULES = (
+    "matplotlib", "ybocs.charts", "ybocs.schema", "ybocs.storage", "ybocs.query", "ybocs.archive",
+    "ybocs.rollups",
+)
+# The first run includes streamlit-authenticator's 0.7 s wait for cookies.
+COLD_BUDGET = 2.5
+RERUN_BUDGET = 0.05
+
+
+def _sample(reruns: int) -> dict:
+    t0 = time.perf_counter()
+    from streamlit.testing.v1 import AppTest
+
+    imported = time.perf_counter() - t0
+    at = AppTest.from_file(str(ROOT / "app.py"), default_timeout=60)
+    t0 = time.perf_counter()
+    at.run()
+    cold = time.perf_counter() - t0
+    if at.exception:
+        raise SystemExit(f"app.py failed: {at.exception}")
+    heavy = sorted(m for m in HEAVY_MODULES if m in sys.modules)
+
+    times = []
+    for _ in range(reruns):
+        t0 = time.perf_counter()
+        at.run()
+        times.append(time.perf_counter() - t0)
+    return {
+        "streamlit_import_s": imported,
+        "cold_s": cold,
+        "rerun_s": statistics.median(times) if times else None,
+        "heavy_modules": heavy,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--samples", type=int, default=3, help="fresh interpreters to start")
+    parser.add_argument("--reruns", type=int, default=20, help="login page reruns per sample")
+    parser.add_argument("--cold-budget", type=float, default=COLD_BUDGET, help="seconds")
+    parser.add_argument("--rerun-budget", type=float, default=RERUN_BUDGET, help="seconds")
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.child:
+        print(json.dumps(_sample(args.reruns)))
+        return 0
+
+    samples = []
+    with tempfile.TemporaryDirectory() as tmp:
+        env = dict(
+            os.environ,
+            YBOCS_DATA_DIR=str(Path(tmp) / "data"),
+            YBOCS_USERS_FILE=str(ROOT / "users.yaml"),
+            YBOCS_HASH_WORKERS="0",
+        )
+        for _ in range(args.samples):
+            out = subprocess.run(
+                [sys.executable, "-m", "benchmarks.startup_budget", "--child", "--reruns", str(args.reruns)],
+                cwd=ROOT, env=env, capture_output=True, text=True, check=True,
+            )
+            samples.append(json.loads(out.stdout.strip().splitlines()[-1]))
+
+    cold = statistics.median(s["cold_s"] for s in samples)
+    rerun = statistics.median(s["rerun_s"] for s in samples)
+    heavy = sorted({m for s in samples for m in s["heavy_modules"]})
+    report = {
+        "samples": samples,
+        "cold_s": round(cold, 4),
+        "rerun_s": round(rerun, 4),
+        "budget": {"cold_s": args.cold_budget, "rerun_s": args.rerun_budget},
+        "heavy_modules": heavy,
+        "ok": cold <= args.cold_budget and rerun <= args.rerun_budget and not heavy,
+    }
+    print(json.dumps(report, indent=2))
+    return 0 if report["ok"] else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,264 @@
+"""Timings of the app's hot paths on a synthetic clinic, as JSON.
+
+Run with ``python -m benchmarks.suite [--patients N] [--rows M]``. A clinic
+is generated into a scratch directory (see ``benchmarks.clinic``; the same
+arguments give the same data) and the app is pointed at it. Timed:
+
+* ``load_results``: a cold parse of the whole log, a cached read, the
+  first read of a patient's rows, and a read right after a save (the
+  tail path);
+* ``append_result``: single saves;
+* ``cohort.figures``: the admin dashboard's figures computed afresh from
+  the current rollups, and right after a save (the rollups take in the
+  new row first);
+* the results tab: index lookup, date filter and the sort of the paged
+  table, on a rerun (index cached) and for a patient not shown before;
+* ``render_symptom_editor`` and whole script reruns of ``app.py``, logged
+  in as a patient and as the admin, through Streamlit's ``AppTest``.
+
+The report (medians, p90 and extremes in ms, plus the commit and versions)
+goes to stdout or ``--out``. ``--baseline`` compares the medians with an
+earlier report and exits with status 1 when one is slower by more than
+``--tolerance``.
+"""
+import argparse
+import json
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import date
+from pathlib import Path
+
+from . import clinic
+
+ROOT = Path(__file__).resolve().parent.parent
+# Differences below this are noise, whatever the ratio.
+MIN_REGRESSION_MS = 0.05
+
+
+def _summary(timings: list) -> dict:
+    ms = sorted(t * 1000 for t in timings)
+    return {
+        "n": len(ms),
+        "median_ms": round(statistics.median(ms), 4),
+        "p90_ms": round(ms[min(len(ms) - 1, int(len(ms) * 0.9))], 4),
+        "min_ms": round(ms[0], 4),
+        "max_ms": round(ms[-1], 4),
+    }
+
+
+def _time(fn, repeat: int, setup=None) -> list:
+    timings = []
+    for i in range(repeat):
+        if setup is not None:
+            setup(i)
+        t0 = time.perf_counter()
+        fn(i)
+        timings.append(time.perf_counter() - t0)
+    return timings
+
+
+def _row(user: str, objaw: str, i: int) -> dict:
+    scores = {f"q{k}": (i + k) % 5 for k in range(1, 11)}
+    return {
+        "timestamp": f"2025-01-01T{i // 3600 % 24:02d}:{i // 60 % 60:02d}:{i % 60:02d}",
+        "date": "2025-01-01",
+        "user": user,
+        "role": "user",
+        "objaw": objaw,
+        **scores,
+        "suma": sum(scores.values()),
+    }
+
+
+def _storage_benchmarks(args, patients: list) -> dict:
+    from ybocs import query, storage
+    from ybocs.ui.paging import _order
+    from ybocs.user_symptoms import load_user_symptoms
+
+    out = {}
+    out["load_results.cold"] = _time(
+        lambda i: storage.load_results(), max(3, args.repeat // 5),
+        setup=lambda i: storage.invalidate_results_cache(),
+    )
+    out["load_results.warm"] = _time(lambda i: storage.load_results(), args.repeat)
+    out["load_results.patient"] = _time(lambda i: storage.load_results(patients[i % len(patients)]), args.repeat)
+
+    def results_tab(user):
+        q = query.results_query(user)
+        view = q.rows(user, start=q.min_date, end=q.max_date)
+        for column in ("date", "suma"):
+            _order(view[column], descending=True)
+
+    # A rerun of the same patient's tab, then the first look at each patient.
+    results_tab(patients[0])
+    out["results_tab.pipeline"] = _time(lambda i: results_tab(patients[0]), args.repeat)
+    out["results_tab.pipeline_cold"] = _time(
+        lambda i: results_tab(patients[i % len(patients)]), args.repeat, setup=lambda i: query._queries.clear()
+    )
+
+    user = patients[0]
+    objaw = load_user_symptoms(user)[0]
+    out["append_result"] = _time(lambda i: storage.append_result(_row(user, objaw, i)), args.repeat)
+    out["load_results.after_append"] = _time(
+        lambda i: storage.load_results(), args.repeat,
+        setup=lambda i: storage.append_result(_row(user, objaw, args.repeat + i)),
+    )
+    return out
+
+
+def _cohort_benchmarks(args, patients: list) -> dict:
+    from ybocs import cohort, storage
+    from ybocs.user_symptoms import load_user_symptoms
+
+    def forget(i):
+        with cohort._lock:
+            cohort._cache.update(state=None, values={})
+
+    user = patients[-1]
+    objaw = load_user_symptoms(user)[0]
+    cohort.figures()  # the rollups catch up with the log
+    out = {"cohort.figures.cold": _time(lambda i: cohort.figures(), args.repeat, setup=forget)}
+    out["cohort.figures.after_save"] = _time(
+        lambda i: cohort.figures(), args.repeat, setup=lambda i: storage.append_result(_row(user, objaw, i)),
+    )
+    return out
+
+
+def _symptom_editor(login: str):
+    from ybocs.ui.admin import render_symptom_editor
+
+    render_symptom_editor(login)
+
+
+def _login(user: str):
+    from streamlit.testing.v1 import AppTest
+
+    at = AppTest.from_file(str(ROOT / "app.py"), default_timeout=120)
+    at.run()
+    at.text_input[0].input(user)
+    at.text_input[1].input(clinic.PASSWORD)
+    at.button[0].click().run()
+    if at.exception:
+        raise SystemExit(f"app.py failed for {user}: {at.exception}")
+    return at
+
+
+def _rerun_benchmarks(args, patients: list) -> dict:
+    from streamlit.testing.v1 import AppTest
+
+    out = {}
+    at = AppTest.from_function(_symptom_editor, args=(patients[0],), default_timeout=120)
+    at.run()
+    out["symptom_editor.rerun"] = _time(lambda i: at.run(), args.reruns)
+
+    at = _login(patients[0])
+    out["app.patient.rerun"] = _time(lambda i: at.run(), args.reruns)
+
+    at = _login(clinic.ADMIN)
+    out["app.admin.rerun"] = _time(lambda i: at.run(), args.reruns)
+    picker = [s for s in at.selectbox if s.label == "Pacjent"][1]
+    picker.select([o for o in picker.options if o.endswith(f"({patients[0]})")][0]).run()
+    out["app.admin.patient_results.rerun"] = _time(lambda i: at.run(), args.reruns)
+    return out
+
+
+def _compare(results: dict, baseline: dict, tolerance: float) -> dict:
+    out = {}
+    for name, now in results.items():
+        before = baseline.get("results", {}).get(name)
+        if before is None:
+            continue
+        ratio = now["median_ms"] / before["median_ms"] if before["median_ms"] else None
+        out[name] = {
+            "baseline_ms": before["median_ms"],
+            "median_ms": now["median_ms"],
+            "ratio": None if ratio is None else round(ratio, 3),
+            "regression": ratio is not None and ratio > 1 + tolerance
+            and now["median_ms"] - before["median_ms"] > MIN_REGRESSION_MS,
+        }
+    return out
+
+
+def _meta(args) -> dict:
+    import pandas as pd
+    import streamlit
+
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        "commit": commit,
+        "date": date.today().isoformat(),
+        "python": platform.python_version(),
+        "pandas": pd.__version__,
+        "streamlit": streamlit.__version__,
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "patients": args.patients,
+        "rows": args.rows,
+        "seed": args.seed,
+        "repeat": args.repeat,
+        "reruns": args.reruns,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--patients", type=int, default=200)
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--repeat", type=int, default=30, help="calls timed per storage benchmark")
+    parser.add_argument("--reruns", type=int, default=10, help="script reruns timed per view")
+    parser.add_argument("--skip-reruns", action="store_true", help="storage benchmarks only")
+    parser.add_argument("--out", help="write the report here instead of stdout")
+    parser.add_argument("--baseline", help="earlier report to compare with")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed slowdown of a median")
+    args = parser.parse_args(argv)
+
+    work = Path(tempfile.mkdtemp(prefix="ybocs-suite-"))
+    info = clinic.generate(work, args.patients, args.rows, args.seed)
+    # Read by ybocs.config on import, so set before any app module loads.
+    os.environ.update(
+        YBOCS_DATA_DIR=info["data_dir"],
+        YBOCS_USERS_FILE=info["users_file"],
+        YBOCS_HASH_WORKERS="0",
+    )
+    patients = [clinic.patient_login(i) for i in range(args.patients)]
+
+    try:
+        timings = _storage_benchmarks(args, patients)
+        timings.update(_cohort_benchmarks(args, patients))
+        if not args.skip_reruns:
+            timings.update(_rerun_benchmarks(args, patients))
+    finally:
+        shutil.rmtree(work, ignore_errors=True)
+    report = {"meta": _meta(args), "results": {name: _summary(t) for name, t in timings.items()}}
+
+    status = 0
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            report["comparison"] = _compare(report["results"], json.load(f), args.tolerance)
+        slower = [name for name, c in report["comparison"].items() if c["regression"]]
+        report["regressions"] = slower
+        status = 1 if slower else 0
+
+    text = json.dumps(report, indent=2)
+    if args.out:
+        Path(args.out).write_text(text + "\n", encoding="utf-8")
+        print(f"Report written to {args.out}", file=sys.stderr)
+    else:
+        print(text)
+    return status
+
+
+if __name__ == "__main__":
+    sys.exit(main())
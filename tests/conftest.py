@@ -0,0 +1,43 @@
+import os
+import subprocess
+import sys
+import textwrap
+from pathlib import Path
+
+import pytest
+
+ROOT = Path(__file__).resolve().parent.parent
+
+
+@pytest.fixture
+def run(tmp_path):
+    """Run a script in a fresh interpreter whose store lives in ``tmp_path``.
+
+    ``ybocs.config`` reads ``YBOCS_DATA_DIR`` and ``YBOCS_USERS_FILE`` on
+    import, so tests of the store cannot share the pytest process. The
+    script is the concatenation of ``parts``, each dedented on its own.
+    Returns what the script printed.
+    """
+
+    def run(*parts: str, data_dir=None, users_file=None) -> str:
+        env = dict(
+            os.environ,
+            YBOCS_DATA_DIR=str(data_dir or tmp_path / "data"),
+            YBOCS_USERS_FILE=str(users_file or tmp_path / "users.yaml"),
+            YBOCS_HASH_WORKERS="0",
+        )
+        done = subprocess.run(
+            [sys.executable, "-c", "\n".join(textwrap.dedent(p) for p in parts)], cwd=ROOT, env=env, capture_output=True, text=True
+        )
+        assert done.returncode == 0, done.stderr
+        return done.stdout
+
+    return run
+
+
+@pytest.fixture
+def clinic(tmp_path):
+    """A small synthetic clinic (``benchmarks.clinic``) in ``tmp_path``."""
+    from benchmarks import clinic
+
+    return clinic.generate(tmp_path, patients=3, rows=200)
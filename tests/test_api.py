@@ -0,0 +1,79 @@
+"""The ingestion API over HTTP, served from a subprocess on a scratch store."""
+import http.client
+import json
+import os
+import subprocess
+import sys
+import threading
+from pathlib import Path
+
+import pytest
+
+ROOT = Path(__file__).resolve().parent.parent
+
+
+@pytest.fixture
+def api(tmp_path):
+    (tmp_path / "users.yaml").write_text(
+        "credentials:\n  usernames:\n    jan:\n      name: Jan\n      password: x\n      role: user\n",
+        encoding="utf-8",
+    )
+    env = dict(os.environ, YBOCS_DATA_DIR=str(tmp_path / "data"), YBOCS_USERS_FILE=str(tmp_path / "users.yaml"))
+    env.pop("YBOCS_API_TOKEN", None)
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "ybocs.api", "--port", "0"], cwd=ROOT, env=env, stdout=subprocess.PIPE, text=True
+    )
+    port = int(proc.stdout.readline().rsplit(":", 1)[1])
+    yield port
+    proc.terminate()
+    proc.wait()
+
+
+def post(port: int, path: str, body: bytes, headers: dict = None):
+    conn = http.client.HTTPConnection("127.0.0.1", port, timeout=30)
+    conn.putrequest("POST", path)
+    for k, v in (headers or {"Content-Length": str(len(body))}).items():
+        conn.putheader(k, v)
+    conn.endheaders(body)
+    resp = conn.getresponse()
+    return resp.status, json.loads(resp.read())
+
+
+def result(**fields) -> dict:
+    return {"user": "jan", "objaw": "Obsesje agresywne:Lęk, że może skrzywdzić siebie", "answers": [1] * 10, **fields}
+
+
+def test_offset_timestamp_is_rejected(api):
+    body = json.dumps({"results": [result(timestamp="2024-01-01T10:00:00+02:00")]}).encode()
+    status, reply = post(api, "/results", body)
+    assert status == 422
+    assert "UTC offsets" in reply["errors"][0]["reason"]
+    status, reply = post(api, "/results", json.dumps({"results": [result(timestamp="2024-01-01T10:00:00")]}).encode())
+    assert (status, reply.get("stored")) == (200, 1), reply
+
+
+def test_bad_content_length_is_a_client_error(api):
+    status, reply = post(api, "/results", b"{}", {"Content-Length": "abc"})
+    assert status == 400
+    assert "Content-Length" in reply["error"]
+
+
+def test_same_batch_sent_twice_at_once_is_stored_once(api):
+    batch = json.dumps({"results": [
+        result(timestamp=f"2024-02-{1 + i // 24:02d}T{i % 24:02d}:00:00", answers=[i % 5] * 10) for i in range(240)
+    ]}).encode()
+    barrier = threading.Barrier(2)
+    replies = []
+
+    def send():
+        barrier.wait()
+        replies.append(post(api, "/results", batch))
+
+    threads = [threading.Thread(target=send) for _ in range(2)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert [status for status, _ in replies] == [200, 200]
+    assert sorted(reply["stored"] for _, reply in replies) == [0, 240]
+    assert sum(reply["duplicates"] for _, reply in replies) == 240
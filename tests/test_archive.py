@@ -0,0 +1,13 @@
+from ybocs import archive
+
+
+def test_partition_paths_stay_in_their_own_directory():
+    names = set()
+    for user in ["jan", "..", ".", "../x", "a/b", "cold", "manifest.json", "%2E"]:
+        path = archive.partition_path(user, "2024-01")
+        assert path.parent.parent == archive.ARCHIVE_DIR
+        assert archive.cold_path(user).parent == archive.COLD_DIR
+        names.add(path.parent.name)
+    assert len(names) == 8
+    assert not names & {".", "..", archive.COLD_DIR.name, archive.MANIFEST_FILE.name}
+    assert archive.partition_path("jan.kowalski", "2024-01").parent.name == "jan.kowalski"
@@ -0,0 +1,10 @@
+def test_cookie_is_signed_with_the_configured_key(run, clinic):
+    out = run("""
+        import os
+        os.environ["YBOCS_COOKIE_KEY"] = "test-signing-key"
+        from ybocs.ui import auth
+
+        authenticator = auth._authenticator()
+        print("key:", authenticator.cookie_controller.cookie_model.cookie_key)
+    """)
+    assert "key: test-signing-key" in out
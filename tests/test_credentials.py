@@ -0,0 +1,46 @@
+import yaml
+
+BASE = {"credentials": {"usernames": {"Admin": {"name": "Admin", "password": "x", "role": "admin"}}}}
+
+
+def test_journal_is_folded_into_users_yaml_after_500_entries(run, tmp_path):
+    users = tmp_path / "users.yaml"
+    users.write_text(yaml.safe_dump(BASE))
+    run("""
+        from ybocs import config, credentials
+
+        base = config.CREDENTIALS_FILE.read_bytes()
+        for i in range(499):
+            credentials.add_user(f"p{i:03d}", {"name": f"P {i}", "password": "x", "role": "user"})
+        assert config.CREDENTIALS_FILE.read_bytes() == base
+        assert credentials.JOURNAL_FILE.read_text().count("\\n") == 499
+        credentials.update_user("p000", name="Renamed")
+        assert credentials.JOURNAL_FILE.read_bytes() == b""
+        assert credentials.get_user("p000")["name"] == "Renamed"
+        assert len(credentials.load_credentials()["credentials"]["usernames"]) == 500
+    """)
+    stored = yaml.safe_load(users.read_text())["credentials"]["usernames"]
+    assert len(stored) == 500
+    assert stored["p000"] == {"name": "Renamed", "password": "x", "role": "user"}
+    assert stored["Admin"]["role"] == "admin"
+
+
+def test_another_process_sees_new_accounts(run, tmp_path):
+    (tmp_path / "users.yaml").write_text(yaml.safe_dump(BASE))
+    out = run("""
+        import subprocess, sys, time
+        from ybocs import credentials
+
+        assert credentials.resolve_login("nowy") is None
+        subprocess.run([sys.executable, "-c", "from ybocs import credentials; "
+                        "credentials.add_user('Nowy', {'name': 'N', 'password': 'x', 'role': 'user'})"], check=True)
+        deadline = time.monotonic() + 5
+        while credentials.resolve_login("nowy") is None and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert credentials.resolve_login("nowy") == "Nowy"
+        try:
+            credentials.add_user("NOWY", {"name": "N2", "password": "x", "role": "user"})
+        except ValueError:
+            print("taken")
+    """)
+    assert "taken" in out
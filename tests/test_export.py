@@ -0,0 +1,54 @@
+import gzip
+import io
+import zipfile
+
+import pandas as pd
+import pytest
+from streamlit.runtime.download_data_util import convert_data_to_bytes_and_infer_mime
+
+from ybocs import export
+from ybocs.schema import RESULTS_COLUMNS, RESULTS_DTYPES, check_results
+
+
+def results(n: int) -> pd.DataFrame:
+    raw = pd.DataFrame({
+        "timestamp": [f"2024-01-{1 + i % 28:02d}T10:00:00" for i in range(n)],
+        "date": [f"2024-01-{1 + i % 28:02d}" for i in range(n)],
+        "user": [f"u{i % 3}" for i in range(n)],
+        "role": "user",
+        "objaw": "o",
+        **{f"q{k}": "0" for k in range(1, 11)},
+        "suma": "0",
+    })[RESULTS_COLUMNS]
+    typed, reasons = check_results(raw)
+    assert reasons.empty
+    return typed
+
+
+def read_back(fmt: str, data: bytes) -> pd.DataFrame:
+    if fmt == "csv":
+        return pd.read_csv(io.BytesIO(data))
+    if fmt == "csv.gz":
+        return pd.read_csv(io.BytesIO(gzip.decompress(data)))
+    if fmt == "zip":
+        with zipfile.ZipFile(io.BytesIO(data)) as zf:
+            return pd.read_csv(zf.open("wyniki_ocd.csv"))
+    return pd.read_parquet(io.BytesIO(data))
+
+
+@pytest.mark.parametrize("fmt", list(export.FORMATS))
+def test_export_is_accepted_by_download_button(fmt, monkeypatch):
+    monkeypatch.setattr(export, "CHUNK_ROWS", 7)
+    frames = [results(10), results(0), results(15)]
+    data, _ = convert_data_to_bytes_and_infer_mime(export.export_file(frames, fmt), TypeError("unsupported"))
+    back = read_back(fmt, data)
+    assert list(back.columns) == RESULTS_COLUMNS
+    assert len(back) == 25
+    assert back["user"].astype(str).tolist() == [f"u{i % 3}" for i in range(10)] + [f"u{i % 3}" for i in range(15)]
+
+
+def test_spooled_to_disk_export_is_complete(monkeypatch):
+    monkeypatch.setattr(export, "SPOOL_BYTES", 64)
+    data = export.export_file([results(100)], "csv")
+    assert data.count(b"\n") == 101
+    assert set(RESULTS_DTYPES) == set(read_back("csv", data).columns)
@@ -0,0 +1,67 @@
+import io
+from datetime import date
+
+from openpyxl import Workbook
+
+from ybocs import importer
+
+
+def test_xlsx_rows_are_read_as_text():
+    book = Workbook()
+    sheet = book.active
+    sheet.append(["date", "user", "objaw", *[f"q{k}" for k in range(1, 11)]])
+    sheet.append([date(2024, 1, 5), "jan", "o", *[2.0] * 10])
+    sheet.append([None] * 13)
+    sheet.append([date(2024, 1, 6), "ewa", "o", *range(10)])
+    data = io.BytesIO()
+    book.save(data)
+    data.seek(0)
+    [chunk] = importer.read_chunks(data, "wyniki.xlsx")
+    assert chunk[["date", "user", "q1", "q10"]].values.tolist() == [
+        ["2024-01-05", "jan", "2", "2"],
+        ["2024-01-06", "ewa", "0", "9"],
+    ]
+
+
+# Saved with a Polish locale: ";" between the columns.
+FILE = """date;user;objaw;q1;q2;q3;q4;q5;q6;q7;q8;q9;q10
+2024-03-01;{p};Obsesje agresywne – Lęk, że może skrzywdzić siebie;1;1;1;1;1;1;1;1;1;1
+2024-03-01;nikt;Obsesje agresywne – Lęk, że może skrzywdzić siebie;1;1;1;1;1;1;1;1;1;1
+2024-03-02;{p};nie ma takiego objawu;1;1;1;1;1;1;1;1;1;1
+2024-03-03;{p};Obsesje agresywne – Lęk, że może skrzywdzić siebie;7;1;1;1;1;1;1;1;1;1
+2024-03-01;{P};Obsesje agresywne – Lęk, że może skrzywdzić siebie;1;1;1;1;1;1;1;1;1;1
+;{p};Obsesje agresywne – Lęk, że może skrzywdzić siebie;1;1;1;1;1;1;1;1;1;1
+2024-03-04;{p};Obsesje agresywne – Lęk, że może skrzywdzić siebie;2;2;2;2;2;2;2;2;2;2
+"""
+
+
+def test_import_rejects_with_reasons_and_skips_what_is_stored(run, clinic, tmp_path):
+    from benchmarks.clinic import patient_login
+
+    login = patient_login(0)
+    source = tmp_path / "wyniki.csv"
+    source.write_text(FILE.format(p=login, P=login.upper()), encoding="utf-8")
+    out = run(f"""
+        import csv
+        from ybocs import importer, storage
+
+        before = len(storage.load_results({login!r}))
+        first = importer.import_results({str(source)!r}, {str(tmp_path / "odrzucone.csv")!r})
+        print("first:", tuple(first))
+        with open({str(tmp_path / "odrzucone.csv")!r}, encoding="utf-8") as f:
+            for row in csv.DictReader(f):
+                print("rejected:", row["line"], row["reason"])
+        print("again:", tuple(importer.import_results({str(source)!r})))
+        storage.compact_results()
+        print("archived:", tuple(importer.import_results({str(source)!r})))
+        print("stored:", len(storage.load_results({login!r})) - before)
+    """, users_file=clinic["users_file"], data_dir=clinic["data_dir"])
+    # (read, imported, duplicates, rejected)
+    assert "first: (7, 2, 1, 4)" in out
+    assert "rejected: 3 user: unknown account" in out
+    assert "rejected: 4 objaw: unknown symptom" in out
+    assert "rejected: 5 q1:" in out
+    assert "rejected: 7 timestamp: invalid date" in out
+    assert "again: (7, 0, 3, 4)" in out
+    assert "archived: (7, 0, 3, 4)" in out
+    assert "stored: 2" in out
@@ -0,0 +1,58 @@
+import subprocess
+import sys
+from pathlib import Path
+
+from ybocs.locking import file_lock
+
+ROOT = Path(__file__).resolve().parent.parent
+
+INCREMENT = """
+import sys
+from pathlib import Path
+from ybocs.locking import file_lock
+
+path = Path(sys.argv[1])
+for _ in range(200):
+    with file_lock(path):
+        path.write_text(str(int(path.read_text()) + 1))
+"""
+
+
+def test_lock_excludes_other_processes(tmp_path):
+    path = tmp_path / "counter"
+    path.write_text("0")
+    procs = [subprocess.Popen([sys.executable, "-c", INCREMENT, str(path)], cwd=ROOT) for _ in range(3)]
+    for p in procs:
+        assert p.wait(60) == 0
+    assert path.read_text() == "600"
+
+
+def test_lock_is_reentrant_in_one_thread(tmp_path):
+    path = tmp_path / "file"
+    with file_lock(path):
+        with file_lock(path):
+            path.write_text("x")
+    assert path.read_text() == "x"
+
+
+def test_replicas_appending_at_once_lose_no_result(run):
+    script = """
+        import sys
+        from ybocs import storage
+
+        for i in range(100):
+            storage.append_result({"timestamp": f"2024-01-01T{sys.argv[1]}:{i // 60:02d}:{i % 60:02d}",
+                                   "date": "2024-01-01", "user": "u", "role": "user", "objaw": "o",
+                                   **{f"q{k}": 1 for k in range(1, 11)}, "suma": 10})
+    """
+    run("""
+        import subprocess, sys, textwrap
+        from ybocs import storage
+
+        storage.init_results_file()
+        procs = [subprocess.Popen([sys.executable, "-c", textwrap.dedent(%r), f"{h:02d}"]) for h in range(3)]
+        assert [p.wait(120) for p in procs] == [0, 0, 0]
+        df = storage.load_results()
+        assert len(df) == 300, len(df)
+        assert df["timestamp"].nunique() == 300
+    """ % script)
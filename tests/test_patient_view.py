@@ -0,0 +1,25 @@
+def test_answers_survive_switching_symptoms(run, clinic):
+    out = run("""
+        from streamlit.testing.v1 import AppTest
+        from benchmarks import clinic
+
+        at = AppTest.from_file("app.py", default_timeout=60)
+        at.run()
+        at.text_input[0].input(clinic.patient_login(0))
+        at.text_input[1].input(clinic.PASSWORD)
+        at.button[0].click().run()
+
+        def pick(i):
+            next(s for s in at.selectbox if s.label == "Objaw").select_index(i).run()
+
+        pick(1)
+        at.radio[0].set_value(3).run()
+        at.radio[1].set_value(4).run()
+        pick(2)
+        print("other:", at.radio[0].value)
+        pick(1)
+        print("back:", at.radio[0].value, at.radio[1].value)
+        assert not at.exception, at.exception
+    """)
+    assert "other: 0" in out
+    assert "back: 3 4" in out
@@ -0,0 +1,87 @@
+"""The process-wide results cache of ``storage``: tail reads and fallbacks.
+
+Edits by "another replica" are made to the file directly, followed by
+``watch.touch`` in place of the change notification, so no test waits for
+the watcher.
+"""
+
+SETUP = """
+import os
+from ybocs import storage, watch
+
+def row(day, total=10):
+    scores = {f"q{i}": 1 for i in range(1, 11)}
+    scores["q10"] = total - 9
+    return {"timestamp": f"2024-01-{day:02d}T10:00:00", "date": f"2024-01-{day:02d}", "user": "u",
+            "role": "user", "objaw": "o", **scores, "suma": total}
+
+def line(day, total=10):
+    return storage._format_rows([row(day, total)]).encode()
+
+def external(mode, data, offset=None):
+    with open(storage.RESULTS_FILE, mode) as f:
+        if offset is not None:
+            f.seek(offset)
+        f.write(data)
+    watch.touch(storage.RESULTS_FILE)
+
+def state():
+    stats = storage.results_cache_stats()
+    df = storage.load_results()
+    return len(df), storage.results_cache_stats()["full_loads"] - stats["full_loads"], df
+
+storage.append_results([row(1), row(2)])
+assert storage.load_results().shape[0] == 2
+"""
+
+
+def test_appended_rows_are_read_as_a_tail(run):
+    run(SETUP, """
+        full = storage.results_cache_stats()["full_loads"]
+        storage.append_result(row(3))
+        external("ab", line(4))
+        n, reloads, _ = state()
+        assert (n, reloads) == (4, 0), (n, reloads)
+        assert storage.results_cache_stats()["full_loads"] == full
+        assert storage.results_cache_stats()["tail_loads"] >= 1
+
+        # Half a line is left for the next read.
+        half = line(5)
+        external("ab", half[:20])
+        assert state()[:2] == (4, 0)
+        external("ab", half[20:])
+        assert state()[:2] == (5, 0)
+    """)
+
+
+def test_rewrite_in_place_before_the_offset_is_read_in_full(run):
+    run(SETUP, """
+        size = storage.RESULTS_FILE.stat().st_size
+        last = line(2)
+        # Same inode and a longer file, but the bytes already read changed.
+        external("r+b", line(2, total=13) + line(3), offset=size - len(last))
+        n, reloads, df = state()
+        assert (n, reloads) == (3, 1), (n, reloads)
+        assert df["suma"].tolist() == [10, 13, 10], df["suma"].tolist()
+    """)
+
+
+def test_truncated_log_is_read_in_full(run):
+    run(SETUP, """
+        os.truncate(storage.RESULTS_FILE, len(storage.RESULTS_HEADER))
+        watch.touch(storage.RESULTS_FILE)
+        assert state()[:2] == (0, 1)
+        storage.append_result(row(7))
+        assert state()[:2] == (1, 0)
+    """)
+
+
+def test_replaced_log_is_read_in_full(run):
+    run(SETUP, """
+        from ybocs import writer
+
+        writer.replace_file(storage.RESULTS_FILE, storage.RESULTS_HEADER.encode() + line(8) + line(9) + line(10))
+        n, reloads, df = state()
+        assert (n, reloads) == (3, 1), (n, reloads)
+        assert df["date"].dt.day.tolist() == [8, 9, 10]
+    """)
@@ -0,0 +1,76 @@
+"""Regression tests of the results store, each in a fresh process.
+
+``ybocs.config`` reads ``YBOCS_DATA_DIR`` on import, so every test runs its
+script in a subprocess pointed at a scratch directory.
+"""
+import os
+import subprocess
+import sys
+import textwrap
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+
+
+ROW = """
+row = {"timestamp": "2024-01-01T10:00:00", "date": "2024-01-01", "user": "u", "role": "user",
+       "objaw": "o", **{f"q{i}": 1 for i in range(1, 11)}, "suma": 10}
+"""
+
+
+def run(tmp_path, script: str) -> str:
+    env = dict(os.environ, YBOCS_DATA_DIR=str(tmp_path / "data"), YBOCS_USERS_FILE=str(tmp_path / "users.yaml"))
+    done = subprocess.run(
+        [sys.executable, "-c", ROW + textwrap.dedent(script)], cwd=ROOT, env=env, capture_output=True, text=True
+    )
+    assert done.returncode == 0, done.stderr
+    return done.stdout
+
+
+def test_offset_timestamp_is_refused_on_append(tmp_path):
+    out = run(tmp_path, """
+        from ybocs import storage
+        storage.append_result(row)
+        try:
+            storage.append_result(dict(row, timestamp="2024-01-01T11:00:00+02:00"))
+        except ValueError as exc:
+            print("refused:", exc)
+        storage.invalidate_results_cache()
+        print("rows:", len(storage.load_results()))
+    """)
+    assert "refused: timestamp: UTC offsets are not supported" in out
+    assert "rows: 1" in out
+
+
+def test_offset_timestamp_in_log_is_dropped_on_load(tmp_path):
+    out = run(tmp_path, """
+        from ybocs import storage
+        storage.append_result(row)
+        with open(storage.RESULTS_FILE, "a", encoding="utf-8") as f:
+            f.write("2024-01-02T10:00:00Z,2024-01-02,u,user,o,1,1,1,1,1,1,1,1,1,1,10\\n")
+        storage.append_result(dict(row, timestamp="2024-01-03T10:00:00", date="2024-01-03"))
+        print("tail:", len(storage.load_results()))
+        storage.invalidate_results_cache()
+        print("full:", len(storage.load_results()))
+    """)
+    assert "tail: 2" in out
+    assert "full: 2" in out
+
+
+def test_file_of_the_old_writer_is_migrated_before_appending(tmp_path):
+    data = tmp_path / "data"
+    data.mkdir()
+    # pandas' column order and no newline at the end, as the old code wrote it.
+    columns = ["user", "objaw", "date", "timestamp", "role", "suma", *[f"q{i}" for i in range(1, 11)]]
+    values = ["u", "o", "2023-05-01", "2023-05-01T08:00:00", "user", "20", *["2"] * 10]
+    (data / "wyniki.csv").write_text(",".join(columns) + "\n" + ",".join(values), encoding="utf-8")
+    out = run(tmp_path, """
+        from ybocs import storage
+        storage.append_result(row)
+        text = storage.RESULTS_FILE.read_text(encoding="utf-8")
+        assert text.startswith(storage.RESULTS_HEADER), text
+        assert text.endswith("\\n") and text.count("\\n") == 3, text
+        df = storage.load_results()
+        print("rows:", df["date"].dt.date.astype(str).tolist(), df["suma"].tolist(), df["q1"].tolist())
+    """)
+    assert "rows: ['2023-05-01', '2024-01-01'] [20, 10] [2, 1]" in out
@@ -0,0 +1,48 @@
+SETUP = """
+from datetime import date
+import pandas as pd
+from ybocs import archive, retention, rollups, storage
+
+def months(cold):
+    return {(e["user"], e["month"]) for e in archive.manifest() if archive.is_cold(e) == cold}
+
+total = len(storage.load_results())
+"""
+
+
+def test_apply_compacts_freezes_and_rewarms(run, clinic):
+    run(SETUP, """
+        policy = retention.Policy(hot_days=30, inactive_days=0, cold_years=1)
+        assert retention.apply(policy, today=date(2025, 1, 1), dry_run=True).compacted > 0
+        assert archive.manifest() == [], "a dry run moves nothing"
+
+        report = retention.apply(policy, today=date(2025, 1, 1))
+        assert report.compacted > 0 and report.frozen > 0 and report.patients == 3
+        delta = storage.load_delta()
+        assert delta["date"].min() >= pd.Timestamp("2024-12-02"), "only the last 30 days stay in the log"
+        cold = months(cold=True)
+        assert len(cold) == report.frozen and all(m < "2024-01" for _, m in cold)
+        assert all(m >= "2024-01" for _, m in months(cold=False))
+        for user in {u for u, _ in cold}:
+            assert archive.cold_path(user).exists()
+        assert len(storage.load_results()) == total
+        warm = storage.load_results(cold=False)
+        assert len(warm) < total and warm["date"].min() >= pd.Timestamp("2024-01-01")
+        assert rollups.check() == []
+
+        # The warm files of frozen months are deleted by the next run.
+        assert retention.apply(policy, today=date(2025, 1, 1)) == (0, 0, 0, report.frozen)
+
+        # A late result for a frozen month brings it back to the warm tier.
+        user, month = min(cold)
+        day = f"{month}-15"
+        storage.append_result({"timestamp": f"{day}T23:59:59", "date": day, "user": user, "role": "user",
+                               "objaw": "inny", **{f"q{k}": 1 for k in range(1, 11)}, "suma": 10})
+        assert storage.compact_results() > 0
+        assert (user, month) in months(cold=False)
+        assert months(cold=True) == cold - {(user, month)}
+        assert len(storage.load_results()) == total + 1
+        assert len(storage.load_results(user, date.fromisoformat(f"{month}-01"), date.fromisoformat(day),
+                                        cold=False)) > 1, "the month's frozen rows are warm again"
+        assert rollups.check() == []
+    """, data_dir=clinic["data_dir"], users_file=clinic["users_file"])
@@ -0,0 +1,37 @@
+ROWS = """
+from datetime import date
+from ybocs import rollups, storage
+from ybocs.user_symptoms import load_user_symptoms
+from benchmarks import clinic
+
+def rows(user, objaw, day, n):
+    return [{"timestamp": f"{day}T{10 + i:02d}:00:00", "date": day, "user": user, "role": "user", "objaw": objaw,
+             **{f"q{k}": (i + k) % 5 for k in range(1, 11)}, "suma": sum((i + k) % 5 for k in range(1, 11))}
+            for i in range(n)]
+
+patient = clinic.patient_login(0)
+objaw = load_user_symptoms(patient)[0]
+"""
+
+
+def test_maintained_rollups_match_a_rebuild(run, clinic):
+    run(ROWS, """
+        assert rollups.check() == []
+        rebuilds = rollups.stats()["rebuilds"]
+
+        # New rows of an existing course, of a new one and of a new patient.
+        storage.append_results(rows(patient, objaw, "2030-01-02", 3) + rows(patient, "inny", "2030-01-03", 2)
+                               + rows("nowy", objaw, "2030-02-01", 2))
+        assert rollups.check() == []
+        assert rollups.stats()["rebuilds"] == rebuilds, "appends are folded in as a tail"
+        assert rollups.rollup("nowy", objaw).count == 2
+
+        assert storage.compact_results(before=date(2030, 1, 3)) > 0
+        assert rollups.check() == []
+        storage.append_results(rows(patient, objaw, "2030-03-01", 1))
+        storage.compact_results()
+        assert storage.load_delta().empty
+        assert rollups.check() == []
+        storage.append_results(rows(patient, objaw, "2030-03-02", 1))
+        assert rollups.check() == []
+    """)
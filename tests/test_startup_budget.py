@@ -0,0 +1,22 @@
+"""The import half of ``benchmarks.startup_budget``; its timings are not checked here."""
+import json
+import os
+import subprocess
+import sys
+
+from benchmarks.startup_budget import HEAVY_MODULES, ROOT
+
+
+def test_login_page_imports_no_heavy_modules(tmp_path):
+    env = dict(
+        os.environ,
+        YBOCS_DATA_DIR=str(tmp_path / "data"),
+        YBOCS_USERS_FILE=str(ROOT / "users.yaml"),
+        YBOCS_HASH_WORKERS="0",
+    )
+    out = subprocess.run(
+        [sys.executable, "-m", "benchmarks.startup_budget", "--child", "--reruns", "1"],
+        cwd=ROOT, env=env, capture_output=True, text=True, check=True,
+    )
+    sample = json.loads(out.stdout.strip().splitlines()[-1])
+    assert sample["heavy_modules"] == [], f"the login page imported {sample['heavy_modules']} (of {HEAVY_MODULES})"
@@ -0,0 +1,62 @@
+import json
+
+from benchmarks import clinic
+
+
+def test_per_patient_files_are_migrated_once(run, tmp_path):
+    info = clinic.generate(tmp_path, patients=5, rows=0, per_user_symptoms=True)
+    old = {p.parent.name: json.loads(p.read_text()) for p in (tmp_path / "data" / "users").glob("*/objawy.json")}
+    (tmp_path / "data" / "users" / "zepsuty").mkdir()
+    (tmp_path / "data" / "users" / "zepsuty" / "objawy.json").write_text("{nie json")
+    out = run("""
+        import json, shutil
+        from ybocs import config, user_symptoms
+
+        print(json.dumps(user_symptoms.load_symptom_sets()))
+        # Later edits of the old files no longer count.
+        shutil.rmtree(config.USER_STORE)
+        assert user_symptoms.load_symptom_sets() == json.loads(config.SYMPTOMS_FILE.read_text())["users"]
+    """, users_file=info["users_file"])
+    assert json.loads(out) == old
+    assert len(old) == 5
+
+
+def test_journal_is_folded_into_the_store_after_500_entries(run):
+    run("""
+        import json
+        from ybocs import config, user_symptoms
+        from ybocs.user_symptoms import _store
+
+        user_symptoms.load_symptom_sets()
+        base = config.SYMPTOMS_FILE.read_bytes()
+        expected = {}
+        for i in range(499):
+            user_symptoms.save_user_symptoms(f"p{i % 7}", [f"objaw{i}"])
+            expected[f"p{i % 7}"] = [f"objaw{i}"]
+        assert config.SYMPTOMS_FILE.read_bytes() == base
+        assert _store.journal_file.read_text().count("\\n") == 499
+        user_symptoms.save_symptom_sets({"p0": ["a"], "p9": ["b", "c"]})
+        assert _store.journal_file.read_bytes() == b""
+        stored = json.loads(config.SYMPTOMS_FILE.read_text())["users"]
+        assert stored == {**expected, "p0": ["a"], "p9": ["b", "c"]}
+        assert user_symptoms.load_symptom_sets() == stored
+    """)
+
+
+def test_another_process_sees_new_journal_lines(run):
+    run("""
+        import subprocess, sys, time
+        from ybocs import user_symptoms
+        from ybocs.user_symptoms import _store
+
+        user_symptoms.save_user_symptoms("jan", ["x"])
+        offset = _store.journal_offset
+        subprocess.run([sys.executable, "-c", "from ybocs import user_symptoms; "
+                        "user_symptoms.save_symptom_sets({'jan': ['y'], 'ewa': ['z']})"], check=True)
+        deadline = time.monotonic() + 5
+        while user_symptoms.load_user_symptoms("ewa") == [] and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert user_symptoms.load_symptom_sets() == {"jan": ["y"], "ewa": ["z"]}
+        # Only the new lines were read, not the whole journal again.
+        assert _store.journal_offset > offset and _store.journal_entries == 3
+    """)
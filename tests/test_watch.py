@@ -0,0 +1,17 @@
+import subprocess
+import sys
+import time
+
+from ybocs import watch
+
+
+def test_change_by_another_process_bumps_the_generation(tmp_path):
+    path = tmp_path / "wyniki.csv"
+    path.write_text("a\n")
+    before = watch.generation(path)
+    assert type(watch._ensure_watcher()).__name__ == "_WatchdogWatcher"
+    subprocess.run([sys.executable, "-c", f"open({str(path)!r}, 'a').write('b\\n')"], check=True)
+    deadline = time.monotonic() + 5
+    while watch.generation(path) == before and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert watch.generation(path) > before
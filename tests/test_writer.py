@@ -0,0 +1,44 @@
+import threading
+from collections import Counter
+
+from ybocs import writer
+
+
+def test_waiting_appends_are_committed_together(tmp_path):
+    path = tmp_path / "log.csv"
+    queue = writer.CommitQueue()
+    release = threading.Event()
+    blocker = queue.submit(writer._Op("call", fn=release.wait))
+    futures = [queue.submit(writer._Op("append", path=path, data=f"{i}\n".encode())) for i in range(50)]
+    release.set()
+    for f in futures:
+        f.result(10)
+    assert blocker.result(10) is True
+    assert path.read_text().split() == [str(i) for i in range(50)]
+    # One write and fsync for all 50, queued behind the blocker.
+    assert queue.fsyncs == 1
+    assert queue.ops == 51
+
+
+def test_concurrent_appends_are_all_written_whole(tmp_path):
+    path = tmp_path / "log.csv"
+    threads, per_thread = 16, 100
+
+    def append(t):
+        for i in range(per_thread):
+            writer.append_bytes(path, f"{t},{i},{'x' * (t * 37 % 200)}\n".encode())
+
+    workers = [threading.Thread(target=append, args=(t,)) for t in range(threads)]
+    for w in workers:
+        w.start()
+    for w in workers:
+        w.join()
+    lines = path.read_text().splitlines()
+    assert len(lines) == threads * per_thread
+    seen = Counter(tuple(line.split(",")[:2]) for line in lines)
+    assert set(seen.values()) == {1}
+    assert all(line.split(",")[2] == "x" * (int(line.split(",")[0]) * 37 % 200) for line in lines)
+    # Each thread's own appends keep their order.
+    for t in range(threads):
+        mine = [int(line.split(",")[1]) for line in lines if line.startswith(f"{t},")]
+        assert mine == list(range(per_thread))
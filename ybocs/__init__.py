@@ -0,0 +1 @@
+"""Support code for the Y-BOCS Streamlit app (storage, caching, services)."""
@@ -0,0 +1,256 @@
+"""HTTP/JSON service for kiosks and other systems: batched results and symptoms.
+
+Runs next to the Streamlit app on the same data (``YBOCS_DATA_DIR``,
+``YBOCS_USERS_FILE``) and goes through the same storage, writer and
+validation, so replicas of either see each other's writes at once::
+
+    python -m ybocs.api --port 8502
+
+``POST /results`` takes ``{"results": [...]}``. Every result has ``user``
+(login), ``objaw`` (a ``SYMPTOMS`` key, label or item, as in imports) and
+the answers, as ``answers`` (ten integers 0–4, the ``YBOCS_ITEMS`` in
+order) or as ``q1``–``q10``; ``timestamp`` (default: now), ``date``
+(default: the day of the timestamp) and ``suma`` (checked against the
+answers) are optional. A batch is validated as a whole, vectorized, and
+written with one append, or not at all: a 422 response lists the rejected
+results by position. Results with a ``timestamp`` already stored for the
+same patient and symptom are skipped, so a batch whose response was lost
+can be sent again.
+
+``POST /symptoms`` takes ``{"assignments": [{"user": ..., "symptoms":
+[...]}, ...]}`` and replaces the lists of those patients, in one write.
+
+``GET /health`` answers ``{"ok": true}``; ``GET /metrics`` serves
+``ybocs.metrics`` in the Prometheus format when metrics are on. With
+``YBOCS_API_TOKEN`` set, every request needs ``Authorization: Bearer
+<token>``. The service binds to localhost unless told otherwise.
+"""
+import hmac
+import json
+import logging
+import os
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+import pandas as pd
+
+from . import archive, metrics, storage, writer
+from .config import RESULTS_FILE
+from .credentials import resolve_login
+from .domain import YBOCS_ITEMS, symptom_key
+from .importer import KnownRows, check_rows
+from .schema import QUESTION_COLUMNS, RESULTS_COLUMNS
+from .user_symptoms import save_symptom_sets
+
+logger = logging.getLogger(__name__)
+
+MAX_BODY = 16 * 2**20
+MAX_BATCH = 50_000
+TOKEN = os.environ.get("YBOCS_API_TOKEN") or None
+
+
+class ApiError(Exception):
+    def __init__(self, status: int, message: str, errors: list = None):
+        super().__init__(message)
+        self.status = status
+        self.errors = errors
+
+
+def _batch(payload, name: str) -> list:
+    items = payload.get(name) if isinstance(payload, dict) else None
+    if not isinstance(items, list) or not items:
+        raise ApiError(400, f'Expected {{"{name}": [...]}} with at least one entry.')
+    if len(items) > MAX_BATCH:
+        raise ApiError(413, f"At most {MAX_BATCH} entries per batch.")
+    return items
+
+
+def _text(value):
+    return None if value is None else str(value).strip() or None
+
+
+def _result_fields(item) -> dict:
+    """One submitted result as the raw columns of the log; problems as ``error``."""
+    if not isinstance(item, dict):
+        return {"error": "expected an object"}
+    row = {c: _text(item.get(c)) for c in ("timestamp", "date", "user", "objaw")}
+    answers = item.get("answers")
+    if answers is not None:
+        if not isinstance(answers, list) or len(answers) != len(YBOCS_ITEMS):
+            return {"error": f"answers: expected a list of {len(YBOCS_ITEMS)} integers"}
+        row.update(zip(QUESTION_COLUMNS, answers))
+    else:
+        row.update((q, item.get(q)) for q in QUESTION_COLUMNS)
+    row["suma"] = item.get("suma")
+    return row
+
+
+def submit_results(items: list) -> dict:
+    """Validate and store a batch of results; see the module docstring."""
+    raw = pd.DataFrame.from_records([_result_fields(item) for item in items], columns=[
+        "timestamp", "date", "user", "objaw", *QUESTION_COLUMNS, "suma", "error",
+    ])
+    # JSON booleans are numbers to pandas; they are not valid answers.
+    scores = raw[QUESTION_COLUMNS + ["suma"]].map(lambda v: None if isinstance(v, bool) else v)
+    explicit = raw["timestamp"].notna().to_numpy()
+    now = datetime.now().isoformat(timespec="seconds")
+    prepared = pd.DataFrame({
+        "timestamp": raw["timestamp"].fillna(now),
+        "date": raw["date"].fillna(raw["timestamp"].fillna(now).str[:10]),
+        "user": raw["user"],
+        "role": "user",
+        "objaw": raw["objaw"],
+        **{c: scores[c] for c in QUESTION_COLUMNS},
+        "suma": scores["suma"].where(scores["suma"].notna(), scores[QUESTION_COLUMNS].apply(
+            pd.to_numeric, errors="coerce").sum(axis=1, min_count=len(QUESTION_COLUMNS))),
+    }, index=raw.index)[RESULTS_COLUMNS]
+
+    malformed = raw["error"].notna()
+    typed, reasons = check_rows(prepared[~malformed])
+    reasons = pd.concat([raw.loc[malformed, "error"], reasons]).sort_index()
+    if len(reasons):
+        raise ApiError(422, f"{len(reasons)} of {len(items)} result(s) rejected; nothing was stored.", [
+            {"index": int(i), "reason": reason} for i, reason in reasons.items()
+        ])
+
+    # Only results that name their time can be a repeat of an earlier batch.
+    candidates = explicit[typed.index.to_numpy()]
+
+    def store():
+        # Check and append under the log's lock: a retry racing with the
+        # request it repeats must see that request's rows.
+        repeat = np.zeros(len(typed), dtype=bool)
+        if candidates.any():
+            known = KnownRows()
+            known.load(typed.loc[candidates, "user"].astype(str).unique())
+            keys = archive.row_keys(typed)
+            repeat = candidates & (np.isin(keys, known.keys) | pd.Series(keys).duplicated().to_numpy())
+        storage.append_frame(typed[~repeat])
+        return repeat
+
+    repeat = writer.run_serialized(store, lock=RESULTS_FILE)
+    stored = typed[~repeat]
+    metrics.count("api.results", len(stored))
+    return {"stored": len(stored), "duplicates": int(repeat.sum())}
+
+
+def submit_symptoms(items: list) -> dict:
+    """Validate and store a batch of symptom assignments, all or nothing."""
+    sets, errors = {}, []
+    for i, item in enumerate(items):
+        if not isinstance(item, dict) or not isinstance(item.get("symptoms"), list):
+            errors.append({"index": i, "reason": 'expected {"user": ..., "symptoms": [...]}'})
+            continue
+        login = resolve_login(_text(item.get("user")))
+        keys = [symptom_key(str(s)) for s in item["symptoms"]]
+        if login is None:
+            errors.append({"index": i, "reason": "user: unknown account"})
+        elif None in keys:
+            bad = item["symptoms"][keys.index(None)]
+            errors.append({"index": i, "reason": f"symptoms: unknown symptom {bad!r}"})
+        else:
+            sets[login] = sorted(set(keys))
+    if errors:
+        raise ApiError(422, f"{len(errors)} of {len(items)} assignment(s) rejected; nothing was stored.", errors)
+    save_symptom_sets(sets)
+    return {"stored": len(sets)}
+
+
+class Handler(BaseHTTPRequestHandler):
+    server_version = "ybocs-api"
+
+    def _send(self, status: int, body, content_type: str = "application/json"):
+        data = body.encode("utf-8") if isinstance(body, str) else json.dumps(body, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", f"{content_type}; charset=utf-8")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _authorized(self) -> bool:
+        if TOKEN is None:
+            return True
+        sent = self.headers.get("Authorization", "")
+        if hmac.compare_digest(sent.encode(), f"Bearer {TOKEN}".encode()):
+            return True
+        self._send(401, {"error": "Missing or wrong bearer token."})
+        return False
+
+    def do_GET(self):
+        if not self._authorized():
+            return
+        path = self.path.split("?")[0]
+        if path == "/health":
+            self._send(200, {"ok": True})
+        elif path == "/metrics" and metrics.ENABLED:
+            self._send(200, metrics.prometheus_text(), "text/plain; version=0.0.4")
+        else:
+            self._send(404, {"error": "Not found."})
+
+    def do_POST(self):
+        if not self._authorized():
+            return
+        routes = {"/results": ("results", submit_results), "/symptoms": ("assignments", submit_symptoms)}
+        route = routes.get(self.path.split("?")[0])
+        if route is None:
+            self._send(404, {"error": "Not found."})
+            return
+        try:
+            try:
+                length = int(self.headers.get("Content-Length") or 0)
+            except ValueError:
+                raise ApiError(400, "Content-Length is not a number.") from None
+            if length < 0:
+                raise ApiError(400, "Content-Length is negative.")
+            if length > MAX_BODY:
+                raise ApiError(413, f"Request body over {MAX_BODY} bytes.")
+            try:
+                payload = json.loads(self.rfile.read(length) or b"null")
+            except ValueError:
+                raise ApiError(400, "Request body is not valid JSON.") from None
+            name, handle = route
+            with metrics.span(f"api.{name}"):
+                self._send(200, handle(_batch(payload, name)))
+        except ApiError as exc:
+            body = {"error": str(exc)}
+            if exc.errors is not None:
+                body["errors"] = exc.errors
+            self._send(exc.status, body)
+        except Exception:
+            logger.exception("Request to %s failed", self.path)
+            self._send(500, {"error": "Internal server error."})
+
+    def log_message(self, fmt, *args):
+        if os.environ.get("YBOCS_API_LOG"):
+            super().log_message(fmt, *args)
+
+
+def serve(host: str = "127.0.0.1", port: int = 8502) -> ThreadingHTTPServer:
+    """A server on ``host:port`` (not yet running; call ``serve_forever``)."""
+    from .config import ensure_dirs
+
+    ensure_dirs()
+    metrics.start()
+    return ThreadingHTTPServer((host, port), Handler)
+
+
+def main(argv=None):
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Serve the batch ingestion API.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8502)
+    args = parser.parse_args(argv)
+    server = serve(args.host, args.port)
+    print(f"Listening on http://{args.host}:{server.server_port}", flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
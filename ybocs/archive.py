@@ -0,0 +1,401 @@
+"""Partitioned columnar archive of compacted results.
+
+Compacted results live in one Parquet file per patient and month::
+
+    data/archive/manifest.json
+    data/archive/<user>/<YYYY-MM>.parquet
+
+with ``<user>`` the percent-encoded login (``_login_name``).
+
+The manifest lists every partition with its row count, date range and
+symptoms, so a reader can pick the partitions for one patient or one date
+range — and answer "which dates / symptoms exist" — without opening any
+Parquet file. Fresh saves keep going to ``wyniki.csv``, which acts as the
+write-ahead delta until ``storage.compact_results`` folds it in here.
+
+Months moved to the cold tier by ``retention`` (``freeze``) are kept in
+one zstd-compressed file per patient, ``data/archive/cold/<user>.parquet``;
+their manifest entries stay, marked ``"tier": "cold"``, so dates, symptoms
+and rollups are still answered from the manifest. Readers skip cold
+entries when called with ``cold=False``.
+"""
+import json
+import os
+import threading
+from collections import OrderedDict
+from datetime import date
+from urllib.parse import quote
+
+import numpy as np
+import pandas as pd
+
+from . import metrics, watch
+from .locking import lock_path
+from .config import ARCHIVE_DIR, RESULTS_FILE
+from .schema import CATEGORY_COLUMNS, RESULTS_COLUMNS, arrow_schema, concat_results
+from .writer import atomic_write, run_serialized
+
+MANIFEST_FILE = ARCHIVE_DIR / "manifest.json"
+DEDUP_COLUMNS = ["user", "objaw", "timestamp"]
+# Partition frames kept in memory; each is one patient-month.
+PARTITION_CACHE_SIZE = 512
+# Partitions read together by ``scan``.
+SCAN_BATCH = 256
+COLD_DIR = ARCHIVE_DIR / "cold"
+COLD_COMPRESSION = {"compression": "zstd", "compression_level": 9}
+# Names taken in ``ARCHIVE_DIR`` that no patient directory may use.
+_RESERVED_NAMES = {COLD_DIR.name, MANIFEST_FILE.name, lock_path(MANIFEST_FILE).name, MANIFEST_FILE.name + ".tmp"}
+
+_lock = threading.Lock()
+_manifest = {"generation": None, "partitions": [], "retired": []}
+_partitions = OrderedDict()
+
+
+def _login_name(user: str) -> str:
+    """``user`` as one path component of the archive.
+
+    Percent-encoded, with the first character also encoded when the name
+    would start with a dot (``..`` escapes the archive) or take the name
+    of an archive file or directory (a patient called ``cold``). Other
+    logins keep their plain encoding, so existing archives stay readable.
+    """
+    name = quote(user, safe="")
+    if not name:
+        raise ValueError("empty login")
+    if name.startswith(".") or name in _RESERVED_NAMES:
+        name = f"%{ord(name[0]):02X}{name[1:]}"
+    return name
+
+
+def partition_path(user: str, month: str):
+    return ARCHIVE_DIR / _login_name(user) / f"{month}.parquet"
+
+
+def cold_path(user: str):
+    return COLD_DIR / f"{_login_name(user)}.parquet"
+
+
+def is_cold(entry: dict) -> bool:
+    return entry.get("tier") == "cold"
+
+
+def _load_manifest():
+    gen = watch.generation(MANIFEST_FILE)
+    with _lock:
+        if _manifest["generation"] != gen:
+            try:
+                data = json.loads(MANIFEST_FILE.read_text(encoding="utf-8"))
+            except FileNotFoundError:
+                data = {"partitions": []}
+            _manifest["partitions"] = data["partitions"]
+            _manifest["retired"] = data.get("retired", [])
+            _manifest["generation"] = gen
+        return _manifest
+
+
+def manifest() -> list:
+    """Partition entries, re-read only when the manifest file changed."""
+    return _load_manifest()["partitions"]
+
+
+def generation():
+    """Changes whenever the set of archived rows changes; None if empty."""
+    if not manifest():
+        return None
+    return watch.generation(MANIFEST_FILE)
+
+
+def _read_file(key: str) -> pd.DataFrame:
+    path = ARCHIVE_DIR / key
+    mtime_ns = os.stat(path).st_mtime_ns
+    with _lock:
+        cached = _partitions.get(key)
+        if cached is not None and cached[0] == mtime_ns:
+            _partitions.move_to_end(key)
+            metrics.count("archive.partition_hits")
+            return cached[1]
+    df = pd.read_parquet(path)
+    metrics.count("archive.partition_reads")
+    metrics.count("archive.rows_read", len(df))
+    with _lock:
+        _partitions[key] = (mtime_ns, df)
+        _partitions.move_to_end(key)
+        while len(_partitions) > PARTITION_CACHE_SIZE:
+            _partitions.popitem(last=False)
+    return df
+
+
+def _months(df: pd.DataFrame, months) -> pd.DataFrame:
+    """Rows of a cold file that belong to ``months`` (its cold entries)."""
+    return df[df["date"].dt.strftime("%Y-%m").isin(months)]
+
+
+def _read_entries(entries: list) -> list:
+    frames, cold = [], {}
+    for e in entries:
+        if is_cold(e):
+            cold.setdefault(e["file"], []).append(e["month"])
+        else:
+            frames.append(_read_file(e["file"]))
+    # A cold file also holds months whose entries went back to the warm
+    # tier (new results arrived); only the cold entries' months count.
+    frames += [_months(_read_file(file), months) for file, months in cold.items()]
+    return frames
+
+
+def select(user: str = None, start: date = None, end: date = None, cold: bool = True) -> list:
+    """Manifest entries that may contain rows for the given filters."""
+    lo = None if start is None else start.strftime("%Y-%m")
+    hi = None if end is None else end.strftime("%Y-%m")
+    return [
+        e for e in manifest()
+        if (user is None or e["user"] == user)
+        and (lo is None or e["month"] >= lo)
+        and (hi is None or e["month"] <= hi)
+        and (cold or not is_cold(e))
+    ]
+
+
+def read(user: str = None, start: date = None, end: date = None, cold: bool = True) -> pd.DataFrame:
+    """Archived rows for the given filters; only matching partitions are read."""
+    df = concat_results(_read_entries(select(user, start, end, cold)))
+    if start is not None or end is not None:
+        df = df[filter_dates(df, start, end)]
+    return df
+
+
+def scan(user: str = None, start: date = None, end: date = None, cold: bool = True):
+    """Yield archived rows ``SCAN_BATCH`` partitions at a time, for full scans.
+
+    Goes through one pyarrow dataset per batch instead of the partition
+    cache: much cheaper per file than ``read_parquet``, and a scan of the
+    whole archive does not evict the cached working set.
+    """
+    for df in _scan_entries(select(user, start, end, cold)):
+        if start is not None or end is not None:
+            df = df[filter_dates(df, start, end)]
+        yield df
+
+
+def scan_users(users):
+    """Like ``scan`` for the partitions of several patients."""
+    wanted = set(users)
+    yield from _scan_entries([e for e in manifest() if e["user"] in wanted])
+
+
+def _scan_entries(entries: list):
+    import pyarrow.dataset as ds
+
+    schema = arrow_schema()
+    warm = [e for e in entries if not is_cold(e)]
+    cold = {}
+    for e in entries:
+        if is_cold(e):
+            cold.setdefault(e["file"], []).append(e["month"])
+    for i in range(0, len(warm), SCAN_BATCH):
+        paths = [str(ARCHIVE_DIR / e["file"]) for e in warm[i:i + SCAN_BATCH]]
+        df = ds.dataset(paths, format="parquet", schema=schema).to_table().to_pandas()
+        metrics.count("archive.rows_scanned", len(df))
+        yield df.astype({c: "category" for c in CATEGORY_COLUMNS})
+    for file, months in cold.items():
+        df = _months(pd.read_parquet(ARCHIVE_DIR / file), months)
+        metrics.count("archive.rows_scanned", len(df))
+        yield df
+
+
+def row_keys(df: pd.DataFrame) -> np.ndarray:
+    """64-bit hashes of the ``DEDUP_COLUMNS`` of every row.
+
+    Categoricals hash by value, so frames with different categories compare
+    correctly.
+    """
+    return pd.util.hash_pandas_object(df[DEDUP_COLUMNS], index=False).to_numpy()
+
+
+def filter_dates(df: pd.DataFrame, start: date = None, end: date = None) -> pd.Series:
+    mask = pd.Series(True, index=df.index)
+    if start is not None:
+        mask &= df["date"] >= pd.Timestamp(start)
+    if end is not None:
+        mask &= df["date"] <= pd.Timestamp(end)
+    return mask
+
+
+def date_bounds():
+    entries = manifest()
+    if not entries:
+        return None
+    return (
+        date.fromisoformat(min(e["min_date"] for e in entries)),
+        date.fromisoformat(max(e["max_date"] for e in entries)),
+    )
+
+
+def symptoms(user: str) -> set:
+    out = set()
+    for e in select(user):
+        out.update(e["objawy"])
+    return out
+
+
+def cold_rows(user: str) -> int:
+    """Number of the user's rows in the cold tier."""
+    return sum(e["rows"] for e in select(user) if is_cold(e))
+
+
+def merge(delta: pd.DataFrame):
+    """Fold typed result rows into their partitions and rewrite the manifest.
+
+    Must run on the writer thread (``storage.compact_results`` does that).
+
+    Rows already present in a partition (same user, objaw and timestamp) are
+    skipped, so re-running a compaction that was interrupted is harmless.
+    Every entry carries the trend rollups of its rows (see ``rollups``).
+    """
+    from .rollups import partition_json
+
+    if delta.empty:
+        return
+    entries = {(e["user"], e["month"]): e for e in manifest()}
+    months = delta["date"].dt.strftime("%Y-%m")
+    for (user, month), rows in delta.groupby([delta["user"].astype(str), months], observed=True):
+        path = partition_path(user, month)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        entry = entries.get((user, month))
+        if entry is not None and is_cold(entry):
+            # New results for a frozen month: the month goes back to the warm tier.
+            rows = concat_results([_months(_read_file(entry["file"]), [month]), rows])
+        elif entry is not None and path.exists():
+            rows = concat_results([pd.read_parquet(path), rows])
+        rows = (
+            rows.drop_duplicates(DEDUP_COLUMNS)
+            .sort_values(["date", "timestamp"], kind="mergesort")
+            .reset_index(drop=True)[RESULTS_COLUMNS]
+        )
+        for c in ("user", "role", "objaw"):
+            rows[c] = rows[c].cat.remove_unused_categories()
+        atomic_write(path, rows.to_parquet(index=False))
+        entries[(user, month)] = {
+            "user": user,
+            "month": month,
+            "file": path.relative_to(ARCHIVE_DIR).as_posix(),
+            "rows": len(rows),
+            "min_date": rows["date"].min().date().isoformat(),
+            "max_date": rows["date"].max().date().isoformat(),
+            "objawy": sorted(str(o) for o in rows["objaw"].dropna().unique()),
+            "rollups": partition_json(rows),
+        }
+    _write_manifest(entries.values())
+
+
+def _write_manifest(entries, retired=None):
+    data = {
+        "version": 1,
+        "partitions": sorted(entries, key=lambda e: (e["user"], e["month"])),
+        "retired": _load_manifest()["retired"] if retired is None else sorted(retired),
+    }
+    ARCHIVE_DIR.mkdir(parents=True, exist_ok=True)
+    atomic_write(MANIFEST_FILE, json.dumps(data, ensure_ascii=False, indent=1).encode("utf-8"))
+
+
+def freeze(months: dict) -> int:
+    """Move warm partitions to the cold tier; ``months`` is ``{user: months}``.
+
+    Each patient's cold months are rewritten as one compressed file. The
+    warm files are not deleted at once — a reader in another process may
+    still be working from the previous manifest — but listed as retired
+    and removed by the next ``remove_retired``. Must run on the writer
+    holding the log's lock (see ``retention``). Returns the number of
+    partitions moved.
+    """
+    entries = {(e["user"], e["month"]): e for e in manifest()}
+    retired = set(_load_manifest()["retired"])
+    moved = 0
+    for user, wanted in months.items():
+        new = [entries[(user, m)] for m in sorted(wanted) if (user, m) in entries and not is_cold(entries[(user, m)])]
+        if not new:
+            continue
+        old = [e for (u, _), e in entries.items() if u == user and is_cold(e)]
+        rows = concat_results(list(_scan_entries(old + new)))
+        rows = rows.sort_values(["date", "timestamp"], kind="mergesort").reset_index(drop=True)[RESULTS_COLUMNS]
+        for c in ("user", "role", "objaw"):
+            rows[c] = rows[c].cat.remove_unused_categories()
+        path = cold_path(user)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        atomic_write(path, rows.to_parquet(index=False, **COLD_COMPRESSION))
+        file = path.relative_to(ARCHIVE_DIR).as_posix()
+        for e in new:
+            retired.add(e["file"])
+            entries[(user, e["month"])] = dict(e, tier="cold", file=file)
+        moved += len(new)
+    if moved:
+        _write_manifest(entries.values(), retired)
+    return moved
+
+
+def remove_retired() -> int:
+    """Delete the warm files retired by an earlier ``freeze``; same locking.
+
+    Partition files are only written under the log's lock, so their lock
+    files go too, and so does a patient directory left empty.
+    """
+    retired = _load_manifest()["retired"]
+    if not retired:
+        return 0
+    in_use = {e["file"] for e in manifest()}
+    for file in retired:
+        if file not in in_use:
+            path = ARCHIVE_DIR / file
+            for p in (path, lock_path(path)):
+                try:
+                    os.unlink(p)
+                except FileNotFoundError:
+                    pass
+            try:
+                path.parent.rmdir()
+            except OSError:
+                pass
+    _write_manifest(manifest(), retired=[])
+    return len(retired)
+
+
+def backfill_rollups() -> int:
+    """Add rollups to manifest entries written before partitions had them
+    (or before their current fields).
+
+    Returns the number of entries updated. Runs on the writer thread holding
+    the log's lock, like a compaction.
+    """
+    from .rollups import stored_partials, summarize
+
+    def backfill() -> int:
+        entries = manifest()
+        missing = [e for e in entries if stored_partials(e) is None]
+        found = {}
+        for rows in _scan_entries(missing):
+            rows = rows.assign(month=rows["date"].dt.strftime("%Y-%m"))
+            for (user, month, objaw), partial in summarize(rows, ["user", "month", "objaw"]).items():
+                found.setdefault((user, month), {})[objaw] = partial.to_json()
+        if missing:
+            _write_manifest([
+                e if stored_partials(e) is not None else dict(e, rollups=found.get((e["user"], e["month"]), {}))
+                for e in entries
+            ])
+        return len(missing)
+
+    return run_serialized(backfill, lock=RESULTS_FILE, timeout=None)
+
+
+def main(argv=None):
+    import argparse
+
+    from .storage import compact_results
+
+    parser = argparse.ArgumentParser(description="Fold data/wyniki.csv into the partitioned archive.")
+    parser.parse_args(argv)
+    moved = compact_results()
+    print(f"Compacted {moved} row(s) into {ARCHIVE_DIR} ({len(manifest())} partitions).")
+
+
+if __name__ == "__main__":
+    main()
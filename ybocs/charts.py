@@ -0,0 +1,125 @@
+"""Trend charts of Y-BOCS totals, rendered once and cached as PNG.
+
+``st.pyplot`` needs a pyplot figure per call; pyplot keeps every figure in
+its global registry until it is closed, so a long-running server that
+draws a chart on every rerun slowly fills up. Here charts are drawn on a
+plain ``matplotlib.figure.Figure`` (one per thread, cleared and reused),
+saved as PNG and kept in an LRU cache keyed by a hash of the plotted data
+and the title — a rerun that does not change the view costs one hash.
+
+Long histories are reduced to at most ``MAX_POINTS`` points with
+Largest-Triangle-Three-Buckets, which keeps peaks and troughs, so drawing
+time does not grow with the number of results.
+"""
+import hashlib
+import io
+import threading
+from collections import OrderedDict
+
+import numpy as np
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
+
+from . import metrics
+
+MAX_POINTS = 1000
+CACHE_SIZE = 128
+DPI = 200
+
+_lock = threading.Lock()
+_cache = OrderedDict()
+_local = threading.local()
+_counters = {"hits": 0, "renders": 0}
+
+
+def lttb(x: np.ndarray, y: np.ndarray, threshold: int) -> np.ndarray:
+    """Indices of the points kept by Largest-Triangle-Three-Buckets.
+
+    ``x`` must be sorted. The first and last points are always kept; every
+    bucket in between contributes the point forming the largest triangle
+    with the point kept before it and the average of the next bucket.
+    """
+    n = len(x)
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+    x = x.astype("float64")
+    y = y.astype("float64")
+    edges = np.linspace(1, n - 1, threshold - 1).astype(np.int64)
+    keep = np.empty(threshold, dtype=np.int64)
+    keep[0], keep[-1] = 0, n - 1
+    a = 0
+    for i in range(threshold - 2):
+        lo, hi = edges[i], edges[i + 1]
+        nxt_lo, nxt_hi = hi, edges[i + 2] if i + 2 < len(edges) else n
+        avg_x = x[nxt_lo:nxt_hi].mean()
+        avg_y = y[nxt_lo:nxt_hi].mean()
+        area = np.abs((x[a] - avg_x) * (y[lo:hi] - y[a]) - (x[a] - x[lo:hi]) * (avg_y - y[a]))
+        a = lo + int(area.argmax())
+        keep[i + 1] = a
+    return keep
+
+
+def _view_key(dates: np.ndarray, values: np.ndarray, title: str) -> str:
+    h = hashlib.blake2b(digest_size=16)
+    h.update(title.encode("utf-8"))
+    h.update(np.ascontiguousarray(dates).tobytes())
+    h.update(np.ascontiguousarray(values).tobytes())
+    return h.hexdigest()
+
+
+def _figure() -> Figure:
+    # Figures are not thread-safe; each script thread reuses its own.
+    fig = getattr(_local, "figure", None)
+    if fig is None:
+        fig = _local.figure = Figure()
+        FigureCanvasAgg(fig)
+    fig.clear()
+    return fig
+
+
+def _render(dates: np.ndarray, values: np.ndarray, title: str) -> bytes:
+    order = np.argsort(dates, kind="stable")
+    dates, values = dates[order], values[order]
+    keep = lttb(dates.view("int64"), values, MAX_POINTS)
+    dates, values = dates[keep], values[keep]
+
+    fig = _figure()
+    ax = fig.subplots()
+    ax.plot(dates, values, marker="o" if len(dates) <= 100 else None)
+    ax.set_xlabel("Data")
+    ax.set_ylabel("Suma Y‑BOCS")
+    ax.set_title(title)
+    fig.autofmt_xdate()
+    buf = io.BytesIO()
+    fig.savefig(buf, format="png", dpi=DPI, bbox_inches="tight")
+    fig.clear()
+    return buf.getvalue()
+
+
+def trend_png(view, title: str) -> bytes:
+    """PNG of ``suma`` over ``date`` for a results view."""
+    dates = view["date"].to_numpy(dtype="datetime64[ns]")
+    values = view["suma"].to_numpy()
+    key = _view_key(dates, values, title)
+    with _lock:
+        png = _cache.get(key)
+        if png is not None:
+            _cache.move_to_end(key)
+            _counters["hits"] += 1
+            return png
+    with metrics.span("chart.render"):
+        png = _render(dates, values, title)
+    with _lock:
+        _counters["renders"] += 1
+        _cache[key] = png
+        while len(_cache) > CACHE_SIZE:
+            _cache.popitem(last=False)
+    return png
+
+
+def stats() -> dict:
+    with _lock:
+        return dict(_counters, cached=len(_cache), cached_bytes=sum(len(p) for p in _cache.values()))
+
+
+metrics.register("charts", stats)
@@ -0,0 +1,184 @@
+"""Cohort analytics over all patients, for the admin dashboard.
+
+Built on ``rollups``: one row per course (a patient's results for one
+symptom) with its baseline, last score and number of assessments, plus the
+monthly totals over all results. Nothing here reads result rows; every
+figure is a vectorized operation on those few arrays, computed once per
+rollups snapshot and cached until the next result arrives.
+"""
+import threading
+
+import numpy as np
+import pandas as pd
+
+from . import rollups
+from .domain import SYMPTOMS
+
+# Y-BOCS severity bands: (highest total score, label).
+BANDS = (
+    (7, "Subkliniczne (0–7)"),
+    (15, "Łagodne (8–15)"),
+    (23, "Umiarkowane (16–23)"),
+    (31, "Ciężkie (24–31)"),
+    (40, "Skrajne (32–40)"),
+)
+# Reduction from baseline, in %, counted as (partial) treatment response.
+RESPONSE_PCT = 35
+PARTIAL_RESPONSE_PCT = 25
+# Highest last score counted as remission.
+REMISSION_MAX = 12
+OTHER_GROUP = "Inne"
+
+_lock = threading.RLock()
+_cache = {"state": None, "values": {}}
+
+
+def _derived(name: str, build, state: rollups.Snapshot = None):
+    """``build(state)``, cached until the rollups snapshot changes."""
+    if state is None:
+        state = rollups.snapshot()
+    with _lock:
+        if _cache["state"] is not state:
+            _cache["state"], _cache["values"] = state, {}
+        values = _cache["values"]
+        if name not in values:
+            values[name] = build(state)
+        return values[name]
+
+
+def _group_of(objaw: pd.Index) -> np.ndarray:
+    group = objaw.str.split(":", n=1).str[0]
+    return np.where(group.isin(list(SYMPTOMS)), group, OTHER_GROUP)
+
+
+def _courses(state: rollups.Snapshot) -> pd.DataFrame:
+    users, objawy, counts, baseline, last = [], [], [], [], []
+    for user, parts in state.courses.items():
+        for objaw, p in parts.items():
+            users.append(user)
+            objawy.append(objaw)
+            counts.append(p.n)
+            baseline.append(p.first[2])
+            last.append(p.last[2])
+    df = pd.DataFrame({
+        "user": pd.Categorical(users),
+        "objaw": pd.Categorical(objawy),
+        "count": np.array(counts, dtype=np.int32),
+        "baseline": np.array(baseline, dtype=np.int16),
+        "last": np.array(last, dtype=np.int16),
+    })
+    groups = _group_of(df["objaw"].cat.categories)
+    df["group"] = pd.Categorical(groups[df["objaw"].cat.codes], categories=list(SYMPTOMS) + [OTHER_GROUP])
+    with np.errstate(divide="ignore", invalid="ignore"):
+        reduction = 100 * (df["baseline"].to_numpy(float) - df["last"].to_numpy(float)) / df["baseline"].to_numpy(float)
+    followed = (df["count"].to_numpy() >= 2) & (df["baseline"].to_numpy() > 0)
+    df["followed"] = followed
+    df["reduction_pct"] = np.where(followed, reduction, np.nan)
+    df["response"] = followed & (reduction >= RESPONSE_PCT)
+    df["partial_response"] = followed & (reduction >= PARTIAL_RESPONSE_PCT)
+    df["remission"] = followed & (df["last"].to_numpy() <= REMISSION_MAX)
+    bounds = np.array([hi for hi, _ in BANDS])
+    df["band"] = pd.Categorical.from_codes(
+        np.searchsorted(bounds, df["last"].to_numpy(), side="left"),
+        dtype=pd.CategoricalDtype([label for _, label in BANDS], ordered=True),
+    )
+    return df
+
+
+def courses() -> pd.DataFrame:
+    """One row per (user, objaw); shared, treat as read-only.
+
+    A course is *followed* once it has two assessments and a non-zero
+    baseline; response and remission are only counted for followed courses.
+    """
+    return _derived("courses", _courses)
+
+
+def _bands(state: rollups.Snapshot) -> pd.Series:
+    return _derived("courses", _courses, state)["band"].value_counts(sort=False)
+
+
+def severity_bands() -> pd.Series:
+    """Number of courses per severity band of their last score."""
+    return _derived("bands", _bands)
+
+
+def _response(state: rollups.Snapshot) -> dict:
+    df = _derived("courses", _courses, state)
+    followed = int(df["followed"].sum())
+
+    def rate(column):
+        return 100 * int(df[column].sum()) / followed if followed else None
+
+    return {
+        "patients": int(df["user"].nunique()),
+        "courses": len(df),
+        "followed": followed,
+        "response": int(df["response"].sum()),
+        "response_rate": rate("response"),
+        "partial_response": int(df["partial_response"].sum()),
+        "partial_response_rate": rate("partial_response"),
+        "remission": int(df["remission"].sum()),
+        "remission_rate": rate("remission"),
+    }
+
+
+def response_summary() -> dict:
+    """Counts and rates (in % of followed courses) of response and remission."""
+    return _derived("response", _response)
+
+
+def _by_group(state: rollups.Snapshot) -> pd.DataFrame:
+    df = _derived("courses", _courses, state)
+    g = df.groupby("group", observed=True)
+    out = pd.DataFrame({
+        "patients": g["user"].nunique(),
+        "courses": g.size(),
+        "mean_baseline": g["baseline"].mean(),
+        "mean_last": g["last"].mean(),
+        "mean_reduction_pct": g["reduction_pct"].mean(),
+        "followed": g["followed"].sum(),
+        "response": g["response"].sum(),
+        "remission": g["remission"].sum(),
+    })
+    with np.errstate(divide="ignore", invalid="ignore"):
+        out["response_rate"] = 100 * out["response"] / out["followed"].replace(0, np.nan)
+    return out
+
+
+def by_group() -> pd.DataFrame:
+    """Courses, mean scores, response and remission per ``SYMPTOMS`` group."""
+    return _derived("groups", _by_group)
+
+
+def _over_time(state: rollups.Snapshot) -> pd.DataFrame:
+    if not state.monthly:
+        return pd.DataFrame(columns=["results", "suma", "obsessions", "compulsions"], dtype=float)
+    months = sorted(state.monthly)
+    totals = np.array([state.monthly[m] for m in months], dtype=float)
+    n = totals[:, 0]
+    return pd.DataFrame(
+        {
+            "results": n.astype(np.int64),
+            "suma": totals[:, 1] / n,
+            "obsessions": totals[:, 2] / n,
+            "compulsions": totals[:, 3] / n,
+        },
+        index=pd.to_datetime(months, format="%Y-%m"),
+    )
+
+
+def subscales_over_time() -> pd.DataFrame:
+    """Monthly mean total, obsession (q1–q5) and compulsion (q6–q10) scores."""
+    return _derived("over_time", _over_time)
+
+
+def figures() -> dict:
+    """Everything the dashboard shows, from one rollups snapshot."""
+    state = rollups.snapshot()
+    return {
+        "response": _derived("response", _response, state),
+        "bands": _derived("bands", _bands, state),
+        "groups": _derived("groups", _by_group, state),
+        "over_time": _derived("over_time", _over_time, state),
+    }
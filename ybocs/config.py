@@ -0,0 +1,17 @@
+import os
+from pathlib import Path
+
+# All paths are relative to the working directory, like `streamlit run app.py`
+# expects. YBOCS_DATA_DIR lets benchmarks and tools point at a scratch copy.
+DATA_DIR = Path(os.environ.get("YBOCS_DATA_DIR", "data"))
+CREDENTIALS_FILE = Path(os.environ.get("YBOCS_USERS_FILE", "users.yaml"))
+SYMPTOMS_FILE = DATA_DIR / "objawy.json"
+# Per-patient symptom files of older versions, migrated into SYMPTOMS_FILE.
+USER_STORE = DATA_DIR / "users"
+RESULTS_FILE = DATA_DIR / "wyniki.csv"
+ARCHIVE_DIR = DATA_DIR / "archive"
+REPORTS_DIR = DATA_DIR / "reports"
+
+
+def ensure_dirs():
+    DATA_DIR.mkdir(parents=True, exist_ok=True)
@@ -0,0 +1,170 @@
+"""Credential repository: ``users.yaml`` plus a record-level journal.
+
+Accounts live in a process-wide ``journal.JournaledMap``: creating a
+patient or resetting a password appends one JSON line to
+``users.yaml.journal`` instead of rewriting the YAML file, and
+``users.yaml`` itself is parsed only when it changes. Journal lines are
+field merges (``{"login": ..., "fields": {...}}``).
+"""
+import copy
+from typing import NamedTuple
+
+import yaml
+from yaml.loader import SafeLoader
+
+from . import writer
+from .config import CREDENTIALS_FILE
+from .journal import JournaledMap
+
+COMPACT_AFTER = 500
+
+
+class _Accounts(JournaledMap):
+    # Journal entries are field merges: {"login": ..., "fields": {...}}.
+
+    def __init__(self):
+        super().__init__(CREDENTIALS_FILE, COMPACT_AFTER)
+        self.lower = {}
+        self.extra = {}
+
+    def load_base(self) -> dict:
+        try:
+            with open(self.base_file, "r", encoding="utf-8") as f:
+                config = yaml.load(f, Loader=SafeLoader) or {}
+        except FileNotFoundError:
+            config = {}
+        users = dict(config.get("credentials", {}).get("usernames") or {})
+        self.lower = {login.lower(): login for login in users}
+        self.extra = {k: v for k, v in config.items() if k != "credentials"}
+        return users
+
+    def dump_base(self) -> bytes:
+        config = dict(self.extra, credentials={"usernames": copy.deepcopy(self.records)})
+        return yaml.safe_dump(config, allow_unicode=True, sort_keys=False).encode("utf-8")
+
+    def apply(self, entry: dict):
+        login = entry["login"]
+        self.records.setdefault(login, {}).update(entry["fields"])
+        self.lower[login.lower()] = login
+
+
+_index = _Accounts()
+JOURNAL_FILE = _index.journal_file
+
+
+def resolve_login(login: str):
+    """Stored spelling of ``login``; streamlit-authenticator lowercases it."""
+    _index.refresh()
+    if login in _index.records:
+        return login
+    return _index.lower.get(login.lower()) if login else None
+
+
+def get_user(login: str) -> dict:
+    stored = resolve_login(login)
+    return dict(_index.records[stored]) if stored is not None else {}
+
+
+def load_credentials() -> dict:
+    """Config for ``stauth.Authenticate``; a copy the caller may modify.
+
+    Only the per-account dicts are copied (streamlit-authenticator writes
+    login state into them); nothing is parsed unless a file changed.
+    """
+    _index.refresh()
+    with _index.lock:
+        config = copy.deepcopy(_index.extra)
+        config["credentials"] = {"usernames": {login: dict(rec) for login, rec in _index.records.items()}}
+    return config
+
+
+def accounts() -> list:
+    """``(login, record)`` pairs sorted by login; shared, do not modify."""
+    _index.refresh()
+    return _index.derived("accounts", lambda: sorted(_index.records.items()))
+
+
+def patients() -> list:
+    """``(login, name)`` of accounts with the ``user`` role, sorted by login."""
+    _index.refresh()
+    return _index.derived(
+        "patients",
+        lambda: [(login, rec.get("name", login)) for login, rec in accounts() if rec.get("role", "user") == "user"],
+    )
+
+
+def patient_choices() -> dict:
+    """``{"<name> (<login>)": login}`` of all patients, for pickers; shared."""
+    _index.refresh()
+    return _index.derived("patient_choices", lambda: {f"{name} ({login})": login for login, name in patients()})
+
+
+class AccountRow(NamedTuple):
+    login: str
+    name: str
+    role: str
+    password_set: bool
+
+
+ACCOUNT_SORT_KEYS = {
+    "login": lambda r: (r.login.casefold(), r.login),
+    "name": lambda r: (r.name.casefold(), r.login.casefold()),
+    "role": lambda r: (r.role, r.login.casefold()),
+}
+
+
+def _rows_by_login() -> list:
+    return sorted(
+        (
+            AccountRow(login, rec.get("name", ""), rec.get("role", "user"), not rec.get("force_password_reset"))
+            for login, rec in _index.records.items()
+        ),
+        key=ACCOUNT_SORT_KEYS["login"],
+    )
+
+
+def account_rows(sort: str = "login") -> list:
+    """``AccountRow`` of every account, ordered by ``sort`` (a key of
+    ``ACCOUNT_SORT_KEYS``); each order is built once per change."""
+    _index.refresh()
+    if sort == "login":
+        return _index.derived("rows:login", _rows_by_login)
+    return _index.derived(f"rows:{sort}", lambda: sorted(account_rows("login"), key=ACCOUNT_SORT_KEYS[sort]))
+
+
+def search_accounts(text: str = "", prefix: bool = False, sort: str = "login") -> list:
+    """Accounts whose login or name contains ``text`` (or starts with it if
+    ``prefix``), case-insensitively, ordered by ``sort``."""
+    rows = account_rows(sort)
+    needle = text.strip().casefold()
+    if not needle:
+        return rows
+    folded = _index.derived(f"folded:{sort}", lambda: [(r.login.casefold(), r.name.casefold()) for r in rows])
+    if prefix:
+        return [r for r, (login, name) in zip(rows, folded) if login.startswith(needle) or name.startswith(needle)]
+    return [r for r, (login, name) in zip(rows, folded) if needle in login or needle in name]
+
+
+def _journal(login: str, fields: dict, must_exist: bool):
+    def append():
+        _index.refresh(force=True)
+        stored = resolve_login(login)
+        if must_exist and stored is None:
+            raise KeyError(login)
+        if not must_exist and stored is not None:
+            raise ValueError("Taki login już istnieje.")
+        _index.append({"login": stored or login, "fields": fields})
+
+    # The journal lock covers the existence check and the append, so two
+    # admins cannot create the same login; other replicas see it at once.
+    writer.run_serialized(append, lock=JOURNAL_FILE)
+
+
+def add_user(login: str, record: dict):
+    """Create an account; ``ValueError`` if the login (any case) is taken."""
+    _journal(login, record, must_exist=False)
+
+
+def update_user(login: str, **fields):
+    """Change some fields of an existing account (``KeyError`` if missing)."""
+    _journal(login, fields, must_exist=True)
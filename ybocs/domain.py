@@ -0,0 +1,283 @@
+"""Clinical content of the app: the symptom checklist and the Y-BOCS items."""
+from functools import lru_cache
+from typing import NamedTuple
+
+# List of symptoms (Polish), grouped as on the Y-BOCS symptom checklist.
+SYMPTOMS = {
+    "Obsesje agresywne": [
+        "Lęk, że może skrzywdzić siebie",
+        "Lęk, że może skrzywdzić innych",
+        "Obrazy przemocy lub okrucieństwa",
+        "Lęk przed wypowiedzeniem obscenicznych słów lub obelg",
+        "Lęk przed zrobieniem czegoś kompromitującego",
+        "Lęk, że zrealizuje niechciane impulsy (np. dźgnięcie przyjaciela)",
+        "Lęk, że coś ukradnie",
+        "Lęk, że skrzywdzi innych przez nieuwagę (np. potrąci kogoś i odjedzie)",
+        "Lęk, że będzie odpowiedzialny za nieszczęście (np. pożar, włamanie)",
+        "Inne (dopisz w polu poniżej)"
+    ],
+    "Obsesje kontaminacyjne (zanieczyszczenia)": [
+        "Obrzydzenie dot. wydzielin ciała (mocz, kał, ślina)",
+        "Lęk przed brudem lub zarazkami",
+        "Nadmierny lęk przed zanieczyszczeniami środowiskowymi",
+        "Nadmierny lęk przed środkami domowymi (detergenty, rozpuszczalniki)",
+        "Nadmierny lęk przed zwierzętami (np. owady)",
+        "Niepokój przy kontakcie z lepkimi substancjami",
+        "Lęk, że zachoruje przez kontakt z zanieczyszczeniem",
+        "Lęk, że zarazi innych przez rozprzestrzenienie zanieczyszczenia",
+        "Brak lęku dot. konsekwencji poza samym uczuciem nieczystości",
+        "Inne (dopisz w polu poniżej)"
+    ],
+    "Obsesje seksualne": [
+        "Zakazane/dewiacyjne treści seksualne (myśli/obrazy/impulsy)",
+        "Treści dotyczące dzieci lub kazirodztwa",
+        "Treści dotyczące homoseksualizmu",
+        "Myśli o zachowaniach seksualnych wobec innych",
+        "Inne (dopisz w polu poniżej)"
+    ],
+    "Obsesje somatyczne i gromadzenie": [
+        "Lęk przed chorobą",
+        "Nadmierna troska o wygląd/część ciała (dysmorfofobia)",
+        "Potrzeba gromadzenia/oszczędzania",
+        "Inne (dopisz w polu poniżej)"
+    ],
+    "Kompulsje czyszczenia/mycia": [
+        "Nadmierne/zrytualizowane mycie rąk",
+        "Nadmierne/zrytualizowane kąpiele, higiena, toaleta",
+        "Czyszczenie przedmiotów/innych rzeczy",
+        "Unikanie/środki by nie mieć kontaktu z zanieczyszczeniami",
+        "Inne (dopisz w polu poniżej)"
+    ],
+    "Kompulsje sprawdzania": [
+        "Sprawdzanie zamków, kuchenki, urządzeń",
+        "Czy nie skrzywdził/nie skrzywdzi innych",
+        "Czy nie skrzywdził/nie skrzywdzi siebie",
+        "Czy nie wydarzyło się/nie wydarzy się coś strasznego",
+        "Czy nie popełnił błędu",
+        "Sprawdzanie związane z obsesjami somatycznymi",
+        "Inne (dopisz w polu poniżej)"
+    ],
+    "Rytyny powtarzania/liczenia/porządkowania": [
+        "Ponowne czytanie lub przepisywanie",
+        "Powtarzanie czynności rutynowych",
+        "Liczenie",
+        "Porządkowanie/układanie",
+        "Inne (dopisz w polu poniżej)"
+    ],
+    "Obsesje religijne/symetria/inne": [
+        "Lęk przed świętokradztwem i bluźnierstwem",
+        "Nadmierny niepokój moralny",
+        "Potrzeba symetrii/dokładności z myśleniem magicznym",
+        "Potrzeba symetrii/dokładności bez myślenia magicznego",
+        "Potrzeba wiedzieć/pamiętać, lęk przed zgubieniem rzeczy",
+        "Natrętne obrazy, dźwięki, słowa, melodie",
+        "Drażliwość na dźwięki, liczby, kolory, przesądy",
+        "Inne (dopisz w polu poniżej)"
+    ],
+    "Kompulsje różne": [
+        "Rytuały umysłowe",
+        "Nadmierne sporządzanie list",
+        "Potrzeba mówienia/pytania/wyznawania",
+        "Potrzeba dotykania/stukania/pocierania",
+        "Rytuały mrugania/wpatrywania",
+        "Środki zapobiegawcze (krzywda sobie/innym/katastrofa – nie sprawdzanie)",
+        "Zrytualizowane zachowania przy jedzeniu",
+        "Zachowania przesądne",
+        "Trichotillomania",
+        "Inne zachowania samouszkadzające",
+        "Inne (dopisz w polu poniżej)"
+    ]
+}
+
+# Y-BOCS items (Polish)
+YBOCS_ITEMS = [
+    ("Czas zajmowany przez myśli natrętne", [
+        "Brak",
+        "Mniej niż 1 godz./dobę lub sporadycznie",
+        "1–3 godz./dobę lub często",
+        "Ponad 3 do 8 godz./dobę lub bardzo często",
+        "Ponad 8 godz./dobę lub prawie stale",
+    ]),
+    ("Interferencja z powodu myśli natrętnych", [
+        "Brak",
+        "Niewielka – funkcjonowanie zasadniczo nieupośledzone",
+        "Wyraźna – ale da się funkcjonować",
+        "Znaczne upośledzenie funkcjonowania",
+        "Uniemożliwia funkcjonowanie",
+    ]),
+    ("Distress związany z myślami natrętnymi", [
+        "Brak",
+        "Niewielki – mało dokuczliwy",
+        "Dokuczliwy, ale do opanowania",
+        "Bardzo dokuczliwy",
+        "Prawie stały i obezwładniający",
+    ]),
+    ("Opór wobec obsesji (wysiłek, by się im oprzeć)", [
+        "Zawsze stara się opierać",
+        "Najczęściej stara się opierać",
+        "Czasem podejmuje wysiłek",
+        "Ulega wszystkim obsesjom, z pewną niechęcią",
+        "Całkowicie i chętnie ulega obsesjom",
+    ]),
+    ("Kontrola nad myślami natrętnymi", [
+        "Pełna kontrola",
+        "Zwykle potrafi zatrzymać/przełączyć myśli",
+        "Czasem potrafi zatrzymać/przełączyć",
+        "Rzadko skuteczny, z trudem",
+        "Brak kontroli, myśli całkowicie mimowolne",
+    ]),
+    ("Czas poświęcony kompulsjom", [
+        "Brak",
+        "Mniej niż 1 godz./dobę lub sporadycznie",
+        "1–3 godz./dobę lub często",
+        "Ponad 3 do 8 godz./dobę lub bardzo często",
+        "Ponad 8 godz./dobę lub prawie stale",
+    ]),
+    ("Interferencja z powodu kompulsji", [
+        "Brak",
+        "Niewielka – funkcjonowanie zasadniczo nieupośledzone",
+        "Wyraźna – ale do opanowania",
+        "Znaczne upośledzenie funkcjonowania",
+        "Uniemożliwia funkcjonowanie",
+    ]),
+    ("Distress przy przerwaniu kompulsji", [
+        "Brak",
+        "Niewielki – przy lekkim ograniczeniu",
+        "Narasta, ale do opanowania",
+        "Znaczny i bardzo dokuczliwy",
+        "Obezwładniający lęk",
+    ]),
+    ("Opór wobec kompulsji", [
+        "Zawsze próbuje się opierać",
+        "Najczęściej próbuje się opierać",
+        "Czasem podejmuje wysiłek",
+        "Ulega prawie wszystkim kompulsjom z niechęcią",
+        "Całkowicie i chętnie ulega kompulsjom",
+    ]),
+    ("Kontrola nad kompulsjami", [
+        "Pełna kontrola",
+        "Presja, ale zwykle potrafi kontrolować",
+        "Silna presja, kontrola z trudnością",
+        "Bardzo silny przymus, musi dokończyć; potrafi jedynie odwlec",
+        "Brak kontroli, przymus całkowicie mimowolny",
+    ]),
+]
+
+
+def symptom_label(raw: str) -> str:
+    """Readable form of a stored symptom key (``group:item`` or ``group:INNE:text``)."""
+    try:
+        grp, it = raw.split(":", 1)
+        if it.startswith("INNE:"):
+            return f"{grp} – {it[5:]}"
+        return f"{grp} – {it}"
+    except ValueError:
+        return raw
+
+
+# ---------- Compiled checklist ----------
+# Stored symptom keys are "<group>:<item>", or "<group>:INNE:<text>" for a
+# free-text entry under the group's "Inne" item.
+OTHER_ITEM = "Inne (dopisz w polu poniżej)"
+
+
+class SymptomItem(NamedTuple):
+    id: int
+    label: str
+    key: str
+    is_other: bool
+
+
+class SymptomGroup(NamedTuple):
+    id: int
+    name: str
+    items: tuple
+    other_key: str
+    custom_prefix: str
+
+
+class Selection(NamedTuple):
+    """Stored symptom keys split by checklist group."""
+
+    by_group: dict  # group name -> frozenset of keys
+    custom_text: dict  # group name -> text of its first "INNE:" entry
+
+
+def _compile() -> tuple:
+    groups = []
+    for gid, (name, items) in enumerate(SYMPTOMS.items()):
+        groups.append(SymptomGroup(
+            id=gid,
+            name=name,
+            items=tuple(
+                SymptomItem(id=iid, label=it, key=f"{name}:{it}", is_other=it == OTHER_ITEM)
+                for iid, it in enumerate(items)
+            ),
+            other_key=f"{name}:{OTHER_ITEM}",
+            custom_prefix=f"{name}:INNE:",
+        ))
+    return tuple(groups)
+
+
+CATALOG = _compile()
+
+
+@lru_cache(maxsize=1024)
+def split_selection(keys: frozenset) -> Selection:
+    """Group stored keys in one pass; cached, as stored lists rarely change."""
+    by_group, custom = {}, {}
+    for key in sorted(keys):
+        group, _, rest = key.partition(":")
+        by_group.setdefault(group, set()).add(key)
+        if rest.startswith("INNE:") and group not in custom:
+            custom[group] = rest[5:]
+    return Selection({g: frozenset(k) for g, k in by_group.items()}, custom)
+
+
+# ---------- Symptoms written by hand (imports) ----------
+_DASHES = str.maketrans({"–": "-", "—": "-"})
+
+
+def _normalized(text: str) -> str:
+    return " ".join(text.translate(_DASHES).split()).casefold()
+
+
+@lru_cache(maxsize=1)
+def _symptom_index() -> tuple:
+    """``({normalized key, label or unique item: key}, {normalized group: group})``."""
+    index, items = {}, {}
+    for group in CATALOG:
+        for item in group.items:
+            index[_normalized(item.key)] = item.key
+            index[_normalized(symptom_label(item.key))] = item.key
+            items.setdefault(_normalized(item.label), set()).add(item.key)
+    for text, keys in items.items():
+        if len(keys) == 1:
+            index.setdefault(text, next(iter(keys)))
+    return index, {_normalized(g.name): g.name for g in CATALOG}
+
+
+@lru_cache(maxsize=4096)
+def symptom_key(text: str):
+    """Stored key of a symptom written as a key, a label (``group – item``)
+    or an item found in one group only; ``None`` if it cannot be placed.
+
+    Any other text under a known group (``group: text``, ``group – text``,
+    ``group:INNE:text``) becomes that group's free-text ``INNE:`` entry.
+    """
+    text = text.strip()
+    index, groups = _symptom_index()
+    key = index.get(_normalized(text))
+    if key is not None:
+        return key
+    for separator in (":", " – ", " - "):
+        group, found, rest = text.partition(separator)
+        group = groups.get(_normalized(group)) if found else None
+        if group is None:
+            continue
+        rest = rest.strip()
+        if rest[:5].upper() == "INNE:":
+            rest = rest[5:].strip()
+        if rest:
+            return f"{group}:INNE:{rest}"
+    return None
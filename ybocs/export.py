@@ -0,0 +1,107 @@
+"""Chunked export of results to CSV, gzip/zip-compressed CSV or Parquet.
+
+Exports take an iterable of typed result frames (a filtered view, or
+``storage.iter_results`` for everything) and write them ``CHUNK_ROWS`` rows
+at a time straight into the compressor, so the uncompressed text of the
+whole dataset never exists in memory. Only the finished, compressed file is
+kept; past ``SPOOL_BYTES`` it moves to a temporary file on disk while being
+written. ``st.download_button`` holds the whole download in memory, so
+``export_file`` returns it as bytes: peak memory is about the compressed
+size, not the raw one.
+"""
+import csv
+import gzip
+import io
+import tempfile
+import zipfile
+
+from .schema import RESULTS_COLUMNS, arrow_schema, concat_results, results_text
+
+CHUNK_ROWS = 50_000
+SPOOL_BYTES = 16 * 1024 * 1024
+# zlib level for gzip/zip; 9 (gzip's default) is several times slower for
+# a few percent smaller files.
+COMPRESS_LEVEL = 6
+
+# format -> (label, file extension, MIME type)
+FORMATS = {
+    "csv": ("CSV", "csv", "text/csv"),
+    "csv.gz": ("CSV (gzip)", "csv.gz", "application/gzip"),
+    "zip": ("CSV (zip)", "zip", "application/zip"),
+    "parquet": ("Parquet", "parquet", "application/vnd.apache.parquet"),
+}
+
+
+def _chunks(frames):
+    """Re-cut ``frames`` into pieces of about ``CHUNK_ROWS`` rows.
+
+    Archive partitions are often tiny (one patient-month); formatting each
+    one separately would cost far more than the rows themselves.
+    """
+    pending, size = [], 0
+    for df in frames:
+        for i in range(0, len(df), CHUNK_ROWS):
+            piece = df.iloc[i:i + CHUNK_ROWS]
+            pending.append(piece)
+            size += len(piece)
+            if size >= CHUNK_ROWS:
+                yield concat_results(pending)
+                pending, size = [], 0
+    if pending:
+        yield concat_results(pending)
+
+
+def _write_csv(frames, raw):
+    text = io.TextIOWrapper(raw, encoding="utf-8", newline="")
+    writer = csv.writer(text, lineterminator="\n")
+    writer.writerow(RESULTS_COLUMNS)
+    for chunk in _chunks(frames):
+        results_text(chunk).to_csv(text, header=False, index=False, lineterminator="\n")
+    text.flush()
+    text.detach()
+
+
+def _write_parquet(frames, raw):
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    schema = arrow_schema()
+    with pq.ParquetWriter(raw, schema, compression="zstd") as writer:
+        for chunk in _chunks(frames):
+            # Category columns become plain strings: each chunk has its own
+            # categories, but every row group must share one schema.
+            table = pa.Table.from_pandas(chunk[RESULTS_COLUMNS], preserve_index=False)
+            writer.write_table(table.cast(schema), row_group_size=CHUNK_ROWS)
+
+
+def write_export(frames, fmt: str, out, name: str = "wyniki_ocd"):
+    """Write ``frames`` to the binary file ``out`` in format ``fmt``."""
+    if fmt == "csv":
+        _write_csv(frames, out)
+    elif fmt == "csv.gz":
+        with gzip.GzipFile(f"{name}.csv", "wb", COMPRESS_LEVEL, fileobj=out, mtime=0) as gz:
+            _write_csv(frames, gz)
+    elif fmt == "zip":
+        with zipfile.ZipFile(out, "w", zipfile.ZIP_DEFLATED, compresslevel=COMPRESS_LEVEL) as zf:
+            with zf.open(f"{name}.csv", "w", force_zip64=True) as member:
+                _write_csv(frames, member)
+    elif fmt == "parquet":
+        _write_parquet(frames, out)
+    else:
+        raise ValueError(f"Unknown export format: {fmt!r}")
+
+
+def export_file(frames, fmt: str, name: str = "wyniki_ocd") -> bytes:
+    """Contents of the exported file, as ``st.download_button`` takes them."""
+    with tempfile.SpooledTemporaryFile(max_size=SPOOL_BYTES) as out:
+        write_export(frames, fmt, out, name)
+        out.seek(0)
+        return out.read()
+
+
+def file_name(fmt: str, name: str = "wyniki_ocd") -> str:
+    return f"{name}.{FORMATS[fmt][1]}"
+
+
+def mime_type(fmt: str) -> str:
+    return FORMATS[fmt][2]
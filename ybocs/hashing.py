@@ -0,0 +1,168 @@
+"""bcrypt hashing and verification in a bounded process pool.
+
+bcrypt at cost 12 takes hundreds of milliseconds of CPU. Run inline, it ties
+up the script thread of the session and competes with every other session
+for the server's CPU; during a morning login rush the server serializes on
+it. Here the work goes to a small pool of worker processes:
+
+* at most ``MAX_PENDING`` requests may be queued or running; beyond that a
+  caller waits up to ``ADMIT_TIMEOUT`` seconds for a slot and then gets
+  ``HashingBusy`` (back-pressure instead of an ever-growing queue);
+* every request has a ``TIMEOUT``, after which ``HashingBusy`` is raised too;
+* successful verifications are remembered per process, keyed by an HMAC
+  of the stored hash and the password under a random per-process key, so a
+  session that logs in again with the same password skips bcrypt.
+
+``install()`` points ``streamlit_authenticator.Hasher`` at this module so
+login verification goes through the pool as well.
+"""
+import hashlib
+import hmac
+import os
+import secrets
+import threading
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeout
+from concurrent.futures.process import BrokenProcessPool
+
+import bcrypt
+
+from . import metrics
+from .pools import spawn_pool
+
+# 0 runs bcrypt inline (tools and benchmarks that do not want a pool).
+WORKERS = int(os.environ.get("YBOCS_HASH_WORKERS", min(4, os.cpu_count() or 1)))
+MAX_PENDING = int(os.environ.get("YBOCS_HASH_MAX_PENDING", max(1, WORKERS) * 8))
+TIMEOUT = float(os.environ.get("YBOCS_HASH_TIMEOUT", "10"))
+ADMIT_TIMEOUT = float(os.environ.get("YBOCS_HASH_ADMIT_TIMEOUT", "5"))
+VERIFIED_TTL = 15 * 60
+VERIFIED_MAX = 4096
+
+
+class HashingBusy(RuntimeError):
+    """The pool is saturated; the caller should retry later."""
+
+
+def _hash(password: str) -> str:
+    return bcrypt.hashpw(password.encode(), bcrypt.gensalt()).decode()
+
+
+def _check(password: str, hashed: str) -> bool:
+    return bcrypt.checkpw(password.encode(), hashed.encode())
+
+
+_lock = threading.Lock()
+_pool = None
+_pool_pid = None
+_slots = threading.BoundedSemaphore(MAX_PENDING)
+_pending = 0
+_latencies = deque(maxlen=1024)
+_counters = {"submitted": 0, "rejected": 0, "timeouts": 0, "verified_cache_hits": 0}
+
+_verified_key = secrets.token_bytes(32)
+_verified = OrderedDict()
+
+
+def _start_pool() -> ProcessPoolExecutor:
+    return spawn_pool(WORKERS)
+
+
+def _get_pool():
+    global _pool, _pool_pid
+    with _lock:
+        if _pool is None or _pool_pid != os.getpid():
+            _pool = _start_pool()
+            _pool_pid = os.getpid()
+        return _pool
+
+
+def _discard_pool(pool):
+    global _pool
+    with _lock:
+        if _pool is pool:
+            _pool = None
+    pool.shutdown(wait=False, cancel_futures=True)
+
+
+def _run(fn, *args):
+    global _pending
+    if not _slots.acquire(timeout=ADMIT_TIMEOUT):
+        with _lock:
+            _counters["rejected"] += 1
+        raise HashingBusy("Too many password operations in progress")
+    with _lock:
+        _pending += 1
+        _counters["submitted"] += 1
+    start = time.perf_counter()
+    try:
+        if WORKERS == 0:
+            return fn(*args)
+        pool = _get_pool()
+        try:
+            return pool.submit(fn, *args).result(timeout=TIMEOUT)
+        except FutureTimeout:
+            with _lock:
+                _counters["timeouts"] += 1
+            raise HashingBusy("Password operation timed out") from None
+        except BrokenProcessPool:
+            _discard_pool(pool)
+            raise HashingBusy("Password worker died") from None
+    finally:
+        elapsed = time.perf_counter() - start
+        with _lock:
+            _pending -= 1
+            _latencies.append(elapsed)
+        _slots.release()
+
+
+def hash_password(password: str) -> str:
+    return _run(_hash, password)
+
+
+def _verified_token(password: str, hashed: str) -> bytes:
+    return hmac.new(_verified_key, f"{hashed}\0{password}".encode(), hashlib.sha256).digest()
+
+
+def check_password(password: str, hashed: str) -> bool:
+    token = _verified_token(password, hashed)
+    now = time.monotonic()
+    with _lock:
+        seen = _verified.get(token)
+        if seen is not None and now - seen < VERIFIED_TTL:
+            _counters["verified_cache_hits"] += 1
+            return True
+    ok = _run(_check, password, hashed)
+    if ok:
+        with _lock:
+            _verified[token] = now
+            _verified.move_to_end(token)
+            while len(_verified) > VERIFIED_MAX:
+                _verified.popitem(last=False)
+    return ok
+
+
+def install():
+    """Route streamlit_authenticator's password checks through the pool."""
+    from streamlit_authenticator.utilities.hasher import Hasher
+
+    Hasher.check_pw = classmethod(lambda cls, password, hashed: check_password(password, hashed))
+    Hasher.hash = classmethod(lambda cls, password: hash_password(password))
+
+
+def stats() -> dict:
+    with _lock:
+        latencies = sorted(_latencies)
+        out = dict(_counters, pending=_pending, workers=WORKERS, max_pending=MAX_PENDING)
+    if latencies:
+        out["latency_ms"] = {
+            "count": len(latencies),
+            "p50": round(latencies[len(latencies) // 2] * 1000, 1),
+            "p99": round(latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))] * 1000, 1),
+            "max": round(latencies[-1] * 1000, 1),
+        }
+    return out
+
+
+metrics.register("hashing", stats)
@@ -0,0 +1,285 @@
+"""Bulk import of historical Y-BOCS results (paper records, spreadsheets).
+
+``import_results`` streams a CSV or XLSX file ``CHUNK_ROWS`` rows at a time.
+Every chunk is checked vectorized (``schema.check_results``), logins are
+matched to accounts and symptoms to ``SYMPTOMS`` keys
+(``domain.symptom_key``), and rows already stored — or seen earlier in the
+same file — are skipped by (user, objaw, timestamp). Accepted rows are
+appended to the log ``BATCH_ROWS`` at a time, one write per batch; rejected
+rows go to a CSV file with their line number and the reason.
+
+An interrupted import can simply be run again: the rows it committed are
+recognized as duplicates. From the command line::
+
+    python -m ybocs.importer wyniki_archiwalne.xlsx
+"""
+import csv
+import io
+import os
+from datetime import date, datetime
+from typing import NamedTuple
+
+import numpy as np
+import pandas as pd
+
+from . import archive, storage
+from .credentials import resolve_login
+from .domain import symptom_key
+from .schema import QUESTION_COLUMNS, RESULTS_COLUMNS, check_results, concat_results
+
+CHUNK_ROWS = 50_000
+BATCH_ROWS = 200_000
+REQUIRED_COLUMNS = ["date", "user", "objaw"] + QUESTION_COLUMNS
+# Other accepted column headers (compared case-insensitively).
+COLUMN_ALIASES = {
+    "data": "date",
+    "czas": "timestamp",
+    "login": "user",
+    "pacjent": "user",
+    "rola": "role",
+}
+
+
+class ImportReport(NamedTuple):
+    read: int
+    imported: int
+    duplicates: int
+    rejected: int
+
+
+def _column(name) -> str:
+    name = str(name).strip().casefold()
+    return COLUMN_ALIASES.get(name, name)
+
+
+def _cell_text(value):
+    if value is None:
+        return None
+    if isinstance(value, datetime):
+        return value.isoformat(timespec="seconds") if value.time() != datetime.min.time() else value.date().isoformat()
+    if isinstance(value, date):
+        return value.isoformat()
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    text = str(value).strip()
+    return text or None
+
+
+def _xlsx_chunks(source):
+    try:
+        from openpyxl import load_workbook
+    except ImportError:
+        raise ValueError("Import z plików XLSX wymaga pakietu openpyxl (pip install openpyxl).") from None
+    book = load_workbook(source, read_only=True, data_only=True)
+    try:
+        rows = book.active.iter_rows(values_only=True)
+        header = [_cell_text(h) or "" for h in next(rows, ())]
+        batch, start = [], 0
+        for row in rows:
+            cells = [_cell_text(v) for v in row[:len(header)]]
+            if any(c is not None for c in cells):
+                batch.append(cells)
+            if len(batch) == CHUNK_ROWS:
+                yield pd.DataFrame(batch, columns=header, index=range(start, start + len(batch)))
+                batch, start = [], start + len(batch)
+        if batch:
+            yield pd.DataFrame(batch, columns=header, index=range(start, start + len(batch)))
+    finally:
+        book.close()
+
+
+def _csv_chunks(source):
+    if hasattr(source, "read"):
+        sample = source.read(65536)
+        source.seek(0)
+    else:
+        with open(source, "rb") as f:
+            sample = f.read(65536)
+    lines = sample.decode("utf-8-sig", errors="replace").splitlines()
+    try:
+        # Spreadsheets saved with a Polish locale use ";".
+        sep = csv.Sniffer().sniff(lines[0], delimiters=",;\t").delimiter
+    except (csv.Error, IndexError):
+        sep = ","
+    yield from pd.read_csv(
+        source, sep=sep, dtype=str, chunksize=CHUNK_ROWS, encoding="utf-8-sig",
+        keep_default_na=False, na_values=[""], skipinitialspace=True,
+    )
+
+
+def read_chunks(source, name: str = None):
+    """Raw (text) frames of a CSV or XLSX file; index = data row number from 0."""
+    name = str(name or getattr(source, "name", source)).lower()
+    if name.endswith((".xlsx", ".xlsm")):
+        return _xlsx_chunks(source)
+    return _csv_chunks(source)
+
+
+def _prepare(raw: pd.DataFrame) -> pd.DataFrame:
+    """Raw chunk in the columns of the results log; defaults filled in."""
+    raw = raw.rename(columns=_column)
+    missing = [c for c in REQUIRED_COLUMNS if c not in raw]
+    if missing:
+        raise ValueError(f"Brak kolumn: {', '.join(missing)}")
+    out = raw.reindex(columns=RESULTS_COLUMNS)
+    # Paper records have a date only.
+    out["timestamp"] = out["timestamp"].fillna(out["date"])
+    out["user"] = out["user"].str.strip()
+    out["role"] = out["role"].fillna("user")
+    if "suma" not in raw:
+        out["suma"] = raw[QUESTION_COLUMNS].apply(pd.to_numeric, errors="coerce").sum(axis=1, min_count=len(QUESTION_COLUMNS))
+    return out
+
+
+def check_rows(prepared: pd.DataFrame) -> tuple:
+    """``check_results`` plus the account and symptom lookups.
+
+    Returns ``(typed, reasons)`` like ``check_results``; in the typed rows
+    logins are the stored account names and symptoms ``SYMPTOMS`` keys.
+    """
+    typed, reasons = check_results(prepared)
+    users = typed["user"].astype(object).map({u: resolve_login(u) for u in typed["user"].cat.categories})
+    objawy = typed["objaw"].astype(object)
+    objawy = objawy.map({o: symptom_key(o) for o in typed["objaw"].cat.categories})
+    problems = np.select(
+        [users.isna().to_numpy(), typed["objaw"].isna().to_numpy(), objawy.isna().to_numpy()],
+        ["user: unknown account", "objaw: missing", "objaw: unknown symptom"],
+        default="",
+    )
+    bad = problems != ""
+    if bad.any():
+        reasons = pd.concat([reasons, pd.Series(problems[bad], index=typed.index[bad], dtype=object)])
+        typed, users, objawy = typed[~bad], users[~bad], objawy[~bad]
+    typed = typed.assign(
+        user=users.astype("category"),
+        objaw=objawy.astype("category"),
+        # The log keeps whole seconds; so must the duplicate check.
+        timestamp=typed["timestamp"].dt.floor("s"),
+    )
+    return typed, reasons.sort_index()
+
+
+class KnownRows:
+    """Hashes of the (user, objaw, timestamp) already stored or accepted.
+
+    Stored rows are looked up once per patient, the first time the file
+    mentions them: their archive partitions plus their rows in the log.
+    """
+
+    def __init__(self):
+        self.users = set()
+        self.keys = np.empty(0, dtype=np.uint64)
+
+    def add(self, keys: np.ndarray):
+        self.keys = np.concatenate([self.keys, keys])
+
+    def load(self, users):
+        new = set(users) - self.users
+        if not new:
+            return
+        found = [archive.row_keys(rows) for rows in archive.scan_users(new)]
+        delta = storage.load_delta()
+        found.append(archive.row_keys(delta[delta["user"].isin(new)]))
+        self.users |= new
+        self.add(np.concatenate(found))
+
+
+class _Rejects:
+    """CSV of the rejected rows as read, with line number and reason."""
+
+    def __init__(self, target):
+        self.target = target
+        self.text = None
+
+    def write(self, raw: pd.DataFrame, reasons: pd.Series):
+        if self.target is None or reasons.empty:
+            return
+        rows = raw.loc[reasons.index].assign(line=reasons.index + 2, reason=reasons)
+        header = self.text is None
+        if header:
+            out = open(self.target, "wb") if isinstance(self.target, (str, os.PathLike)) else self.target
+            self.text = io.TextIOWrapper(out, encoding="utf-8", newline="")
+        rows.to_csv(self.text, header=header, index=False, lineterminator="\n")
+
+    def close(self):
+        if self.text is not None:
+            self.text.flush()
+            if isinstance(self.target, (str, os.PathLike)):
+                self.text.close()
+            else:
+                self.text.detach()
+
+
+def import_results(source, rejects=None, progress=None, name: str = None) -> ImportReport:
+    """Import a CSV or XLSX file (a path or a binary file object).
+
+    Required columns: ``date`` (ISO, ``RRRR-MM-DD``), ``user`` (login),
+    ``objaw`` and ``q1``–``q10``; ``timestamp`` (defaults to the date),
+    ``role`` and ``suma`` (checked if given) are optional. ``rejects`` (a
+    path or a binary file object) receives the rejected rows; ``progress``
+    is called with an ``ImportReport`` after every chunk and commit.
+    """
+    known = KnownRows()
+    out = _Rejects(rejects)
+    pending, report = [], ImportReport(0, 0, 0, 0)
+
+    def commit(report):
+        rows = concat_results(pending)
+        storage.append_frame(rows)
+        pending.clear()
+        return report._replace(imported=report.imported + len(rows))
+
+    try:
+        for raw in read_chunks(source, name):
+            typed, reasons = check_rows(_prepare(raw))
+            known.load(typed["user"].cat.categories)
+            keys = archive.row_keys(typed)
+            duplicate = np.isin(keys, known.keys) | pd.Series(keys).duplicated().to_numpy()
+            known.add(keys[~duplicate])
+            accepted = typed[~duplicate]
+            if not accepted.empty:
+                pending.append(accepted)
+            out.write(raw, reasons)
+            report = report._replace(
+                read=report.read + len(raw),
+                duplicates=report.duplicates + int(duplicate.sum()),
+                rejected=report.rejected + len(reasons),
+            )
+            if sum(len(p) for p in pending) >= BATCH_ROWS:
+                report = commit(report)
+            if progress is not None:
+                progress(report)
+        if pending:
+            report = commit(report)
+            if progress is not None:
+                progress(report)
+    finally:
+        out.close()
+    return report
+
+
+def main(argv=None):
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Import historical Y-BOCS results from a CSV or XLSX file.")
+    parser.add_argument("file")
+    parser.add_argument("--rejects", help="CSV file for rejected rows (default: <file>.rejected.csv)")
+    parser.add_argument("--compact", action="store_true", help="fold the results log into the archive afterwards")
+    args = parser.parse_args(argv)
+    rejects = args.rejects or f"{args.file}.rejected.csv"
+
+    def show(r: ImportReport):
+        print(f"{r.read} read, {r.imported} imported, {r.duplicates} duplicate(s), {r.rejected} rejected", flush=True)
+
+    try:
+        report = import_results(args.file, rejects, progress=show)
+    except ValueError as exc:
+        raise SystemExit(str(exc))
+    if report.rejected:
+        print(f"Rejected rows written to {rejects}")
+    if args.compact:
+        print(f"Compacted {storage.compact_results()} row(s) into the archive.")
+
+
+if __name__ == "__main__":
+    main()
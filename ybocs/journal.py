@@ -0,0 +1,114 @@
+"""Record maps kept as a base file plus an append-only journal.
+
+Used for data that changes one record at a time but is read as a whole:
+accounts (``credentials``) and symptom assignments (``symptoms``). A change
+appends one JSON line to ``<base>.journal`` instead of rewriting the base
+file; every process keeps the map in memory and, when the watch generation
+of either file moves, re-parses the base only if it changed and otherwise
+reads just the new journal lines. After ``compact_after`` entries the
+journal is folded back into the base file.
+
+Journal entries must be idempotent (field merges, whole-record
+replacements): a process that sees the new base file before the emptied
+journal replays entries the base already contains.
+"""
+import json
+import os
+import threading
+
+from . import watch, writer
+
+
+class JournaledMap:
+    """Subclasses provide ``load_base``, ``dump_base`` and ``apply``."""
+
+    def __init__(self, base_file, compact_after: int = 500):
+        self.base_file = base_file
+        self.journal_file = base_file.with_name(base_file.name + ".journal")
+        self.compact_after = compact_after
+        self.lock = threading.RLock()
+        self.records = {}
+        self.base_generation = None
+        self.journal_generation = None
+        self.journal_identity = None
+        self.journal_offset = 0
+        self.journal_entries = 0
+        self._derived = {}
+
+    def load_base(self) -> dict:
+        """Parse the base file into ``{key: record}``."""
+        raise NotImplementedError
+
+    def dump_base(self) -> bytes:
+        """Serialize ``self.records`` as a new base file."""
+        raise NotImplementedError
+
+    def apply(self, entry: dict):
+        """Apply one journal entry to ``self.records``."""
+        raise NotImplementedError
+
+    def _read_journal(self):
+        try:
+            f = open(self.journal_file, "rb")
+        except FileNotFoundError:
+            self.journal_identity, self.journal_offset = None, 0
+            return
+        with f:
+            st = os.fstat(f.fileno())
+            if (st.st_dev, st.st_ino) != self.journal_identity or st.st_size < self.journal_offset:
+                # A new journal (after compaction): replay it from the start.
+                self.journal_identity, self.journal_offset = (st.st_dev, st.st_ino), 0
+            f.seek(self.journal_offset)
+            data = f.read()
+        end = data.rfind(b"\n") + 1
+        for line in data[:end].splitlines():
+            if line.strip():
+                self.apply(json.loads(line))
+                self.journal_entries += 1
+        self.journal_offset += end
+
+    def refresh(self, force: bool = False):
+        """Catch up with the files; ``force`` reads the journal tail even if
+        no change notification has arrived yet (used under the journal lock).
+        """
+        base_gen = watch.generation(self.base_file)
+        journal_gen = watch.generation(self.journal_file)
+        unchanged = base_gen == self.base_generation and journal_gen == self.journal_generation
+        if unchanged and not force:
+            return
+        with self.lock:
+            if base_gen != self.base_generation:
+                self.records = self.load_base()
+                self.journal_identity, self.journal_offset, self.journal_entries = None, 0, 0
+            offset = self.journal_offset
+            self._read_journal()
+            if base_gen != self.base_generation or self.journal_offset != offset or not unchanged:
+                self._derived.clear()
+            self.base_generation, self.journal_generation = base_gen, journal_gen
+
+    def derived(self, name: str, build):
+        """Value computed from the records, cached until the next change."""
+        with self.lock:
+            if name not in self._derived:
+                self._derived[name] = build()
+            return self._derived[name]
+
+    def append(self, entry: dict):
+        """Journal ``entry``. Must run on the writer holding the journal lock."""
+        self.append_many([entry])
+
+    def append_many(self, entries: list):
+        """Journal several entries with one write; see ``append``."""
+        data = "".join(json.dumps(entry, ensure_ascii=False) + "\n" for entry in entries)
+        writer.append_bytes(self.journal_file, data.encode("utf-8"))
+        self.refresh()
+        if self.journal_entries >= self.compact_after:
+            self.compact()
+
+    def compact(self):
+        """Fold the journal into the base file."""
+        self.refresh()
+        with self.lock:
+            data = self.dump_base()
+        writer.atomic_write(self.base_file, data)
+        writer.atomic_write(self.journal_file, b"")
@@ -0,0 +1,60 @@
+"""Advisory cross-process file locks.
+
+Several ``streamlit run app.py`` replicas may share one ``data/`` directory
+and ``users.yaml``. Every write takes an exclusive lock on a ``.lock`` file
+next to its target (the target itself is replaced by rename, so it cannot
+carry the lock). Readers do not lock: files are only appended to or
+atomically replaced.
+"""
+import os
+import threading
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+
+_held = threading.local()
+
+
+def lock_path(path):
+    return path.with_name(path.name + ".lock")
+
+
+@contextmanager
+def file_lock(path):
+    """Hold an exclusive lock for ``path`` across processes.
+
+    Re-entrant per thread: flock would otherwise deadlock a thread that
+    already holds the lock through another descriptor.
+    """
+    lp = lock_path(path)
+    held = getattr(_held, "paths", None)
+    if held is None:
+        held = _held.paths = set()
+    key = os.path.abspath(lp)
+    if key in held:
+        yield
+        return
+    lp.parent.mkdir(parents=True, exist_ok=True)
+    fd = os.open(lp, os.O_RDWR | os.O_CREAT, 0o644)
+    try:
+        if fcntl is not None:
+            fcntl.flock(fd, fcntl.LOCK_EX)
+        else:
+            msvcrt.locking(fd, msvcrt.LK_LOCK, 1)
+        held.add(key)
+        try:
+            yield
+        finally:
+            held.discard(key)
+            if fcntl is not None:
+                fcntl.flock(fd, fcntl.LOCK_UN)
+            else:
+                os.lseek(fd, 0, os.SEEK_SET)
+                msvcrt.locking(fd, msvcrt.LK_UNLCK, 1)
+    finally:
+        os.close(fd)
@@ -0,0 +1,268 @@
+"""In-process timing and counters: where does a rerun spend its time?
+
+Off unless ``YBOCS_METRICS=1``. When off, ``span`` returns one shared
+no-op context manager, ``timed`` returns the function it decorates
+unchanged and ``count`` returns at once, so the instrumentation left in the
+code costs a function call at most.
+
+When on:
+
+* ``span(name)`` times a block into a latency histogram (fixed buckets,
+  Prometheus-style) and, inside ``rerun()``, into the trace of the current
+  script run, so the admin diagnostics panel can show the phases of the
+  previous rerun;
+* ``count(name, n)`` adds to a counter (rows parsed, bytes read, cache hits);
+* modules with their own ``stats()`` ``register`` it, and its numbers are
+  reported as gauges next to the histograms.
+
+Everything is exposed by ``snapshot()`` (a dict) and ``prometheus_text()``.
+``start()`` serves the latter on ``YBOCS_METRICS_PORT`` at ``/metrics``
+(on localhost; ``YBOCS_METRICS_HOST`` widens that, e.g. ``0.0.0.0``, for a
+scraper on another host — the endpoint has no authentication) and/or logs the snapshot as one JSON line every
+``YBOCS_METRICS_LOG_SECONDS``; it is called once per process at startup.
+"""
+import bisect
+import contextlib
+import json
+import logging
+import os
+import threading
+import time
+
+ENABLED = os.environ.get("YBOCS_METRICS", "") not in ("", "0")
+PORT = int(os.environ.get("YBOCS_METRICS_PORT", "0"))
+HOST = os.environ.get("YBOCS_METRICS_HOST", "127.0.0.1")
+LOG_SECONDS = float(os.environ.get("YBOCS_METRICS_LOG_SECONDS", "0"))
+# Upper bounds of the latency buckets, in seconds.
+BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+logger = logging.getLogger(__name__)
+
+_NULL = contextlib.nullcontext()
+_lock = threading.Lock()
+_histograms = {}
+_counters = {}
+_sources = {}
+_local = threading.local()
+_started = False
+
+
+class _Histogram:
+    __slots__ = ("buckets", "count", "sum", "max")
+
+    def __init__(self):
+        self.buckets = [0] * (len(BUCKETS) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, seconds: float):
+        self.buckets[bisect.bisect_left(BUCKETS, seconds)] += 1
+        self.count += 1
+        self.sum += seconds
+        if seconds > self.max:
+            self.max = seconds
+
+    def quantile(self, q: float) -> float:
+        """Estimated like Prometheus' ``histogram_quantile``: linear within a bucket."""
+        rank = q * self.count
+        seen = 0
+        for i, n in enumerate(self.buckets):
+            if n and seen + n >= rank:
+                lo = BUCKETS[i - 1] if i else 0.0
+                hi = BUCKETS[i] if i < len(BUCKETS) else self.max
+                return min(self.max, lo + (hi - lo) * (rank - seen) / n)
+            seen += n
+        return self.max
+
+
+def observe(name: str, seconds: float):
+    with _lock:
+        hist = _histograms.get(name)
+        if hist is None:
+            hist = _histograms[name] = _Histogram()
+        hist.observe(seconds)
+    trace = getattr(_local, "trace", None)
+    if trace is not None:
+        trace.append((name, seconds))
+
+
+class _Span:
+    __slots__ = ("name", "t0")
+
+    def __init__(self, name: str):
+        self.name = name
+
+    def __enter__(self):
+        self.t0 = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        observe(self.name, time.perf_counter() - self.t0)
+        return False
+
+
+def span(name: str):
+    """Context manager timing its block under ``name``."""
+    return _Span(name) if ENABLED else _NULL
+
+
+def timed(name: str):
+    """Decorator timing every call under ``name``; a no-op when off."""
+
+    def wrap(fn):
+        if not ENABLED:
+            return fn
+
+        def timed_fn(*args, **kwargs):
+            with _Span(name):
+                return fn(*args, **kwargs)
+
+        timed_fn.__name__, timed_fn.__doc__, timed_fn.__wrapped__ = fn.__name__, fn.__doc__, fn
+        return timed_fn
+
+    return wrap
+
+
+def count(name: str, n: int = 1):
+    if not ENABLED:
+        return
+    with _lock:
+        _counters[name] = _counters.get(name, 0) + n
+
+
+def register(name: str, stats):
+    """Report the numbers in ``stats()`` (a possibly nested dict) as gauges."""
+    _sources[name] = stats
+
+
+@contextlib.contextmanager
+def rerun():
+    """Time one script run; yields the list of ``(span, seconds)`` it records.
+
+    Spans are collected per thread, and Streamlit runs each script run on
+    one thread, so concurrent sessions do not mix their traces.
+    """
+    if not ENABLED:
+        yield []
+        return
+    trace = _local.trace = []
+    t0 = time.perf_counter()
+    try:
+        yield trace
+    finally:
+        _local.trace = None
+        elapsed = time.perf_counter() - t0
+        observe("rerun", elapsed)
+        trace.append(("rerun", elapsed))
+
+
+def _gauges() -> dict:
+    out = {}
+
+    def flatten(prefix, value):
+        if isinstance(value, dict):
+            for k, v in value.items():
+                flatten(f"{prefix}.{k}", v)
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            out[prefix] = value
+
+    for name, stats in list(_sources.items()):
+        try:
+            flatten(name, stats())
+        except Exception:
+            logger.exception("metrics source %s failed", name)
+    return out
+
+
+def snapshot() -> dict:
+    """Histograms (in ms), counters and gauges collected so far."""
+    with _lock:
+        spans = {
+            name: {
+                "count": h.count,
+                "mean_ms": round(1000 * h.sum / h.count, 3),
+                "p50_ms": round(1000 * h.quantile(0.5), 3),
+                "p99_ms": round(1000 * h.quantile(0.99), 3),
+                "max_ms": round(1000 * h.max, 3),
+            }
+            for name, h in sorted(_histograms.items())
+        }
+        counters = dict(sorted(_counters.items()))
+    return {"enabled": ENABLED, "spans": spans, "counters": counters, "gauges": _gauges()}
+
+
+def _metric(name: str) -> str:
+    return "ybocs_" + "".join(c if c.isalnum() else "_" for c in name)
+
+
+def prometheus_text() -> str:
+    """Everything in the Prometheus text exposition format."""
+    lines = []
+    with _lock:
+        histograms = {name: (list(h.buckets), h.count, h.sum) for name, h in sorted(_histograms.items())}
+        counters = dict(sorted(_counters.items()))
+    if histograms:
+        lines += ["# HELP ybocs_span_seconds Time spent in instrumented phases.", "# TYPE ybocs_span_seconds histogram"]
+    for name, (buckets, n, total) in histograms.items():
+        cumulative = 0
+        for bound, k in zip(BUCKETS + ("+Inf",), buckets):
+            cumulative += k
+            lines.append(f'ybocs_span_seconds_bucket{{span="{name}",le="{bound}"}} {cumulative}')
+        lines.append(f'ybocs_span_seconds_sum{{span="{name}"}} {total:.6f}')
+        lines.append(f'ybocs_span_seconds_count{{span="{name}"}} {n}')
+    for name, value in counters.items():
+        metric = _metric(name) + "_total"
+        lines += [f"# TYPE {metric} counter", f"{metric} {value}"]
+    for name, value in _gauges().items():
+        metric = _metric(name)
+        lines += [f"# TYPE {metric} gauge", f"{metric} {value}"]
+    return "\n".join(lines) + "\n"
+
+
+def _serve(host: str, port: int):
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split("?")[0] != "/metrics":
+                self.send_error(404)
+                return
+            body = prometheus_text().encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    try:
+        server = ThreadingHTTPServer((host, port), Handler)
+    except OSError as exc:
+        # E.g. a second replica on the same host; its metrics go to the log.
+        logger.warning("metrics endpoint not started on %s:%d: %s", host, port, exc)
+        return
+    threading.Thread(target=server.serve_forever, name="ybocs-metrics", daemon=True).start()
+    logger.info("metrics at http://%s:%d/metrics", host, server.server_port)
+
+
+def _log_periodically(seconds: float):
+    while True:
+        time.sleep(seconds)
+        logger.info("metrics %s", json.dumps(snapshot(), ensure_ascii=False))
+
+
+def start():
+    """Start the endpoint and the periodic log, if configured; once per process."""
+    global _started
+    with _lock:
+        if _started or not ENABLED:
+            return
+        _started = True
+    if PORT:
+        _serve(HOST, PORT)
+    if LOG_SECONDS > 0:
+        threading.Thread(target=_log_periodically, args=(LOG_SECONDS,), name="ybocs-metrics-log", daemon=True).start()
+
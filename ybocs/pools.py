@@ -0,0 +1,27 @@
+"""Process pools that are safe to start from inside a Streamlit server."""
+import multiprocessing
+import sys
+import types
+from concurrent.futures import ProcessPoolExecutor, wait
+
+
+def _noop():
+    return None
+
+
+def spawn_pool(workers: int) -> ProcessPoolExecutor:
+    """A pool of ``workers`` spawned processes, all started before returning.
+
+    spawn: forking a threaded Streamlit server is unsafe. A spawned worker
+    re-imports __main__, which under Streamlit is the app script itself, so
+    all workers are started right away with a blank __main__ in place.
+    """
+    pool = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
+    main = sys.modules["__main__"]
+    sys.modules["__main__"] = types.ModuleType("__main__")
+    try:
+        started = [pool.submit(_noop) for _ in range(workers)]
+    finally:
+        sys.modules["__main__"] = main
+    wait(started)
+    return pool
@@ -0,0 +1,139 @@
+"""Indexed lookups over the results for the date/patient/symptom filters.
+
+``ResultsQuery`` keeps the rows (dates already parsed on load) sorted by
+(user, objaw, date). Every (user, objaw) pair is a contiguous block, so a
+filter is a dict lookup plus a binary search on the dates of the matching
+blocks instead of a boolean scan over the whole table.
+"""
+import threading
+from datetime import date, timedelta
+
+import numpy as np
+import pandas as pd
+
+from . import archive, metrics
+from .storage import load_delta, load_results
+
+_NAT = np.iinfo(np.int64).min
+
+
+class ResultsQuery:
+    @metrics.timed("query.index")
+    def __init__(self, df: pd.DataFrame):
+        # NaT sorts first, matching its int64 representation, so the date
+        # column stays monotonic inside every block for searchsorted.
+        frame = df.sort_values(
+            ["user", "objaw", "date", "timestamp"], kind="mergesort", na_position="first"
+        )
+        self.frame = frame
+        self._dates = frame["date"].to_numpy("datetime64[ns]").view("int64")
+
+        # user -> [(objaw, start, stop), ...] in objaw order
+        self._blocks = {}
+        positions = frame.groupby(["user", "objaw"], sort=False, dropna=False, observed=True).indices
+        for (user, objaw), idx in positions.items():
+            if pd.isna(user):
+                continue
+            self._blocks.setdefault(user, []).append((objaw, int(idx[0]), int(idx[-1]) + 1))
+        for blocks in self._blocks.values():
+            blocks.sort(key=lambda b: str(b[0]))
+
+        valid = self._dates[self._dates != _NAT]
+        if len(valid):
+            self.min_date = pd.Timestamp(valid.min()).date()
+            self.max_date = pd.Timestamp(valid.max()).date()
+        else:
+            self.min_date = self.max_date = date.today()
+
+    @property
+    def empty(self) -> bool:
+        return self.frame.empty
+
+    def symptoms_for(self, user: str) -> list:
+        """Sorted symptoms the user has results for."""
+        return [objaw for objaw, _, _ in self._blocks.get(user, []) if not pd.isna(objaw)]
+
+    @metrics.timed("query.rows")
+    def rows(self, user: str, objaw: str = None, start: date = None, end: date = None) -> pd.DataFrame:
+        """Rows of one user, optionally one symptom and an inclusive date range.
+
+        The result is a new frame sorted by date and timestamp.
+        """
+        lo = _NAT if start is None else pd.Timestamp(start).value
+        hi = None if end is None else pd.Timestamp(end + timedelta(days=1)).value
+
+        parts = []
+        for block_objaw, b_start, b_stop in self._blocks.get(user, []):
+            if objaw is not None and block_objaw != objaw:
+                continue
+            dates = self._dates[b_start:b_stop]
+            i = b_start + (0 if start is None else int(np.searchsorted(dates, lo, side="left")))
+            j = b_stop if hi is None else b_start + int(np.searchsorted(dates, hi, side="left"))
+            if i < j:
+                parts.append(np.arange(i, j))
+
+        if not parts:
+            return self.frame.iloc[0:0].copy()
+        view = self.frame.iloc[np.concatenate(parts)]
+        if len(parts) > 1:
+            view = view.sort_values(["date", "timestamp"], kind="mergesort")
+        return view
+
+
+_lock = threading.Lock()
+# (user, start, end) -> (source frame, ResultsQuery)
+_queries = {}
+_QUERY_CACHE_SIZE = 64
+
+
+def results_query(user: str = None, start: date = None, end: date = None, cold: bool = True) -> ResultsQuery:
+    """Query engine over the results matching the filters.
+
+    Only the archive partitions for ``user`` and the months in range are
+    read (without the cold tier for ``cold=False``); the index is rebuilt
+    only when the underlying frame changes.
+    """
+    df = load_results(user, start, end, cold)
+    key = (user, start, end, cold)
+    with _lock:
+        cached = _queries.get(key)
+        if cached is not None and cached[0] is df:
+            return cached[1]
+    query = ResultsQuery(df)
+    with _lock:
+        _queries.pop(key, None)
+        _queries[key] = (df, query)
+        while len(_queries) > _QUERY_CACHE_SIZE:
+            _queries.pop(next(iter(_queries)))
+    return query
+
+
+def _delta_query() -> ResultsQuery:
+    df = load_delta()
+    with _lock:
+        cached = _queries.get("delta")
+        if cached is not None and cached[0] is df:
+            return cached[1]
+        query = ResultsQuery(df)
+        _queries["delta"] = (df, query)
+        return query
+
+
+def results_bounds():
+    """``(min_date, max_date)`` over all results, or ``None`` if there are none.
+
+    Answered from the archive manifest and the log, without reading any
+    archive partition.
+    """
+    bounds = archive.date_bounds()
+    recent = _delta_query()
+    if recent.empty:
+        return bounds
+    if bounds is None:
+        return recent.min_date, recent.max_date
+    return min(bounds[0], recent.min_date), max(bounds[1], recent.max_date)
+
+
+def result_symptoms(user: str) -> list:
+    """Sorted symptoms the user has results for (manifest plus log)."""
+    return sorted(archive.symptoms(user) | set(_delta_query().symptoms_for(user)))
@@ -0,0 +1,311 @@
+"""Printable per-patient progress reports, rendered in a process pool.
+
+A report is one A4 page, PDF or PNG: the assigned symptoms, the trend
+summary of every symptom (as in the results tabs, from ``rollups``), the
+totals over time, the obsession/compulsion subscales of the last result
+per symptom and the ``YBOCS_ITEMS`` answers of the latest assessment.
+
+``generate`` collects each patient's rows in this process and hashes them
+together with everything else shown on the page. A report whose digest
+matches the one recorded in ``data/reports/index.json`` is skipped; the
+others are drawn by a pool of ``WORKERS`` spawned processes (matplotlib is
+CPU-bound and holds the GIL), at most ``IN_FLIGHT`` per worker at a time.
+The files go to ``data/reports/<user>.<format>``; ``zip_reports`` packs
+them for download::
+
+    python -m ybocs.reports --format pdf --zip raporty.zip
+"""
+import hashlib
+import io
+import json
+import logging
+import os
+import zipfile
+from concurrent.futures import FIRST_COMPLETED, wait
+from typing import NamedTuple
+from urllib.parse import quote
+
+import pandas as pd
+
+from . import metrics, storage
+from .config import REPORTS_DIR
+from .domain import YBOCS_ITEMS, symptom_label
+from .locking import file_lock
+from .pools import spawn_pool
+from .schema import QUESTION_COLUMNS, RESULTS_COLUMNS, concat_results
+from .writer import atomic_write
+
+logger = logging.getLogger(__name__)
+
+# 0 renders in this process.
+WORKERS = int(os.environ.get("YBOCS_REPORT_WORKERS", min(4, os.cpu_count() or 1)))
+IN_FLIGHT = 4
+INDEX_FILE = REPORTS_DIR / "index.json"
+# Bump when the layout changes, so every report is drawn again.
+LAYOUT_VERSION = 1
+DPI = 150
+A4 = (8.27, 11.69)
+# Symptoms listed in the tables and chart legend; the rest are counted.
+MAX_SYMPTOMS = 8
+
+# format -> (label, MIME type)
+FORMATS = {
+    "pdf": ("PDF", "application/pdf"),
+    "png": ("PNG", "image/png"),
+}
+
+
+class Summary(NamedTuple):
+    rendered: list  # logins whose report was drawn
+    unchanged: list  # logins whose report was up to date
+    empty: list  # logins without results (no report)
+    failed: list  # logins whose report could not be drawn
+
+
+def report_path(user: str, fmt: str):
+    return REPORTS_DIR / f"{quote(user, safe='')}.{fmt}"
+
+
+def _payload(user: str, name: str, symptoms: list) -> dict:
+    rows = concat_results(list(storage.iter_results(user)))
+    if rows.empty:
+        return None
+    rows = rows.sort_values(["date", "timestamp"], kind="mergesort", ignore_index=True)[RESULTS_COLUMNS]
+    return {"user": user, "name": name, "symptoms": [symptom_label(s) for s in symptoms], "rows": rows}
+
+
+def _digest(payload: dict, fmt: str) -> str:
+    h = hashlib.blake2b(digest_size=16)
+    header = [LAYOUT_VERSION, fmt, payload["user"], payload["name"], payload["symptoms"]]
+    h.update(json.dumps(header, ensure_ascii=False).encode("utf-8"))
+    h.update(pd.util.hash_pandas_object(payload["rows"], index=False).to_numpy().tobytes())
+    return h.hexdigest()
+
+
+def _short(text: str, width: int) -> str:
+    return text if len(text) <= width else text[:width - 1] + "…"
+
+
+def render(payload: dict, fmt: str) -> bytes:
+    """The report of one patient (see ``_payload``) as ``fmt`` bytes."""
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    from matplotlib.figure import Figure
+
+    from .rollups import summarize
+
+    rows = payload["rows"]
+    courses = sorted(
+        (p.rollup(payload["user"], objaw) for (objaw,), p in summarize(rows, ["objaw"]).items()),
+        key=lambda r: r.last_date, reverse=True,
+    )
+    shown = courses[:MAX_SYMPTOMS]
+    more = f" (+{len(courses) - len(shown)} innych)" if len(courses) > len(shown) else ""
+    latest = rows.iloc[-1]
+
+    fig = Figure(figsize=A4)
+    FigureCanvasAgg(fig)
+    fig.text(0.06, 0.965, "Raport postępów – Y‑BOCS", fontsize=16, weight="bold")
+    fig.text(0.06, 0.945, f"{payload['name']} ({payload['user']})", fontsize=11)
+    fig.text(
+        0.06, 0.928,
+        f"Stan na {latest['date']:%Y-%m-%d} · ocen: {len(rows)} · od {rows['date'].iloc[0]:%Y-%m-%d}",
+        fontsize=8, color="dimgray",
+    )
+
+    symptoms = payload["symptoms"] or ["(brak przypisanych objawów)"]
+    listed = symptoms[:MAX_SYMPTOMS]
+    if len(symptoms) > len(listed):
+        listed = listed + [f"… i {len(symptoms) - len(listed)} innych"]
+    fig.text(0.06, 0.905, "Objawy przypisane przez terapeutę", fontsize=10, weight="bold")
+    fig.text(0.07, 0.895, "\n".join(f"• {_short(s, 110)}" for s in listed), fontsize=7, va="top", linespacing=1.5)
+
+    ax = fig.add_axes([0.06, 0.66, 0.88, 0.12])
+    ax.axis("off")
+    ax.set_title("Podsumowanie" + more, loc="left", fontsize=10, weight="bold")
+    table = ax.table(
+        cellText=[
+            [
+                _short(symptom_label(r.objaw), 48), r.count, r.baseline, r.last,
+                "–" if r.change_pct is None else f"{r.change_pct:+.0f}%",
+                f"{r.mean_4w:.1f}",
+                "–" if r.slope_per_week is None else f"{r.slope_per_week:+.2f}",
+            ]
+            for r in shown
+        ],
+        colLabels=["Objaw", "Ocen", "Wyjściowy", "Ostatni", "Zmiana", "Średnia 4 tyg.", "Trend/tydz."],
+        colWidths=[0.46, 0.07, 0.1, 0.08, 0.08, 0.11, 0.1],
+        loc="upper left",
+        cellLoc="left",
+    )
+    table.auto_set_font_size(False)
+    table.set_fontsize(7)
+
+    ax = fig.add_axes([0.09, 0.37, 0.85, 0.22])
+    for r in shown:
+        course = rows[rows["objaw"] == r.objaw]
+        ax.plot(course["date"], course["suma"], marker="o" if len(course) <= 60 else None, markersize=3,
+                label=_short(symptom_label(r.objaw), 40))
+    ax.set_ylim(0, 40)
+    ax.set_ylabel("Suma Y‑BOCS", fontsize=8)
+    ax.set_title("Nasilenie w czasie", loc="left", fontsize=10, weight="bold")
+    ax.tick_params(labelsize=7)
+    ax.legend(fontsize=6, loc="upper right")
+    for label in ax.get_xticklabels():
+        label.set_rotation(30)
+        label.set_horizontalalignment("right")
+
+    ax = fig.add_axes([0.3, 0.06, 0.2, 0.22])
+    positions = range(len(shown))
+    ax.barh([p + 0.2 for p in positions], [r.obsessions for r in shown], height=0.4, label="Obsesje (1–5)")
+    ax.barh([p - 0.2 for p in positions], [r.compulsions for r in shown], height=0.4, label="Kompulsje (6–10)")
+    ax.set_yticks(list(positions), [_short(symptom_label(r.objaw), 38) for r in shown], fontsize=6)
+    ax.invert_yaxis()
+    ax.set_xlim(0, 20)
+    ax.tick_params(axis="x", labelsize=7)
+    ax.legend(fontsize=6, loc="lower right")
+    ax.set_title("Podskale", loc="left", fontsize=10, weight="bold")
+
+    ax = fig.add_axes([0.56, 0.06, 0.4, 0.22])
+    ax.axis("off")
+    ax.set_title(f"Ostatnia ocena ({latest['date']:%Y-%m-%d})", loc="left", fontsize=10, weight="bold")
+    answers = [int(latest[q]) for q in QUESTION_COLUMNS]
+    table = ax.table(
+        cellText=[["Objaw", _short(symptom_label(str(latest["objaw"])), 30)]] + [
+            [f"{i}. {_short(question, 30)}", f"{a} – {_short(choices[a], 26)}"]
+            for i, ((question, choices), a) in enumerate(zip(YBOCS_ITEMS, answers), start=1)
+        ] + [["Suma", f"{int(latest['suma'])} / 40"]],
+        colWidths=[0.52, 0.48],
+        loc="upper left",
+        cellLoc="left",
+    )
+    table.auto_set_font_size(False)
+    table.set_fontsize(6)
+
+    buf = io.BytesIO()
+    fig.savefig(buf, format=fmt, dpi=DPI)
+    return buf.getvalue()
+
+
+def _load_index() -> dict:
+    try:
+        return json.loads(INDEX_FILE.read_text(encoding="utf-8"))
+    except FileNotFoundError:
+        return {}
+
+
+def _save_index(digests: dict):
+    """Record ``{file name: digest}``; concurrent runs keep each other's entries."""
+    REPORTS_DIR.mkdir(parents=True, exist_ok=True)
+    with file_lock(INDEX_FILE):
+        index = _load_index()
+        index.update(digests)
+        atomic_write(INDEX_FILE, json.dumps(index, ensure_ascii=False, indent=1, sort_keys=True).encode("utf-8"))
+
+
+def generate(users=None, fmt: str = "pdf", force: bool = False, workers: int = None, progress=None) -> Summary:
+    """Bring the reports of ``users`` (default: all patients) up to date.
+
+    ``progress(done, total)`` is called after each patient.
+    """
+    from .credentials import patients
+    # Workers look ``render`` up by module name, which must not be __main__
+    # when this file runs as ``python -m ybocs.reports``.
+    from .reports import render as draw
+    from .user_symptoms import load_symptom_sets
+
+    names = dict(patients())
+    users = list(names) if users is None else list(users)
+    symptoms = load_symptom_sets(users)
+    workers = WORKERS if workers is None else workers
+    index = _load_index()
+    summary = Summary([], [], [], [])
+    digests = {}
+    pool, pending = None, {}
+
+    def step():
+        if progress is not None:
+            progress(sum(len(part) for part in summary), len(users))
+
+    def store(user, digest, render_result):
+        try:
+            data = render_result()
+        except Exception:
+            logger.exception("Report for %s failed", user)
+            summary.failed.append(user)
+        else:
+            path = report_path(user, fmt)
+            atomic_write(path, data)
+            digests[path.name] = digest
+            summary.rendered.append(user)
+        step()
+
+    def drain(limit: int):
+        while len(pending) > limit:
+            for future in wait(pending, return_when=FIRST_COMPLETED).done:
+                store(*pending.pop(future), future.result)
+
+    REPORTS_DIR.mkdir(parents=True, exist_ok=True)
+    try:
+        for user in users:
+            payload = _payload(user, names.get(user, user), symptoms.get(user, []))
+            if payload is None:
+                summary.empty.append(user)
+                step()
+                continue
+            digest = _digest(payload, fmt)
+            if not force and index.get(report_path(user, fmt).name) == digest and report_path(user, fmt).exists():
+                summary.unchanged.append(user)
+                step()
+            elif workers == 0:
+                store(user, digest, lambda: render(payload, fmt))
+            else:
+                if pool is None:
+                    pool = spawn_pool(workers)
+                pending[pool.submit(draw, payload, fmt)] = (user, digest)
+                drain(workers * IN_FLIGHT - 1)
+        drain(0)
+    finally:
+        if pool is not None:
+            pool.shutdown(cancel_futures=True)
+        if digests:
+            _save_index(digests)
+    metrics.count("reports.rendered", len(summary.rendered))
+    metrics.count("reports.unchanged", len(summary.unchanged))
+    return summary
+
+
+def zip_reports(users, fmt: str = "pdf") -> bytes:
+    """A zip of the existing ``fmt`` reports of ``users``."""
+    buf = io.BytesIO()
+    with zipfile.ZipFile(buf, "w", zipfile.ZIP_STORED) as zf:
+        for user in users:
+            path = report_path(user, fmt)
+            if path.exists():
+                zf.write(path, f"raport_{path.name}")
+    return buf.getvalue()
+
+
+def main(argv=None):
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Draw per-patient progress reports.")
+    parser.add_argument("--format", choices=list(FORMATS), default="pdf")
+    parser.add_argument("--user", action="append", help="only this patient (repeatable)")
+    parser.add_argument("--workers", type=int, default=WORKERS, help="processes drawing reports (0: none)")
+    parser.add_argument("--force", action="store_true", help="draw reports whose data did not change too")
+    parser.add_argument("--zip", help="also write the reports to this zip file")
+    args = parser.parse_args(argv)
+    summary = generate(args.user, args.format, args.force, args.workers)
+    print(
+        f"{len(summary.rendered)} report(s) drawn, {len(summary.unchanged)} unchanged, "
+        f"{len(summary.empty)} patient(s) without results, {len(summary.failed)} failed; in {REPORTS_DIR}."
+    )
+    if args.zip:
+        with open(args.zip, "wb") as f:
+            f.write(zip_reports(summary.rendered + summary.unchanged, args.format))
+        print(f"Zip written to {args.zip}")
+    raise SystemExit(1 if summary.failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,173 @@
+"""Retention: keep the log short and move old results to the cold tier.
+
+Results live in three tiers:
+
+* hot — ``wyniki.csv``, the append-only log every replica tails;
+* warm — the monthly Parquet partitions of ``archive``, read per patient
+  and date range;
+* cold — one compressed file per patient (``archive.freeze``), read only
+  when a results tab asks for it.
+
+A ``Policy`` says what moves: log rows older than ``hot_days`` are
+compacted into the warm tier, and the warm months of patients without a
+result for ``inactive_days``, or older than ``cold_years``, go cold (0
+turns a rule off). Every archived month keeps its manifest entry and
+rollup partials, so ``rollups``, ``cohort`` and the monthly means on the
+trend charts stay exact without reading cold files; a new result for a
+cold month brings that month back to the warm tier.
+
+``apply`` runs everything on the writer thread holding the log's lock and
+costs a manifest scan when there is nothing to move. It runs from
+``python -m ybocs.retention`` (``--dry-run`` only reports) and, with
+``YBOCS_RETENTION_HOURS`` set, every that many hours in each app process;
+the policy comes from ``YBOCS_RETENTION_HOT_DAYS``,
+``YBOCS_RETENTION_INACTIVE_DAYS`` and ``YBOCS_RETENTION_COLD_YEARS``.
+"""
+import logging
+import os
+import threading
+import time
+from datetime import date, timedelta
+from typing import NamedTuple
+
+from . import writer
+from .config import RESULTS_FILE
+
+logger = logging.getLogger(__name__)
+
+INTERVAL_HOURS = float(os.environ.get("YBOCS_RETENTION_HOURS", "0"))
+
+_lock = threading.Lock()
+_started = False
+
+
+class Policy(NamedTuple):
+    hot_days: int = 30  # log rows older than this are compacted into the archive
+    inactive_days: int = 730  # patients without results this long go cold
+    cold_years: int = 5  # archived months older than this go cold
+
+
+class Report(NamedTuple):
+    compacted: int  # log rows moved to the archive
+    frozen: int  # archive partitions moved to the cold tier
+    patients: int  # patients with partitions moved
+    removed: int  # retired partition files deleted
+
+
+def policy_from_env() -> Policy:
+    default = Policy()
+    return Policy(
+        hot_days=int(os.environ.get("YBOCS_RETENTION_HOT_DAYS", default.hot_days)),
+        inactive_days=int(os.environ.get("YBOCS_RETENTION_INACTIVE_DAYS", default.inactive_days)),
+        cold_years=int(os.environ.get("YBOCS_RETENTION_COLD_YEARS", default.cold_years)),
+    )
+
+
+def _cutoff(today: date, days: int):
+    return None if days <= 0 else today - timedelta(days=days)
+
+
+def plan(policy: Policy, today: date = None) -> dict:
+    """``{user: months}`` of warm partitions the policy moves to the cold tier."""
+    from . import archive, storage
+
+    today = today or date.today()
+    inactive = _cutoff(today, policy.inactive_days)
+    old = _cutoff(today, 365 * policy.cold_years)
+    entries = archive.manifest()
+    if not entries or (inactive is None and old is None):
+        return {}
+
+    last = {}
+    for e in entries:
+        last[e["user"]] = max(last.get(e["user"], ""), e["max_date"])
+    delta = storage.load_delta()
+    if not delta.empty:
+        recent = delta.groupby(delta["user"].astype(str), observed=True)["date"].max()
+        for user, day in recent.items():
+            last[user] = max(last.get(user, ""), day.date().isoformat())
+
+    out = {}
+    for e in entries:
+        if archive.is_cold(e):
+            continue
+        if (inactive is not None and last[e["user"]] < inactive.isoformat()) or (
+            old is not None and e["max_date"] < old.isoformat()
+        ):
+            out.setdefault(e["user"], set()).add(e["month"])
+    return out
+
+
+def apply(policy: Policy = None, today: date = None, dry_run: bool = False) -> Report:
+    """Compact, freeze and clean up per ``policy`` (default: from the environment)."""
+    # Imported here: ``start`` runs on the login page, which must stay light.
+    import pandas as pd
+
+    from . import archive, storage
+
+    policy = policy or policy_from_env()
+    today = today or date.today()
+    hot = _cutoff(today, policy.hot_days)
+
+    def run() -> Report:
+        if dry_run:
+            delta = storage.load_delta()
+            compacted = 0 if hot is None else int((delta["date"] < pd.Timestamp(hot)).sum())
+            retired = 0
+        else:
+            retired = archive.remove_retired()
+            compacted = 0 if hot is None else storage.compact_results(before=hot)
+        months = plan(policy, today)
+        if dry_run:
+            warm = {(e["user"], e["month"]) for e in archive.manifest() if not archive.is_cold(e)}
+            frozen = sum(1 for user, ms in months.items() for m in ms if (user, m) in warm)
+        else:
+            frozen = archive.freeze(months)
+        return Report(compacted, frozen, len(months), retired)
+
+    return writer.run_serialized(run, lock=RESULTS_FILE, timeout=None)
+
+
+def _run_periodically(hours: float):
+    while True:
+        time.sleep(hours * 3600)
+        try:
+            report = apply()
+        except Exception:
+            logger.exception("Retention run failed")
+        else:
+            logger.info("retention %s", report._asdict())
+
+
+def start():
+    """Run ``apply`` every ``YBOCS_RETENTION_HOURS``, if set; once per process."""
+    global _started
+    with _lock:
+        if _started or INTERVAL_HOURS <= 0:
+            return
+        _started = True
+    threading.Thread(target=_run_periodically, args=(INTERVAL_HOURS,), name="ybocs-retention", daemon=True).start()
+
+
+def main(argv=None):
+    import argparse
+
+    default = policy_from_env()
+    parser = argparse.ArgumentParser(description="Compact the results log and move old results to the cold tier.")
+    parser.add_argument("--hot-days", type=int, default=default.hot_days, help="keep this many days in the log")
+    parser.add_argument(
+        "--inactive-days", type=int, default=default.inactive_days, help="freeze patients idle this long (0: never)"
+    )
+    parser.add_argument("--cold-years", type=int, default=default.cold_years, help="freeze months this old (0: never)")
+    parser.add_argument("--dry-run", action="store_true", help="only report what would move")
+    args = parser.parse_args(argv)
+    report = apply(Policy(args.hot_days, args.inactive_days, args.cold_years), dry_run=args.dry_run)
+    verb = "Would move" if args.dry_run else "Moved"
+    print(
+        f"{verb} {report.compacted} logged row(s) to the archive and {report.frozen} partition(s) "
+        f"of {report.patients} patient(s) to the cold tier; removed {report.removed} retired file(s)."
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,423 @@
+"""Per-patient trend rollups, maintained incrementally.
+
+For every (user, objaw) the results tabs show the baseline and last score,
+the change from baseline, the mean of the last four weeks, the linear trend
+and the obsession (q1–q5) / compulsion (q6–q10) subscales. These are kept
+as ``_Partial`` aggregates — counts, sums for the least-squares slope and
+the subscales, the first and last result and the results of the last
+``WINDOW_DAYS`` — which combine associatively, so they never need the full
+history again:
+
+* every archive partition stores its partials in the manifest (written by
+  ``archive.merge``), so the archived part is a sum over manifest entries,
+  recomputed only when the archive changes;
+* rows reaching the log are folded in as they are read from its tail, by
+  this process's saves and by other replicas' alike.
+
+Monthly totals over all patients (for ``cohort``) come from the same
+partials and the same log rows. A lookup is then a dict access. ``rebuild()`` recomputes everything from
+the full results, vectorized, and ``python -m ybocs.rollups`` checks that
+both agree.
+"""
+import logging
+import threading
+from datetime import date, timedelta
+from typing import NamedTuple
+
+import numpy as np
+import pandas as pd
+
+from . import archive, metrics, storage
+from .schema import QUESTION_COLUMNS
+
+logger = logging.getLogger(__name__)
+
+WINDOW_DAYS = 28
+OBSESSION_COLUMNS = QUESTION_COLUMNS[:5]
+COMPULSION_COLUMNS = QUESTION_COLUMNS[5:]
+
+_EPOCH = date(1970, 1, 1)
+# Keys of a stored partial (``_Partial.to_json``).
+_JSON_FIELDS = {"n", "sx", "sy", "sxy", "sxx", "so", "sc", "first", "last", "tail", "max_ts"}
+
+
+class Rollup(NamedTuple):
+    user: str
+    objaw: str
+    count: int
+    baseline_date: date
+    baseline: int
+    last_date: date
+    last: int
+    change_pct: float  # (last - baseline) / baseline in %; None if baseline is 0
+    mean_4w: float  # mean score over the WINDOW_DAYS ending at last_date
+    slope_per_week: float  # least-squares points per week; None below 2 dates
+    obsessions: int  # q1–q5 of the last result
+    compulsions: int  # q6–q10 of the last result
+
+
+class Snapshot(NamedTuple):
+    """State at one point; replaced, never modified, when results arrive."""
+
+    courses: dict  # user -> {objaw: _Partial}
+    monthly: dict  # "YYYY-MM" -> (results, Σ suma, Σ obsessions, Σ compulsions)
+
+
+class _Partial:
+    """Mergeable aggregate of the results of one (user, objaw).
+
+    ``first``/``last`` are ``(day, timestamp ns, suma, obsessions,
+    compulsions)`` and order by day, then timestamp; ``tail`` holds
+    ``(day, suma)`` of the results within ``WINDOW_DAYS`` of ``last``.
+    ``so``/``sc`` sum the obsession and compulsion subscales. Days count
+    from 1970-01-01, which keeps every sum an exact integer.
+    """
+
+    __slots__ = ("n", "sx", "sy", "sxy", "sxx", "so", "sc", "first", "last", "tail", "max_ts", "_rollup")
+
+    def __init__(self, n, sx, sy, sxy, sxx, so, sc, first, last, tail, max_ts):
+        self.n, self.sx, self.sy, self.sxy, self.sxx = n, sx, sy, sxy, sxx
+        self.so, self.sc = so, sc
+        self.first, self.last = tuple(first), tuple(last)
+        self.tail = [tuple(t) for t in tail]
+        self.max_ts = max_ts
+        self._rollup = None
+
+    def combine(self, other: "_Partial") -> "_Partial":
+        last = max(self.last, other.last)
+        cutoff = last[0] - WINDOW_DAYS
+        return _Partial(
+            self.n + other.n,
+            self.sx + other.sx,
+            self.sy + other.sy,
+            self.sxy + other.sxy,
+            self.sxx + other.sxx,
+            self.so + other.so,
+            self.sc + other.sc,
+            min(self.first, other.first),
+            last,
+            [t for t in self.tail + other.tail if t[0] > cutoff],
+            max(self.max_ts, other.max_ts),
+        )
+
+    def to_json(self) -> dict:
+        return {
+            "n": self.n, "sx": self.sx, "sy": self.sy, "sxy": self.sxy, "sxx": self.sxx,
+            "so": self.so, "sc": self.sc,
+            "first": list(self.first), "last": list(self.last),
+            "tail": [list(t) for t in self.tail], "max_ts": self.max_ts,
+        }
+
+    @classmethod
+    def from_json(cls, data: dict) -> "_Partial":
+        return cls(**data)
+
+    def rollup(self, user: str, objaw: str) -> Rollup:
+        if self._rollup is None:
+            baseline, last = self.first[2], self.last[2]
+            den = self.n * self.sxx - self.sx * self.sx
+            slope = None if den == 0 else 7 * (self.n * self.sxy - self.sx * self.sy) / den
+            self._rollup = Rollup(
+                user=user,
+                objaw=objaw,
+                count=self.n,
+                baseline_date=_EPOCH + timedelta(days=self.first[0]),
+                baseline=baseline,
+                last_date=_EPOCH + timedelta(days=self.last[0]),
+                last=last,
+                change_pct=None if baseline == 0 else 100 * (last - baseline) / baseline,
+                mean_4w=sum(s for _, s in self.tail) / len(self.tail),
+                slope_per_week=slope,
+                obsessions=self.last[3],
+                compulsions=self.last[4],
+            )
+        return self._rollup
+
+
+def summarize(df: pd.DataFrame, keys=("user", "objaw")) -> dict:
+    """``{key tuple: _Partial}`` for typed result rows, grouped by ``keys``.
+
+    Rows without a symptom are left out.
+    """
+    keys = list(keys)
+    df = df[df["objaw"].notna()]
+    if df.empty:
+        return {}
+    df = df.sort_values(keys + ["date", "timestamp"], kind="mergesort")
+    codes = df.groupby(keys, sort=False, observed=True).ngroup().to_numpy()
+    starts = np.flatnonzero(np.r_[True, codes[1:] != codes[:-1]])
+    ends = np.r_[starts[1:], len(df)]
+
+    x = df["date"].to_numpy("datetime64[D]").astype(np.int64)
+    y = df["suma"].to_numpy(np.int64)
+    ts = df["timestamp"].to_numpy("datetime64[ns]").astype(np.int64)
+    obs = df[OBSESSION_COLUMNS].to_numpy(np.int64).sum(axis=1)
+    comp = df[COMPULSION_COLUMNS].to_numpy(np.int64).sum(axis=1)
+
+    n = ends - starts
+    sx, sy = np.add.reduceat(x, starts), np.add.reduceat(y, starts)
+    sxy, sxx = np.add.reduceat(x * y, starts), np.add.reduceat(x * x, starts)
+    so, sc = np.add.reduceat(obs, starts), np.add.reduceat(comp, starts)
+    max_ts = np.maximum.reduceat(ts, starts)
+    in_tail = x > np.repeat(x[ends - 1], n) - WINDOW_DAYS
+    tail_idx = np.flatnonzero(in_tail)
+    tail_bounds = np.searchsorted(tail_idx, np.r_[starts, len(df)])
+    labels = [df[k].iloc[starts].astype(str).tolist() for k in keys]
+
+    def row(i):
+        return int(x[i]), int(ts[i]), int(y[i]), int(obs[i]), int(comp[i])
+
+    out = {}
+    for g, (lo, hi) in enumerate(zip(starts, ends)):
+        tail = tail_idx[tail_bounds[g]:tail_bounds[g + 1]]
+        out[tuple(label[g] for label in labels)] = _Partial(
+            int(n[g]), int(sx[g]), int(sy[g]), int(sxy[g]), int(sxx[g]), int(so[g]), int(sc[g]),
+            row(lo), row(hi - 1),
+            [(int(x[i]), int(y[i])) for i in tail],
+            int(max_ts[g]),
+        )
+    return out
+
+
+def partition_json(rows: pd.DataFrame) -> dict:
+    """``{objaw: partial}`` of one archive partition, as stored in the manifest."""
+    return {objaw: p.to_json() for (objaw,), p in summarize(rows, ["objaw"]).items()}
+
+
+def stored_partials(entry: dict):
+    """Partials stored in a manifest entry; None if it predates them or
+    lacks fields added since."""
+    stored = entry.get("rollups")
+    if stored is None or any(p.keys() != _JSON_FIELDS for p in stored.values()):
+        return None
+    return stored
+
+
+def _monthly(rows: pd.DataFrame) -> dict:
+    """``Snapshot.monthly`` totals of typed result rows."""
+    rows = rows[rows["objaw"].notna()]
+    if rows.empty:
+        return {}
+    totals = pd.DataFrame({
+        "n": 1,
+        "suma": rows["suma"].to_numpy(np.int64),
+        "obs": rows[OBSESSION_COLUMNS].to_numpy(np.int64).sum(axis=1),
+        "comp": rows[COMPULSION_COLUMNS].to_numpy(np.int64).sum(axis=1),
+    }).groupby(rows["date"].to_numpy("datetime64[M]")).sum()
+    months = np.datetime_as_string(totals.index.to_numpy("datetime64[M]"), unit="M")
+    return {m: tuple(int(v) for v in t) for m, t in zip(months, totals.itertuples(index=False))}
+
+
+def _add_monthly(target: dict, totals: dict):
+    for month, t in totals.items():
+        old = target.get(month)
+        target[month] = t if old is None else tuple(a + b for a, b in zip(old, t))
+
+
+def _add(target: dict, user: str, objaw: str, partial: _Partial):
+    current = target.get(user, {}).get(objaw)
+    target.setdefault(user, {})[objaw] = partial if current is None else current.combine(partial)
+
+
+class _Rollups:
+    """Archived partials plus the log rows folded in so far."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.archive_generation = object()
+        self.archived = Snapshot({}, {})
+        self.current = Snapshot({}, {})
+        self.epoch = None
+        self.applied = 0
+        self.delta = None
+        self.tail_updates = 0
+        self.rebuilds = 0
+
+    def _load_archived(self) -> Snapshot:
+        courses, monthly, missing = {}, {}, 0
+        for e in archive.manifest():
+            stored = stored_partials(e)
+            if stored is None:
+                # Written before partitions carried (all of) their rollups.
+                missing += 1
+                rows = archive.read(e["user"], date.fromisoformat(e["min_date"]), date.fromisoformat(e["max_date"]))
+                stored = partition_json(rows)
+            totals = [0, 0, 0, 0]
+            for objaw, data in stored.items():
+                partial = _Partial.from_json(data)
+                _add(courses, e["user"], objaw, partial)
+                totals[0] += partial.n
+                totals[1] += partial.sy
+                totals[2] += partial.so
+                totals[3] += partial.sc
+            if stored:
+                _add_monthly(monthly, {e["month"]: tuple(totals)})
+        if missing:
+            logger.warning(
+                "Read %d archive partition(s) without stored rollups; "
+                "run `python -m ybocs.rollups --backfill`", missing,
+            )
+        return Snapshot(courses, monthly)
+
+    def _unarchived(self, rows: pd.DataFrame) -> pd.DataFrame:
+        """Drop rows that are already in the archive.
+
+        Between a compaction's manifest update and its log rewrite the same
+        rows are in both places. Only rows not newer than the newest
+        archived result of their (user, objaw) can be such duplicates;
+        those are checked against the archive itself.
+        """
+        archived = self.archived.courses
+        if not archived or rows.empty:
+            return rows
+        suspect = np.zeros(len(rows), dtype=bool)
+        ts = rows["timestamp"].to_numpy("datetime64[ns]").astype(np.int64)
+        groups = rows.groupby([rows["user"].astype(str), rows["objaw"].astype(str)], observed=True).indices
+        for (user, objaw), idx in groups.items():
+            partial = archived.get(user, {}).get(objaw)
+            if partial is not None:
+                suspect[idx] = ts[idx] <= partial.max_ts
+        if not suspect.any():
+            return rows
+        candidates = rows[suspect]
+        keys = []
+        for user, dates in candidates.groupby(candidates["user"].astype(str), observed=True)["date"]:
+            keys.append(archive.row_keys(archive.read(user, dates.min().date(), dates.max().date())))
+        seen = np.isin(archive.row_keys(candidates), np.concatenate(keys))
+        suspect[np.flatnonzero(suspect)[~seen]] = False
+        return rows[~suspect]
+
+    def get(self) -> Snapshot:
+        delta, epoch = storage.load_delta_epoch()
+        generation = archive.generation()
+        if delta is self.delta and generation == self.archive_generation:
+            return self.current
+        with self.lock:
+            if generation != self.archive_generation:
+                self.archived = self._load_archived()
+                self.archive_generation = generation
+                self.epoch = None
+            if epoch != self.epoch or len(delta) < self.applied:
+                self.current, self.applied = self.archived, 0
+                self.epoch = epoch
+                self.rebuilds += 1
+            new = self._unarchived(delta.iloc[self.applied:])
+            if not new.empty:
+                courses = dict(self.current.courses)
+                for user in new["user"].astype(str).unique():
+                    courses[user] = dict(courses.get(user, {}))
+                for (user, objaw), partial in summarize(new).items():
+                    _add(courses, user, objaw, partial)
+                monthly = dict(self.current.monthly)
+                _add_monthly(monthly, _monthly(new))
+                self.current = Snapshot(courses, monthly)
+                self.tail_updates += 1
+            self.applied = len(delta)
+            self.delta = delta
+            return self.current
+
+
+_rollups = _Rollups()
+
+
+def user_rollups(user: str) -> list:
+    """``Rollup`` of every symptom the user has results for, by symptom."""
+    parts = _rollups.get().courses.get(user, {})
+    return [parts[objaw].rollup(user, objaw) for objaw in sorted(parts)]
+
+
+def rollup(user: str, objaw: str):
+    """``Rollup`` of one (user, objaw), or None without results."""
+    partial = _rollups.get().courses.get(user, {}).get(objaw)
+    return None if partial is None else partial.rollup(user, objaw)
+
+
+def all_rollups():
+    """Yield the ``Rollup`` of every (user, objaw)."""
+    for user, parts in _rollups.get().courses.items():
+        for objaw, partial in parts.items():
+            yield partial.rollup(user, objaw)
+
+
+def snapshot() -> Snapshot:
+    """Current state, for views over all patients (see ``cohort``)."""
+    return _rollups.get()
+
+
+def cold_summary(user: str) -> pd.DataFrame:
+    """Monthly mean score per symptom of the user's cold-tier results.
+
+    Answered from the partials stored in the manifest, so the results tabs
+    can show the archived part of a trend without reading the cold file.
+    Columns ``date`` (first day of the month), ``objaw``, ``suma`` (mean)
+    and ``count``.
+    """
+    records = [
+        (e["month"], objaw, data["sy"] / data["n"], data["n"])
+        for e in archive.select(user) if archive.is_cold(e)
+        for objaw, data in (stored_partials(e) or {}).items()
+    ]
+    df = pd.DataFrame.from_records(records, columns=["date", "objaw", "suma", "count"])
+    df["date"] = pd.to_datetime(df["date"], format="%Y-%m")
+    return df.sort_values(["objaw", "date"], ignore_index=True)
+
+
+def rebuild() -> Snapshot:
+    """The state recomputed from the full results."""
+    courses, monthly = {}, {}
+    for rows in storage.iter_results():
+        for (user, objaw), partial in summarize(rows).items():
+            _add(courses, user, objaw, partial)
+        _add_monthly(monthly, _monthly(rows))
+    return Snapshot(courses, monthly)
+
+
+def _flatten(state: Snapshot) -> dict:
+    out = {(u, o): p.rollup(u, o) for u, parts in state.courses.items() for o, p in parts.items()}
+    out.update({("month", m): t for m, t in state.monthly.items()})
+    return out
+
+
+def check() -> list:
+    """``(key, maintained, rebuilt)`` for every rollup or monthly total that differs."""
+    maintained, rebuilt = _flatten(snapshot()), _flatten(rebuild())
+    return [
+        (key, maintained.get(key), rebuilt.get(key))
+        for key in sorted(maintained.keys() | rebuilt.keys())
+        if maintained.get(key) != rebuilt.get(key)
+    ]
+
+
+def stats() -> dict:
+    return {
+        "keys": sum(len(parts) for parts in _rollups.current.courses.values()),
+        "tail_updates": _rollups.tail_updates,
+        "rebuilds": _rollups.rebuilds,
+    }
+
+
+metrics.register("rollups", stats)
+
+
+def main(argv=None):
+    import argparse
+
+    parser = argparse.ArgumentParser(
+        description="Check the maintained trend rollups against a full recomputation."
+    )
+    parser.add_argument(
+        "--backfill", action="store_true",
+        help="first store rollups in archive partitions that were written without them",
+    )
+    args = parser.parse_args(argv)
+    if args.backfill:
+        print(f"Backfilled {archive.backfill_rollups()} partition(s).")
+    mismatches = check()
+    print(f"{stats()['keys']} rollup(s), {len(mismatches)} mismatch(es).")
+    for key, maintained, rebuilt in mismatches:
+        print(f"{key}:\n  maintained: {maintained}\n  rebuilt:    {rebuilt}")
+    raise SystemExit(1 if mismatches else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,166 @@
+"""Column schema of the Y-BOCS results and its validation.
+
+In memory the results use compact dtypes: categories for the repeated
+strings, datetime64 for dates and small integers for the scores. The same
+rules are checked on load (invalid rows are dropped and logged) and on
+append (invalid rows are refused).
+"""
+import logging
+import numbers
+from datetime import date, datetime
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+QUESTION_COLUMNS = [f"q{i}" for i in range(1, 11)]
+SCORE_COLUMNS = QUESTION_COLUMNS + ["suma"]
+CATEGORY_COLUMNS = ["user", "role", "objaw"]
+DATETIME_COLUMNS = ["timestamp", "date"]
+TEXT_COLUMNS = ["timestamp", "date", "user", "role", "objaw"]
+RESULTS_COLUMNS = TEXT_COLUMNS + SCORE_COLUMNS
+
+RESULTS_DTYPES = {
+    "timestamp": "datetime64[ns]",
+    "date": "datetime64[ns]",
+    "user": "category",
+    "role": "category",
+    "objaw": "category",
+    **{q: "int8" for q in QUESTION_COLUMNS},
+    "suma": "int16",
+}
+
+ITEM_MIN, ITEM_MAX = 0, 4
+# A UTC offset after the time ("Z", "+02:00", "-0500"). Times are stored as
+# naive local times; an aware value cannot go into a datetime64 column.
+_UTC_OFFSET = r"\d{2}:\d{2}(?::\d{2}(?:[.,]\d+)?)?\s*(?:[zZ]|[+-]\d{2}(?::?\d{2})?)$"
+
+
+def arrow_schema():
+    """pyarrow schema of the results, with plain strings for the categories.
+
+    Used where many partitions or chunks must share one schema; each frame
+    has its own categories, so their dictionary types need not match.
+    """
+    import pyarrow as pa
+
+    return pa.schema(
+        [(c, pa.timestamp("ns")) for c in DATETIME_COLUMNS]
+        + [(c, pa.string()) for c in CATEGORY_COLUMNS]
+        + [(q, pa.int8()) for q in QUESTION_COLUMNS]
+        + [("suma", pa.int16())]
+    )
+
+
+def empty_results() -> pd.DataFrame:
+    return pd.DataFrame({c: pd.Series(dtype=t) for c, t in RESULTS_DTYPES.items()})
+
+
+def check_results(df: pd.DataFrame) -> tuple:
+    """Vectorized ``validate_row`` for raw (string) rows.
+
+    Returns ``(typed, reasons)``: the valid rows converted to the schema,
+    and for every invalid row (by index) the first problem found.
+    """
+    if df.empty:
+        return empty_results(), pd.Series(dtype=object)
+    aware = {c: df[c].astype("string").str.contains(_UTC_OFFSET, na=False) for c in DATETIME_COLUMNS}
+    ts = pd.to_datetime(df["timestamp"].mask(aware["timestamp"]), format="ISO8601", errors="coerce")
+    day = pd.to_datetime(df["date"].mask(aware["date"]), format="ISO8601", errors="coerce").dt.normalize()
+    scores = df[SCORE_COLUMNS].apply(pd.to_numeric, errors="coerce")
+    items = scores[QUESTION_COLUMNS]
+
+    checks = [
+        (aware["timestamp"], "timestamp: UTC offsets are not supported"),
+        (ts.isna(), "timestamp: invalid date"),
+        (aware["date"], "date: UTC offsets are not supported"),
+        (day.isna(), "date: invalid date"),
+        (df["user"].isna(), "user: missing"),
+        *[
+            (~items[q].isin(range(ITEM_MIN, ITEM_MAX + 1)), f"{q}: expected an integer {ITEM_MIN}–{ITEM_MAX}")
+            for q in QUESTION_COLUMNS
+        ],
+        (~scores["suma"].eq(items.sum(axis=1)), "suma: does not match q1–q10"),
+    ]
+    reason = np.select([c.to_numpy() for c, _ in checks], [r for _, r in checks], default="")
+    invalid = reason != ""
+    reasons = pd.Series(reason[invalid], index=df.index[invalid], dtype=object)
+    if invalid.any():
+        valid = ~invalid
+        df, ts, day, scores = df[valid], ts[valid], day[valid], scores[valid]
+
+    typed = {
+        "timestamp": ts.astype("datetime64[ns]"),
+        "date": day.astype("datetime64[ns]"),
+        **{c: df[c].astype("category") for c in CATEGORY_COLUMNS},
+        **{q: scores[q].astype("int8") for q in QUESTION_COLUMNS},
+        "suma": scores["suma"].astype("int16"),
+    }
+    return pd.DataFrame(typed, index=df.index), reasons
+
+
+def coerce_results(df: pd.DataFrame) -> pd.DataFrame:
+    """Convert raw (string) results to the schema, dropping invalid rows."""
+    typed, reasons = check_results(df)
+    if len(reasons):
+        logger.warning("Skipping %d invalid result row(s)", len(reasons))
+    return typed
+
+
+def results_text(df: pd.DataFrame) -> pd.DataFrame:
+    """Typed rows with the dates as text, written as in ``wyniki.csv``."""
+    out = df[RESULTS_COLUMNS].copy()
+    out["timestamp"] = np.datetime_as_string(out["timestamp"].to_numpy(), unit="s")
+    out["date"] = np.datetime_as_string(out["date"].to_numpy(), unit="D")
+    return out
+
+
+def concat_results(frames: list) -> pd.DataFrame:
+    """Concatenate typed frames, keeping the categorical columns categorical."""
+    frames = [f for f in frames if not f.empty]
+    if not frames:
+        return empty_results()
+    if len(frames) == 1:
+        return frames[0]
+    # Cast to shared categories first: pd.concat of differing categoricals
+    # falls back to object columns and re-encodes every row.
+    dtypes = {}
+    for c in CATEGORY_COLUMNS:
+        categories = frames[0][c].cat.categories
+        for f in frames[1:]:
+            categories = categories.union(f[c].cat.categories)
+        dtypes[c] = pd.CategoricalDtype(categories)
+    return pd.concat([f.astype(dtypes) for f in frames], ignore_index=True)
+
+
+def validate_row(row: dict) -> dict:
+    """Return ``row`` with normalized values or raise ``ValueError``."""
+    clean = {}
+    for c in DATETIME_COLUMNS:
+        value = row.get(c)
+        if isinstance(value, (date, datetime)):
+            value = value.isoformat()
+        try:
+            parsed = datetime.fromisoformat(str(value))
+        except ValueError:
+            raise ValueError(f"{c}: invalid date {value!r}") from None
+        if parsed.tzinfo is not None:
+            raise ValueError(f"{c}: UTC offsets are not supported, got {value!r}")
+        clean[c] = value
+    if not row.get("user"):
+        raise ValueError("user: missing")
+    clean["user"] = str(row["user"])
+    for c in ("role", "objaw"):
+        clean[c] = "" if row.get(c) is None else str(row[c])
+
+    for q in QUESTION_COLUMNS:
+        value = row.get(q)
+        if isinstance(value, bool) or not isinstance(value, numbers.Integral) or not ITEM_MIN <= value <= ITEM_MAX:
+            raise ValueError(f"{q}: expected an integer {ITEM_MIN}–{ITEM_MAX}, got {value!r}")
+        clean[q] = int(value)
+    total = sum(clean[q] for q in QUESTION_COLUMNS)
+    if row.get("suma") != total:
+        raise ValueError(f"suma: expected {total}, got {row.get('suma')!r}")
+    clean["suma"] = total
+    return clean
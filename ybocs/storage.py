@@ -0,0 +1,374 @@
+"""Append-only storage for Y-BOCS results.
+
+``data/wyniki.csv`` is treated as an append-only log: every save writes a
+single CSV line at the end of the file instead of re-reading and rewriting
+the whole history, so the cost of a save does not depend on how many
+results have been recorded so far.
+
+Reads go through a process-wide cache keyed on the file identity. Streamlit
+runs every session in the same process, so all sessions share one parsed
+frame; when the log only grew, just the new tail is parsed. While ``watch``
+reports no change to the log, a read does not touch the disk at all.
+
+Older results are moved by ``compact_results`` into the partitioned archive
+(see ``archive``); the log then only holds the rows saved since.
+"""
+import csv
+import io
+import itertools
+import os
+import threading
+from collections import OrderedDict
+from datetime import date
+
+import numpy as np
+import pandas as pd
+
+from . import archive, metrics, watch, writer
+from .config import RESULTS_FILE, ensure_dirs
+from .schema import (
+    RESULTS_COLUMNS,
+    TEXT_COLUMNS,
+    coerce_results,
+    concat_results,
+    results_text,
+    validate_row,
+)
+
+RESULTS_HEADER = ",".join(RESULTS_COLUMNS) + "\n"
+
+# Bytes just before the consumed offset, re-read before a tail ingestion to
+# tell a genuine append from an in-place rewrite of the same file.
+_FINGERPRINT_BYTES = 64
+
+_initialized = False
+
+# Numbers the frames read from scratch; see ``load_delta_epoch``.
+_epochs = itertools.count(1)
+
+
+def _format_rows(rows) -> str:
+    buf = io.StringIO()
+    writer = csv.writer(buf, lineterminator="\n")
+    for row in rows:
+        writer.writerow(["" if row.get(c) is None else row.get(c) for c in RESULTS_COLUMNS])
+    return buf.getvalue()
+
+
+def _migrate_results_file():
+    """Bring a file written by the old read/concat/rewrite code into log form.
+
+    The old code let pandas decide the column order and did not guarantee a
+    trailing newline. Both break blind appends, so a non-conforming file is
+    rewritten once (atomically) with the canonical header; afterwards this is
+    a cheap header check.
+    """
+    with open(RESULTS_FILE, "rb") as f:
+        header = f.readline().decode("utf-8-sig")
+        f.seek(0, os.SEEK_END)
+        size = f.tell()
+        if size:
+            f.seek(size - 1)
+            ends_with_newline = f.read(1) == b"\n"
+        else:
+            ends_with_newline = False
+    if header == RESULTS_HEADER and ends_with_newline:
+        return
+
+    if size:
+        df = pd.read_csv(RESULTS_FILE, dtype=str, keep_default_na=False, encoding="utf-8-sig")
+        df = df.reindex(columns=RESULTS_COLUMNS, fill_value="")
+    else:
+        df = pd.DataFrame(columns=RESULTS_COLUMNS)
+    data = df.to_csv(index=False, lineterminator="\n").encode("utf-8")
+    writer.atomic_write(RESULTS_FILE, data)
+
+
+def _init_results_file():
+    global _initialized
+    if _initialized and RESULTS_FILE.exists():
+        return
+    ensure_dirs()
+    if not RESULTS_FILE.exists():
+        writer.atomic_write(RESULTS_FILE, RESULTS_HEADER.encode("utf-8"))
+    else:
+        _migrate_results_file()
+    _initialized = True
+
+
+def init_results_file():
+    if _initialized and RESULTS_FILE.exists():
+        return
+    writer.run_serialized(_init_results_file, lock=RESULTS_FILE)
+
+
+@metrics.timed("results.append")
+def append_results(rows: list):
+    """Append several result rows with a single write.
+
+    Every row is validated against the schema first; ``ValueError`` is raised
+    and nothing is written if any row is invalid. Returns once the rows are
+    durable on disk (see ``writer``).
+    """
+    if not rows:
+        return
+    clean = [validate_row(row) for row in rows]
+    init_results_file()
+    writer.append_bytes(RESULTS_FILE, _format_rows(clean).encode("utf-8"))
+
+
+def append_result(row: dict):
+    append_results([row])
+
+
+def append_frame(df: pd.DataFrame):
+    """Append typed rows (already checked, e.g. by ``schema.check_results``)
+    with a single write; for bulk imports."""
+    if df.empty:
+        return
+    init_results_file()
+    text = results_text(df).to_csv(header=False, index=False, lineterminator="\n")
+    writer.append_bytes(RESULTS_FILE, text.encode("utf-8"))
+
+
+def _parse(data, header: bool) -> pd.DataFrame:
+    df = pd.read_csv(
+        data,
+        header=0 if header else None,
+        names=None if header else RESULTS_COLUMNS,
+        dtype={c: str for c in TEXT_COLUMNS},
+        encoding="utf-8",
+    )
+    return coerce_results(df)
+
+
+class _ResultsCache:
+    """Parsed results plus the identity of the file they were read from."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.clear()
+
+    def clear(self):
+        self.frame = None
+        self.dev_ino = None
+        self.size = -1
+        self.mtime_ns = -1
+        self.offset = 0
+        self.fingerprint = b""
+        self.generation = None
+        self.epoch = 0
+        self.full_loads = 0
+        self.tail_loads = 0
+        self.hits = 0
+
+    def _remember(self, st, f, offset: int):
+        self.dev_ino = (st.st_dev, st.st_ino)
+        self.size = st.st_size
+        self.mtime_ns = st.st_mtime_ns
+        self.offset = offset
+        start = max(0, offset - _FINGERPRINT_BYTES)
+        f.seek(start)
+        self.fingerprint = f.read(offset - start)
+
+    def _full_load(self, st):
+        with open(RESULTS_FILE, "rb") as f:
+            data = f.read(st.st_size)
+            # Only complete lines count; a half-written last line is picked
+            # up by the next tail read.
+            offset = data.rfind(b"\n") + 1
+            self.frame = _parse(io.BytesIO(data[:offset]), header=True)
+            self._remember(st, f, offset)
+        metrics.count("results.bytes_read", offset)
+        metrics.count("results.rows_parsed", len(self.frame))
+        self.epoch = next(_epochs)
+        self.full_loads += 1
+
+    def _tail_load(self, st) -> bool:
+        with open(RESULTS_FILE, "rb") as f:
+            start = max(0, self.offset - _FINGERPRINT_BYTES)
+            f.seek(start)
+            if f.read(self.offset - start) != self.fingerprint:
+                return False
+            tail = f.read(st.st_size - self.offset)
+            end = tail.rfind(b"\n") + 1
+            if end:
+                new_rows = _parse(io.BytesIO(tail[:end]), header=False)
+                self.frame = concat_results([self.frame, new_rows])
+                metrics.count("results.rows_parsed", len(new_rows))
+            metrics.count("results.bytes_read", end)
+            self._remember(st, f, self.offset + end)
+        self.tail_loads += 1
+        return True
+
+    def get(self) -> pd.DataFrame:
+        if not _initialized:
+            init_results_file()
+        # Read before the stat so a change racing with the load is not lost.
+        generation = watch.generation(RESULTS_FILE)
+        if self.frame is not None and generation == self.generation:
+            self.hits += 1
+            return self.frame
+        try:
+            st = os.stat(RESULTS_FILE)
+        except FileNotFoundError:
+            init_results_file()
+            st = os.stat(RESULTS_FILE)
+        with self.lock:
+            self.generation = generation
+            if self.frame is not None and (st.st_dev, st.st_ino) == self.dev_ino:
+                if st.st_size == self.size and st.st_mtime_ns == self.mtime_ns:
+                    self.hits += 1
+                    return self.frame
+                if st.st_size >= self.offset and self._tail_load(st):
+                    return self.frame
+            # New file, truncation or rewrite: start over.
+            self._full_load(st)
+            return self.frame
+
+
+_cache = _ResultsCache()
+
+# (archive generation, delta frame id, user, start, end) -> combined frame
+_combined = OrderedDict()
+_COMBINED_CACHE_SIZE = 64
+
+
+def load_delta() -> pd.DataFrame:
+    """Rows saved since the last compaction (the contents of the log)."""
+    return _cache.get()
+
+
+def load_delta_epoch():
+    """``(frame, epoch)`` of the log rows.
+
+    While the epoch stays the same, a newer frame starts with exactly the
+    rows of an older one (only a tail was appended), so a consumer can
+    process just the rows past the ones it has seen.
+    """
+    while True:
+        frame = _cache.get()
+        with _cache.lock:
+            if _cache.frame is frame:
+                return frame, _cache.epoch
+
+
+@metrics.timed("results.load")
+def load_results(user: str = None, start: date = None, end: date = None, cold: bool = True) -> pd.DataFrame:
+    """Return results as a frame typed per ``schema.RESULTS_DTYPES``.
+
+    ``user`` and the inclusive ``start``/``end`` dates restrict which archive
+    partitions are read; ``cold=False`` leaves out the cold tier (see
+    ``retention``). Frames are shared by every session in the process
+    and must be treated as read-only; filter or ``.copy()`` before modifying.
+    """
+    delta = _cache.get()
+    if archive.generation() is None and user is None and start is None and end is None:
+        return delta
+
+    key = (archive.generation(), id(delta), user, start, end, cold)
+    with _cache.lock:
+        hit = _combined.get(key)
+        if hit is not None and hit[0] is delta:
+            _combined.move_to_end(key)
+            return hit[1]
+
+    recent = delta
+    if user is not None:
+        recent = recent[recent["user"] == user]
+    if start is not None or end is not None:
+        recent = recent[archive.filter_dates(recent, start, end)]
+    archived = archive.read(user, start, end, cold)
+    df = concat_results([archived, recent])
+    if not archived.empty and not recent.empty:
+        # Between a compaction's manifest update and its log rewrite the same
+        # rows are briefly in both places.
+        df = df.drop_duplicates(archive.DEDUP_COLUMNS, ignore_index=True)
+
+    with _cache.lock:
+        _combined[key] = (delta, df)
+        while len(_combined) > _COMBINED_CACHE_SIZE:
+            _combined.popitem(last=False)
+    return df
+
+
+def iter_results(user: str = None, start: date = None, end: date = None):
+    """Yield the results as typed frames, a batch of partitions at a time.
+
+    Same rows as ``load_results`` with the same filters, but never more
+    than one batch (plus the log) in memory; meant for exports.
+    """
+    recent = _cache.get()
+    if user is not None:
+        recent = recent[recent["user"] == user]
+    if start is not None or end is not None:
+        recent = recent[archive.filter_dates(recent, start, end)]
+    # Archived rows that may also still be in the log: same patients, dates
+    # from the first month the log covers.
+    if recent.empty:
+        users, since = set(), None
+    else:
+        users = set(recent["user"].astype(str))
+        since = recent["date"].min().to_period("M").start_time
+
+    archived_keys = []
+    for rows in archive.scan(user, start, end):
+        if since is not None:
+            overlap = rows[(rows["date"] >= since) & rows["user"].astype(str).isin(users)]
+            archived_keys.append(archive.row_keys(overlap))
+        if not rows.empty:
+            yield rows
+    if archived_keys:
+        # See load_results: rows caught between the two steps of a compaction.
+        recent = recent[~np.isin(archive.row_keys(recent), np.concatenate(archived_keys))]
+    if not recent.empty:
+        yield recent
+
+
+def compact_results(before: date = None) -> int:
+    """Move the logged rows into the archive and restart the log.
+
+    With ``before``, only rows dated earlier are moved and the rest stay in
+    the log. Returns the number of rows moved. Runs on the writer thread
+    holding the log's cross-process lock, so no save from any replica can
+    land in between. The log is only shortened after the partitions and
+    manifest are durably written; bytes past the consumed offset are
+    carried over to the new log.
+    """
+
+    def compact() -> int:
+        # The frame and the offset it was read up to, as one snapshot; a
+        # concurrent reader may tail-load between two unlocked reads.
+        while True:
+            delta = _cache.get()
+            with _cache.lock:
+                if _cache.frame is delta:
+                    offset = _cache.offset
+                    break
+        kept = delta.iloc[0:0]
+        if before is not None:
+            old = delta["date"] < pd.Timestamp(before)
+            delta, kept = delta[old], delta[~old]
+            if delta.empty:
+                return 0
+        archive.merge(delta)
+        with open(RESULTS_FILE, "rb") as f:
+            f.seek(offset)
+            rest = f.read()
+        text = results_text(kept).to_csv(header=False, index=False, lineterminator="\n")
+        writer.atomic_write(RESULTS_FILE, (RESULTS_HEADER + text).encode("utf-8") + rest)
+        return len(delta)
+
+    return writer.run_serialized(compact, lock=RESULTS_FILE, timeout=None)
+
+
+def results_cache_stats() -> dict:
+    return {"hits": _cache.hits, "full_loads": _cache.full_loads, "tail_loads": _cache.tail_loads}
+
+
+def invalidate_results_cache():
+    with _cache.lock:
+        _cache.clear()
+
+
+metrics.register("results_cache", results_cache_stats)
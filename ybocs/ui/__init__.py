@@ -0,0 +1,6 @@
+"""Streamlit views of the app; ``app.py`` only wires them together.
+
+The login page needs nothing but ``common`` and ``auth``. ``admin`` and
+``patient`` pull in pandas, matplotlib and the results store, so ``app.py``
+imports them only once a user is logged in.
+"""
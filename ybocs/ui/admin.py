@@ -0,0 +1,401 @@
+"""Administrator views: accounts, symptom assignment, patient results, the cohort and diagnostics."""
+import io
+from functools import lru_cache
+
+import pandas as pd
+import streamlit as st
+
+from .. import export, metrics, reports
+from ..charts import trend_png
+from ..credentials import add_user, get_user, patient_choices, resolve_login, search_accounts
+from ..domain import CATALOG, split_selection
+from ..hashing import HashingBusy, hash_password
+from ..importer import import_results
+from ..query import result_symptoms, results_bounds, results_query
+from ..schema import empty_results
+from ..storage import iter_results
+from ..user_symptoms import load_user_symptoms, save_user_symptoms
+from . import cohort, diagnostics
+from .common import BUSY_MESSAGE, RESULT_SORT_COLUMNS, widget_key_for
+from .paging import page_bounds, paged_dataframe
+from .state import register_keys
+from .trends import chart_frame, cold_toggle, render_rollups
+
+
+def admin_create_user_ui():
+    st.subheader("Dodaj nowego pacjenta")
+    st.caption(
+        "Podaj dane pacjenta. Przy pierwszym logowaniu pacjent wpisze własne hasło, "
+        "pozostawiając pole hasła w formularzu logowania puste."
+    )
+
+    with st.form("register_form"):
+        first_name = st.text_input("Imię", max_chars=50)
+        surname_letters = st.text_input("Pierwsze trzy litery nazwiska", max_chars=3)
+        login = st.text_input("Login", max_chars=32)
+        submitted = st.form_submit_button("Zapisz konto")
+
+    if not submitted:
+        return
+
+    errors = []
+    first_name_clean = first_name.strip()
+    letters_clean = surname_letters.strip().replace(" ", "")
+    login_clean = login.strip()
+
+    if not first_name_clean:
+        errors.append("Imię jest wymagane.")
+    if len(letters_clean) != 3 or not letters_clean.isalpha():
+        errors.append("Podaj dokładnie trzy litery nazwiska (bez znaków specjalnych).")
+    if not login_clean:
+        errors.append("Login jest wymagany.")
+    elif resolve_login(login_clean) is not None:
+        errors.append("Taki login już istnieje.")
+    if errors:
+        for err in errors:
+            st.error(err)
+        return
+
+    display_name = f"{first_name_clean.title()} {letters_clean.upper()}"
+    try:
+        hashed_password = hash_password("")
+    except HashingBusy:
+        st.error(BUSY_MESSAGE)
+        return
+
+    try:
+        # Re-checked under the journal lock: another admin may have just taken it.
+        add_user(login_clean, {
+            "email": f"{login_clean}@example.com",
+            "name": display_name,
+            "password": hashed_password,
+            "role": "user",
+            "force_password_reset": True,
+        })
+    except ValueError as exc:
+        st.error(str(exc))
+        return
+
+    st.success(
+        f"Dodano pacjenta **{display_name}** (login: {login_clean}). "
+        "Przekaż login i poinformuj o pustym haśle przy pierwszym logowaniu."
+    )
+    st.rerun()
+
+
+ACCOUNT_SORT_LABELS = {"login": "Login", "name": "Nazwa", "role": "Rola"}
+
+
+def render_accounts(widget_user: str):
+    """Searchable account list; only the visible page is built and sent."""
+    cols = st.columns([2, 1, 1])
+    text = cols[0].text_input("Szukaj (login lub nazwa)", key=widget_key_for(widget_user, "accounts_search"))
+    prefix = cols[1].toggle("Tylko początek", key=widget_key_for(widget_user, "accounts_prefix"))
+    sort = cols[2].selectbox(
+        "Sortuj według",
+        list(ACCOUNT_SORT_LABELS),
+        format_func=ACCOUNT_SORT_LABELS.get,
+        key=widget_key_for(widget_user, "accounts_sort"),
+    )
+    rows = search_accounts(text, prefix, sort)
+    if not rows:
+        st.info("Brak kont." if not text.strip() else "Brak kont pasujących do wyszukiwania.")
+        return
+    start, stop = page_bounds(len(rows), widget_key_for(widget_user, "accounts_table"))
+    page = pd.DataFrame(
+        [
+            {
+                "Login": r.login,
+                "Nazwa": r.name,
+                "Rola": r.role,
+                "Hasło ustawione": "Tak" if r.password_set else "Nie",
+            }
+            for r in rows[start:stop]
+        ]
+    )
+    with metrics.span("ui.dataframe"):
+        st.dataframe(page, hide_index=True, width="stretch")
+
+
+@lru_cache(maxsize=256)
+def _symptom_widget_keys(target_username: str) -> tuple:
+    """Widget keys of every checklist item, per group, for one patient,
+    and the set of all session-state keys the editor creates for them.
+    """
+    widget_user = target_username or "anon"
+    per_group = tuple(tuple(widget_key_for(widget_user, item.key) for item in group.items) for group in CATALOG)
+    owned = {k for group_keys in per_group for key in group_keys for k in (key, f"{key}_text")}
+    owned.add(f"save_symptoms_{target_username}")
+    return per_group, frozenset(owned)
+
+
+def render_symptom_editor(target_username: str):
+    st.caption('Zaznacz objawy dotyczące pacjenta. Zapis nastąpi po kliknięciu „Zapisz objawy”.')
+
+    stored = split_selection(frozenset(load_user_symptoms(target_username)))
+    # Only groups whose checkboxes differ from the stored list are rebuilt.
+    changed = {}
+
+    widget_keys, owned_keys = _symptom_widget_keys(target_username)
+    register_keys("symptoms", target_username, owned_keys)
+    for group, group_keys in zip(CATALOG, widget_keys):
+        current = stored.by_group.get(group.name, frozenset())
+        stored_custom_text = stored.custom_text.get(group.name)
+        with st.expander(group.name, expanded=False):
+            new_vals = set()
+            for item, widget_key in zip(group.items, group_keys):
+                if item.is_other:
+                    inne_default_checked = group.other_key in current or stored_custom_text is not None
+                    checked = st.checkbox(item.label, value=inne_default_checked, key=widget_key)
+                    text_key = f"{widget_key}_text"
+                    if checked:
+                        custom_input = st.text_input(
+                            f"Inne – {group.name}",
+                            value=stored_custom_text or "",
+                            placeholder="Opisz własnymi słowami…",
+                            key=text_key,
+                        )
+                        custom_input_clean = custom_input.strip()
+                        if custom_input_clean:
+                            new_vals.add(f"{group.custom_prefix}{custom_input_clean}")
+                        else:
+                            new_vals.add(group.other_key)
+                    else:
+                        if text_key in st.session_state:
+                            st.session_state.pop(text_key)
+                else:
+                    checked = st.checkbox(item.label, value=(item.key in current), key=widget_key)
+                    if checked:
+                        new_vals.add(item.key)
+
+        if new_vals != current:
+            changed[group.name] = new_vals
+
+    if st.button("Zapisz objawy", type="primary", key=f"save_symptoms_{target_username}"):
+        selected = dict(stored.by_group, **changed)
+        save_user_symptoms(target_username, sorted(k for keys in selected.values() for k in keys))
+        st.success("Zapisano listę objawów.")
+
+
+def render_export(widget_user: str, view):
+    st.subheader("Eksport")
+    export_cols = st.columns(2)
+    with export_cols[0]:
+        scope = st.radio(
+            "Zakres eksportu",
+            ["Bieżący widok", "Wszystkie wyniki"],
+            horizontal=True,
+            key=widget_key_for(widget_user, "export_scope"),
+        )
+    with export_cols[1]:
+        fmt = st.selectbox(
+            "Format",
+            list(export.FORMATS),
+            format_func=lambda f: export.FORMATS[f][0],
+            key=widget_key_for(widget_user, "export_format"),
+        )
+
+    def make():
+        # Runs only when the button is clicked, not on every rerun.
+        frames = [view] if scope == "Bieżący widok" else iter_results()
+        return export.export_file(frames, fmt)
+
+    st.download_button(
+        "Pobierz",
+        data=make,
+        file_name=export.file_name(fmt),
+        mime=export.mime_type(fmt),
+        on_click="ignore",
+        disabled=scope == "Bieżący widok" and view.empty,
+        key=widget_key_for(widget_user, "export_download"),
+    )
+
+
+def render_import(widget_user: str):
+    """Upload of historical results; see ``ybocs.importer``."""
+    st.subheader("Import wyników historycznych")
+    st.caption(
+        "Plik CSV lub XLSX z kolumnami date (RRRR-MM-DD), user (login), objaw i q1–q10; "
+        "opcjonalnie timestamp, role i suma. Wyniki już zapisane są pomijane, więc przerwany "
+        "import można powtórzyć."
+    )
+    upload = st.file_uploader("Plik", type=["csv", "xlsx"], key=widget_key_for(widget_user, "import_file"))
+    result_key = widget_key_for(widget_user, "import_result")
+    if upload is not None and st.button("Importuj", key=widget_key_for(widget_user, "import_run")):
+        rejects = io.BytesIO()
+        status = st.empty()
+
+        def show(r):
+            status.caption(
+                f"Wczytano {r.read} wierszy: zapisano {r.imported}, duplikatów {r.duplicates}, odrzucono {r.rejected}."
+            )
+
+        try:
+            report = import_results(upload, rejects, progress=show)
+        except ValueError as exc:
+            st.error(str(exc))
+            return
+        st.session_state[result_key] = (upload.name, report, rejects.getvalue())
+
+    result = st.session_state.get(result_key)
+    if result is None:
+        return
+    name, report, rejected = result
+    st.success(
+        f"{name}: zapisano {report.imported} z {report.read} wierszy "
+        f"(duplikatów {report.duplicates}, odrzuconych {report.rejected})."
+    )
+    if report.rejected:
+        st.download_button(
+            "Pobierz odrzucone wiersze",
+            data=rejected,
+            file_name=f"{name}.odrzucone.csv",
+            mime="text/csv",
+            on_click="ignore",
+            key=widget_key_for(widget_user, "import_rejects"),
+        )
+
+
+def render_reports(widget_user: str):
+    """Batch progress reports of all patients; see ``ybocs.reports``."""
+    st.subheader("Raporty postępów")
+    st.caption(
+        "Jednostronicowy raport każdego pacjenta: objawy, podsumowanie trendów, wykres nasilenia, "
+        "podskale i odpowiedzi z ostatniej oceny. Raporty, których dane się nie zmieniły, "
+        "nie są rysowane ponownie."
+    )
+    fmt = st.selectbox(
+        "Format raportów",
+        list(reports.FORMATS),
+        format_func=lambda f: reports.FORMATS[f][0],
+        key=widget_key_for(widget_user, "reports_format"),
+    )
+    result_key = widget_key_for(widget_user, "reports_result")
+    if st.button("Przygotuj raporty", key=widget_key_for(widget_user, "reports_run")):
+        bar = st.progress(0.0)
+        summary = reports.generate(
+            fmt=fmt, progress=lambda done, total: bar.progress(done / total, f"{done} / {total}")
+        )
+        bar.empty()
+        st.session_state[result_key] = (fmt, summary)
+
+    result = st.session_state.get(result_key)
+    if result is None:
+        return
+    done_fmt, summary = result
+    ready = summary.rendered + summary.unchanged
+    st.success(
+        f"Raporty: {len(ready)} (nowe lub zmienione: {len(summary.rendered)}); "
+        f"pacjenci bez wyników: {len(summary.empty)}."
+    )
+    if summary.failed:
+        st.error(f"Nie udało się przygotować raportów: {', '.join(summary.failed)}.")
+    st.download_button(
+        "Pobierz raporty (zip)",
+        data=lambda: reports.zip_reports(ready, done_fmt),
+        file_name=f"raporty_{done_fmt}.zip",
+        mime="application/zip",
+        on_click="ignore",
+        disabled=not ready,
+        key=widget_key_for(widget_user, "reports_download"),
+    )
+
+
+def render(username: str):
+    admin_widget_user = username or "admin"
+    tabs = st.tabs(["Pacjenci", "Objawy pacjentów", "Wyniki pacjentów", "Kohorta", "Diagnostyka"])
+    patients_tab, symptoms_tab, results_tab, cohort_tab, diagnostics_tab = tabs
+
+    with patients_tab:
+        st.header("Zarządzanie pacjentami")
+        admin_create_user_ui()
+
+        st.subheader("Istniejące konta")
+        render_accounts(admin_widget_user)
+
+    with symptoms_tab:
+        st.header("Objawy pacjentów")
+        choices = patient_choices()
+        if not choices:
+            st.info('Brak pacjentów do konfiguracji. Dodaj konto w zakładce „Pacjenci”.')
+        else:
+            selected_label = st.selectbox(
+                "Pacjent",
+                ["— wybierz —", *choices],
+                key=widget_key_for(admin_widget_user, "symptoms_patient_select"),
+            )
+            selected_patient = choices.get(selected_label)
+
+            if selected_patient:
+                patient_name = get_user(selected_patient).get("name", selected_patient)
+                st.markdown(f"**Wybrany pacjent:** {patient_name} ({selected_patient})")
+                render_symptom_editor(selected_patient)
+
+    with results_tab:
+        st.header("Wyniki pacjentów")
+        bounds = results_bounds()
+        if bounds is None:
+            st.info("Brak wyników.")
+        else:
+            controls = st.columns(3)
+
+            with controls[0]:
+                filter_mode = st.radio("Zakres", ["Zakres dat", "Wybrany dzień"], horizontal=False)
+                if filter_mode == "Zakres dat":
+                    start = st.date_input("Od", value=bounds[0])
+                    end = st.date_input("Do", value=bounds[1])
+                else:
+                    single_day = st.date_input("Dzień", value=bounds[1])
+                    start = end = single_day
+
+            with controls[1]:
+                choices = patient_choices()
+                selected_label = st.selectbox(
+                    "Pacjent",
+                    ["— wybierz —", *choices],
+                    key=widget_key_for(admin_widget_user, "results_patient_select"),
+                )
+                patient = choices.get(selected_label)
+
+            with controls[2]:
+                if patient in (None, "— wybierz —"):
+                    my_symptoms = []
+                else:
+                    my_symptoms = result_symptoms(patient)
+                sym_opt = st.selectbox(
+                    "Objaw",
+                    ["(wszystkie)"] + my_symptoms,
+                    key=widget_key_for(admin_widget_user, "results_symptom_select"),
+                )
+
+            objaw = None if sym_opt == "(wszystkie)" else sym_opt
+            if patient in (None, "— wybierz —"):
+                st.info("Wybierz pacjenta, aby zobaczyć wyniki.")
+                view = chart = empty_results()
+            else:
+                render_rollups(patient)
+                show_cold = cold_toggle(patient, widget_key_for(admin_widget_user, "results_cold"))
+                view = results_query(patient, start, end, cold=show_cold).rows(
+                    patient, objaw=objaw, start=start, end=end
+                )
+                chart = view if show_cold else chart_frame(view, patient, objaw, start, end)
+
+            paged_dataframe(
+                view, widget_key_for(admin_widget_user, "results_table"), RESULT_SORT_COLUMNS, width="stretch"
+            )
+
+            if not chart.empty:
+                st.image(trend_png(chart, f"Nasilenie w czasie – {patient}"))
+
+            render_export(admin_widget_user, view)
+            render_reports(admin_widget_user)
+
+        render_import(admin_widget_user)
+
+    with cohort_tab:
+        st.header("Analiza kohorty")
+        cohort.render()
+
+    with diagnostics_tab:
+        st.header("Diagnostyka")
+        diagnostics.render()
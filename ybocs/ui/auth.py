@@ -0,0 +1,140 @@
+"""Login page and the forced password change after the first login."""
+import os
+import threading
+
+import streamlit as st
+import streamlit_authenticator as stauth
+from streamlit_authenticator.params import PRE_LOGIN_SLEEP_TIME
+
+from .. import metrics, retention
+from ..config import ensure_dirs
+from ..credentials import get_user, load_credentials, update_user
+from ..hashing import HashingBusy, hash_password, install as install_hashing
+from .common import BUSY_MESSAGE
+
+# Signs the re-authentication cookie; set YBOCS_COOKIE_KEY in deployments.
+COOKIE_KEY = os.environ.get("YBOCS_COOKIE_KEY", "random_signature_key_change_me")
+
+_started = False
+_start_lock = threading.Lock()
+
+
+def startup():
+    """Process-wide setup; done once, not on every rerun."""
+    global _started
+    if _started:
+        return
+    with _start_lock:
+        if not _started:
+            ensure_dirs()
+            install_hashing()
+            metrics.start()
+            retention.start()
+            _started = True
+
+
+def _authenticator():
+    with metrics.span("auth.credentials"):
+        credentials = load_credentials()
+    # Passwords in users.yaml are always stored hashed, so skip the per-rerun
+    # scan for plain-text passwords. The login widget sleeps before every
+    # run of the login page to give the cookie component time to answer;
+    # that is only needed on the first run of a session.
+    first_run = not st.session_state.get("login_cookie_checked")
+    return stauth.Authenticate(
+        credentials['credentials'],
+        cookie_name="ocd_app_cookie",
+        cookie_key=COOKIE_KEY,
+        cookie_expiry_days=7,
+        auto_hash=False,
+        login_sleep_time=PRE_LOGIN_SLEEP_TIME if first_run else 0,
+    )
+
+
+def _force_password_reset(username: str):
+    st.warning(
+        "To Twoje pierwsze logowanie. Ustaw nowe hasło, aby kontynuować korzystanie z aplikacji."
+    )
+
+    with st.form(f"force_password_reset_{username}"):
+        new_password = st.text_input("Nowe hasło", type="password")
+        new_password_repeat = st.text_input("Powtórz nowe hasło", type="password")
+        submitted = st.form_submit_button("Ustaw hasło")
+
+    if submitted:
+        errors = []
+        if not new_password:
+            errors.append("Hasło nie może być puste.")
+        if new_password != new_password_repeat:
+            errors.append("Hasła muszą być identyczne.")
+
+        if errors:
+            for err in errors:
+                st.error(err)
+        else:
+            try:
+                hashed_password = hash_password(new_password)
+            except HashingBusy:
+                st.error(BUSY_MESSAGE)
+                st.stop()
+
+            update_user(username, password=hashed_password, force_password_reset=False)
+            st.session_state["password_reset_done"] = "Hasło zostało ustawione. Możesz kontynuować pracę w aplikacji."
+            st.rerun()
+
+    st.stop()
+
+
+def login():
+    """Render the login page; returns ``(authenticator, name, username, role)``.
+
+    Stops the script run while nobody is logged in or the user still has to
+    set a password.
+    """
+    startup()
+    authenticator = _authenticator()
+    try:
+        with metrics.span("auth.login"):
+            authenticator.login(
+                location="main",
+                fields={
+                    "Form name": "Zaloguj się",
+                    "Username": "Login",
+                    "Password": "Hasło",
+                    "Login": "Zaloguj się"
+                }
+            )
+    except HashingBusy:
+        st.error(BUSY_MESSAGE)
+        st.stop()
+    st.session_state["login_cookie_checked"] = True
+
+    name = st.session_state.get("name", "")
+    username = st.session_state.get("username", "")
+    authentication_status = st.session_state.get("authentication_status")
+
+    st.subheader("Zaloguj się")
+
+    reset_msg = st.session_state.pop("password_reset_done", None)
+    if reset_msg:
+        st.success(reset_msg)
+
+    st.caption(
+        "Nowi pacjenci logują się po raz pierwszy, pozostawiając pole hasła puste. "
+        "Po zalogowaniu zostaną poproszeni o ustawienie własnego hasła."
+    )
+
+    if authentication_status is False:
+        st.error("Błędny login lub hasło.")
+        st.info("Jeśli nie masz konta, skontaktuj się z administratorem aplikacji.")
+        st.stop()
+    elif authentication_status is None:
+        st.info("Wprowadź dane logowania.")
+        st.info("Jeśli nie masz konta, skontaktuj się z administratorem aplikacji.")
+        st.stop()
+
+    user_record = get_user(username)
+    if user_record.get("force_password_reset"):
+        _force_password_reset(username)
+
+    return authenticator, name, username, user_record.get("role", "user")
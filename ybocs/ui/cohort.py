@@ -0,0 +1,60 @@
+"""Admin dashboard over all patients; the figures come from ``ybocs.cohort``."""
+import streamlit as st
+
+from .. import cohort
+
+
+def _pct(value) -> str:
+    return "–" if value is None else f"{value:.0f}%"
+
+
+def render():
+    figures = cohort.figures()
+    summary = figures["response"]
+    if not summary["courses"]:
+        st.info("Brak wyników.")
+        return
+
+    st.caption(
+        "Przebieg to wyniki jednego pacjenta dla jednego objawu. Odpowiedź na leczenie i remisję "
+        f"liczymy dla przebiegów z co najmniej dwiema ocenami: odpowiedź – spadek o ≥{cohort.RESPONSE_PCT}% "
+        f"(częściowa ≥{cohort.PARTIAL_RESPONSE_PCT}%) względem pierwszej oceny, remisja – ostatni wynik "
+        f"≤{cohort.REMISSION_MAX}."
+    )
+    cols = st.columns(5)
+    cols[0].metric("Pacjenci", summary["patients"])
+    cols[1].metric("Przebiegi (z kontrolą)", f"{summary['courses']} ({summary['followed']})")
+    cols[2].metric(f"Odpowiedź ≥{cohort.RESPONSE_PCT}%", summary["response"], _pct(summary["response_rate"]),
+                   delta_color="off")
+    cols[3].metric(f"Odpowiedź ≥{cohort.PARTIAL_RESPONSE_PCT}%", summary["partial_response"],
+                   _pct(summary["partial_response_rate"]), delta_color="off")
+    cols[4].metric("Remisja", summary["remission"], _pct(summary["remission_rate"]), delta_color="off")
+
+    st.subheader("Nasilenie – ostatni wynik")
+    st.bar_chart(figures["bands"].rename("Przebiegi"), horizontal=True)
+
+    st.subheader("Grupy objawów")
+    groups = figures["groups"].rename(columns={
+        "patients": "Pacjenci",
+        "courses": "Przebiegi",
+        "mean_baseline": "Śr. wynik wyjściowy",
+        "mean_last": "Śr. ostatni wynik",
+        "mean_reduction_pct": "Śr. spadek [%]",
+        "followed": "Z kontrolą",
+        "response": f"Odpowiedź ≥{cohort.RESPONSE_PCT}%",
+        "remission": "Remisja",
+        "response_rate": "Odsetek odpowiedzi [%]",
+    })
+    st.dataframe(groups, width="stretch", column_config={
+        "Śr. wynik wyjściowy": st.column_config.NumberColumn(format="%.1f"),
+        "Śr. ostatni wynik": st.column_config.NumberColumn(format="%.1f"),
+        "Śr. spadek [%]": st.column_config.NumberColumn(format="%.0f"),
+        "Odsetek odpowiedzi [%]": st.column_config.NumberColumn(format="%.0f"),
+    })
+
+    st.subheader("Podskale w czasie (średnia miesięczna)")
+    over_time = figures["over_time"]
+    st.line_chart(over_time[["obsessions", "compulsions"]].rename(columns={
+        "obsessions": "Obsesje (1–5)",
+        "compulsions": "Kompulsje (6–10)",
+    }))
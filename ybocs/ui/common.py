@@ -0,0 +1,13 @@
+"""Helpers shared by all views."""
+import hashlib
+
+APP_TITLE = "Ocena nasilenia OCD – Y‑BOCS (PL)"
+BUSY_MESSAGE = "Serwer jest chwilowo przeciążony. Spróbuj ponownie za chwilę."
+# Columns the results tables can be sorted by, with their labels.
+RESULT_SORT_COLUMNS = {"date": "Data", "timestamp": "Czas zapisu", "objaw": "Objaw", "suma": "Suma"}
+
+
+def widget_key_for(username: str, raw_key: str) -> str:
+    """Generate a stable, unique widget key for Streamlit elements."""
+    digest = hashlib.sha1(f"{username}:{raw_key}".encode("utf-8")).hexdigest()
+    return f"widget_{digest}"
@@ -0,0 +1,75 @@
+"""Admin diagnostics: where reruns spend their time (see ``ybocs.metrics``).
+
+``traced()`` wraps the whole script run in ``app.py`` and keeps the phases
+of the session's last run in the session state, so the panel can show them
+on the next one. With metrics off neither does anything.
+"""
+import contextlib
+
+import streamlit as st
+
+from .. import metrics
+
+_TRACE_KEY = "_last_rerun_trace"
+
+
+@contextlib.contextmanager
+def traced():
+    with metrics.rerun() as trace:
+        try:
+            yield
+        finally:
+            if metrics.ENABLED:
+                # The same list; "rerun" itself is appended once the run ends.
+                st.session_state[_TRACE_KEY] = trace
+
+
+def render():
+    if not metrics.ENABLED:
+        st.info(
+            "Pomiary są wyłączone. Uruchom aplikację z YBOCS_METRICS=1 (opcjonalnie "
+            "YBOCS_METRICS_PORT – endpoint /metrics dla Prometheusa, YBOCS_METRICS_LOG_SECONDS – "
+            "okresowy zapis do logu)."
+        )
+        return
+    import pandas as pd
+
+    snap = metrics.snapshot()
+
+    st.subheader("Poprzednie przeładowanie tej sesji")
+    trace = st.session_state.get(_TRACE_KEY)
+    if trace:
+        st.dataframe(
+            pd.DataFrame([(name, 1000 * s) for name, s in trace], columns=["Etap", "Czas [ms]"]),
+            hide_index=True,
+            column_config={"Czas [ms]": st.column_config.NumberColumn(format="%.2f")},
+        )
+    else:
+        st.caption("Brak danych – pojawią się po następnym przeładowaniu.")
+
+    st.subheader("Czasy etapów (wszystkie sesje)")
+    spans = pd.DataFrame.from_dict(snap["spans"], orient="index")
+    if not spans.empty:
+        st.dataframe(
+            spans.rename(columns={
+                "count": "Liczba", "mean_ms": "Średnio [ms]", "p50_ms": "p50 [ms]",
+                "p99_ms": "p99 [ms]", "max_ms": "Maks. [ms]",
+            }),
+            width="stretch",
+        )
+
+    cols = st.columns(2)
+    with cols[0]:
+        st.subheader("Liczniki")
+        st.json(snap["counters"])
+    with cols[1]:
+        st.subheader("Stan pamięci podręcznych i kolejek")
+        st.json(snap["gauges"])
+
+    st.download_button(
+        "Pobierz (format Prometheus)",
+        data=metrics.prometheus_text,
+        file_name="metrics.txt",
+        mime="text/plain",
+        on_click="ignore",
+    )
@@ -0,0 +1,61 @@
+"""Paged tables: only the rows of the current page are sent to the browser.
+
+``st.dataframe`` serializes everything it is given, so long histories and
+account lists are sorted and sliced here, on the server, and the browser
+gets one page at a time.
+"""
+import math
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+from .. import metrics
+
+PAGE_SIZES = (25, 50, 100, 250)
+
+
+def page_bounds(total: int, key: str) -> tuple:
+    """Render the page size and page number controls; ``(start, stop)`` of the page."""
+    cols = st.columns([1, 1, 2])
+    size = cols[0].selectbox("Wierszy na stronie", PAGE_SIZES, key=f"{key}_size")
+    pages = max(1, math.ceil(total / size))
+    page_key = f"{key}_page"
+    # A shorter list after a filter change must not leave the page out of range.
+    if st.session_state.get(page_key, 1) > pages:
+        st.session_state[page_key] = pages
+    page = cols[1].number_input("Strona", min_value=1, max_value=pages, step=1, key=page_key)
+    start = (page - 1) * size
+    stop = min(total, start + size)
+    cols[2].caption(f"Wiersze {start + 1}–{stop} z {total}" if total else "Brak wierszy")
+    return start, stop
+
+
+def _order(column: pd.Series, descending: bool):
+    """Row positions in sorted order; None if the rows already are."""
+    if isinstance(column.dtype, pd.CategoricalDtype):
+        # Categories are in order of appearance, not alphabetical.
+        column = column.astype(str)
+    elif column.is_monotonic_increasing:
+        return np.arange(len(column))[::-1] if descending else None
+    order = np.argsort(column.to_numpy(), kind="stable")
+    return order[::-1] if descending else order
+
+
+def paged_dataframe(df: pd.DataFrame, key: str, sort_columns: dict, **kwargs):
+    """Show ``df`` one page at a time, sorted by a column picked from
+    ``sort_columns`` (``{column: label}``); ``kwargs`` go to ``st.dataframe``.
+
+    Frames already in the picked order (the results come sorted by date)
+    are only sliced.
+    """
+    cols = st.columns([2, 1])
+    column = cols[0].selectbox(
+        "Sortuj według", list(sort_columns), format_func=sort_columns.get, key=f"{key}_sort"
+    )
+    descending = cols[1].toggle("Malejąco", key=f"{key}_desc")
+    start, stop = page_bounds(len(df), key)
+    positions = _order(df[column], descending)
+    page = df.iloc[start:stop] if positions is None else df.iloc[positions[start:stop]]
+    with metrics.span("ui.dataframe"):
+        st.dataframe(page, **kwargs)
@@ -0,0 +1,116 @@
+"""Patient views: the Y-BOCS questionnaire and the patient's own results."""
+from datetime import date, datetime
+
+import streamlit as st
+
+from ..charts import trend_png
+from ..domain import YBOCS_ITEMS, symptom_label
+from ..query import results_query
+from ..schema import empty_results
+from ..storage import append_result
+from ..user_symptoms import load_user_symptoms
+from .common import RESULT_SORT_COLUMNS, widget_key_for
+from .paging import paged_dataframe
+from .state import keep_keys, register_keys
+from .trends import chart_frame, cold_toggle, render_rollups
+
+
+def render(username: str, role: str):
+    tabs = st.tabs(["Ocena nasilenia", "Wyniki"])
+    severity_tab, results_tab = tabs
+
+    with severity_tab:
+        st.header("Ocena nasilenia (Y‑BOCS)")
+        st.caption("Wybierz objaw przypisany przez terapeutę i oceń nasilenie z ostatniego tygodnia.")
+        user_list = load_user_symptoms(username)
+
+        if not user_list:
+            st.info("Brak przypisanych objawów. Skontaktuj się z terapeutą lub administratorem.")
+        else:
+            # Answers for other symptoms stay while one is being filled in.
+            keep_keys("severity", username)
+            options = {symptom_label(o): o for o in user_list}
+            sel_label = st.selectbox(
+                "Objaw",
+                ["— wybierz —"] + list(options.keys()),
+                key=widget_key_for(username, "severity_symptom_select"),
+            )
+            if sel_label != "— wybierz —":
+                selected_raw = options[sel_label]
+                st.subheader("Kwestionariusz – ostatni tydzień")
+                q_vals = {}
+                radio_keys = [
+                    widget_key_for(username, f"severity:{selected_raw}:q{idx}")
+                    for idx in range(1, len(YBOCS_ITEMS) + 1)
+                ]
+                # Owned by the patient, not the symptom: switching symptoms
+                # mid-questionnaire keeps the answers already given.
+                register_keys("severity", username, radio_keys)
+                for idx, (q, choices) in enumerate(YBOCS_ITEMS, start=1):
+                    radio_key = radio_keys[idx - 1]
+                    val = st.radio(
+                        f"{idx}. {q}",
+                        options=list(range(5)),
+                        format_func=lambda i, ch=choices: f"{i} – {ch[i]}",
+                        horizontal=True,
+                        key=radio_key
+                    )
+                    q_vals[f"q{idx}"] = int(val)
+
+                suma = sum(q_vals.values())
+                st.markdown(f"**Suma punktów: {suma} / 40**")
+
+                if st.button("Zapisz wynik", type="primary"):
+                    row = {
+                        "timestamp": datetime.now().isoformat(timespec="seconds"),
+                        "date": date.today().isoformat(),
+                        "user": username,
+                        "role": role,
+                        "objaw": selected_raw,
+                        **{k: v for k, v in q_vals.items()},
+                        "suma": suma
+                    }
+                    append_result(row)
+                    st.success("Wynik zapisany.")
+
+    with results_tab:
+        st.header("Wyniki")
+        show_cold = cold_toggle(username, widget_key_for(username, "results_cold"))
+        query = results_query(username, cold=show_cold)
+        if query.empty:
+            # All results may be in the cold tier: still show their trend.
+            chart = chart_frame(empty_results(), username)
+            if chart.empty:
+                st.info("Brak wyników.")
+            else:
+                render_rollups(username)
+                st.image(trend_png(chart, "Nasilenie w czasie"))
+        else:
+            render_rollups(username)
+            controls = st.columns(2)
+
+            with controls[0]:
+                filter_mode = st.radio("Zakres", ["Zakres dat", "Wybrany dzień"], horizontal=False)
+                if filter_mode == "Zakres dat":
+                    start = st.date_input("Od", value=query.min_date)
+                    end = st.date_input("Do", value=query.max_date)
+                else:
+                    single_day = st.date_input("Dzień", value=query.max_date)
+                    start = end = single_day
+
+            with controls[1]:
+                my_symptoms = query.symptoms_for(username)
+                sym_opt = st.selectbox(
+                    "Objaw",
+                    ["(wszystkie)"] + my_symptoms,
+                    key=widget_key_for(username, "results_symptom_select"),
+                )
+
+            objaw = None if sym_opt == "(wszystkie)" else sym_opt
+            view = query.rows(username, objaw=objaw, start=start, end=end)
+
+            paged_dataframe(view, widget_key_for(username, "results_table"), RESULT_SORT_COLUMNS, width="stretch")
+
+            chart = view if show_cold else chart_frame(view, username, objaw, start, end)
+            if not chart.empty:
+                st.image(trend_png(chart, "Nasilenie w czasie"))
@@ -0,0 +1,84 @@
+"""Registry of per-patient widget keys in ``st.session_state``.
+
+Views that create widgets per patient (or per symptom) register their keys
+under a ``(view, owner)`` scope. Only the ``MAX_OWNERS_PER_VIEW`` most
+recently shown owners of a view keep their keys; the keys of older ones are
+deleted from the session state, so an admin clicking through hundreds of
+patients does not accumulate hundreds of checkbox sets.
+
+``state_stats()`` reports what the session state holds, for the debug
+readout in the sidebar (``YBOCS_DEBUG=1``).
+"""
+import os
+import pickle
+import sys
+from collections import OrderedDict
+
+import streamlit as st
+
+# One patient per view is on screen at a time.
+MAX_OWNERS_PER_VIEW = 1
+DEBUG = os.environ.get("YBOCS_DEBUG", "") not in ("", "0")
+
+_REGISTRY_KEY = "_widget_scopes"
+
+
+def _registry() -> dict:
+    registry = st.session_state.get(_REGISTRY_KEY)
+    if registry is None:
+        registry = st.session_state[_REGISTRY_KEY] = {}
+    return registry
+
+
+def register_keys(view: str, owner: str, keys):
+    """Record ``keys`` as belonging to ``owner`` in ``view``; evict older owners."""
+    owners = _registry().setdefault(view, OrderedDict())
+    owned = owners.get(owner)
+    if owned is None:
+        owned = owners[owner] = set()
+    owners.move_to_end(owner)
+    if not owned.issuperset(keys):
+        owned.update(keys)
+    while len(owners) > MAX_OWNERS_PER_VIEW:
+        _, stale = owners.popitem(last=False)
+        for key in stale:
+            if key in st.session_state:
+                del st.session_state[key]
+
+
+def keep_keys(view: str, owner: str):
+    """Keep the values of ``owner``'s keys while their widgets are not shown.
+
+    Streamlit drops the state of a widget that a run does not render; a
+    value set through the session state API survives. Call before the
+    view's widgets are created.
+    """
+    for key in _registry().get(view, {}).get(owner, ()):
+        if key in st.session_state:
+            st.session_state[key] = st.session_state[key]
+
+
+def state_stats() -> dict:
+    """Number of keys and approximate size of the session state."""
+    size = 0
+    for key in st.session_state:
+        value = st.session_state[key]
+        try:
+            size += len(pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL))
+        except Exception:
+            size += sys.getsizeof(value)
+    registry = st.session_state.get(_REGISTRY_KEY, {})
+    return {
+        "keys": len(st.session_state),
+        "approx_bytes": size,
+        "registered": {
+            view: {owner: len(keys) for owner, keys in owners.items()}
+            for view, owners in registry.items()
+        },
+    }
+
+
+def render_debug():
+    if DEBUG:
+        with st.sidebar.expander("Stan sesji (debug)"):
+            st.json(state_stats())
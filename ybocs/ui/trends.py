@@ -0,0 +1,69 @@
+"""Summary of a patient's trends per symptom, read from ``rollups``."""
+import pandas as pd
+import streamlit as st
+
+from ..archive import cold_rows, filter_dates
+from ..domain import symptom_label
+from ..rollups import cold_summary, user_rollups
+
+
+def rollup_frame(username: str) -> pd.DataFrame:
+    return pd.DataFrame(
+        [
+            {
+                "Objaw": symptom_label(r.objaw),
+                "Liczba ocen": r.count,
+                "Wynik wyjściowy": r.baseline,
+                "Ostatni wynik": r.last,
+                "Ostatnia ocena": r.last_date,
+                "Zmiana od początku [%]": r.change_pct,
+                "Średnia 4 tyg.": r.mean_4w,
+                "Trend [pkt/tydz.]": r.slope_per_week,
+                "Obsesje (1–5)": r.obsessions,
+                "Kompulsje (6–10)": r.compulsions,
+            }
+            for r in user_rollups(username)
+        ]
+    )
+
+
+def render_rollups(username: str):
+    """Table of the latest scores and trends of every symptom of ``username``."""
+    frame = rollup_frame(username)
+    if frame.empty:
+        return
+    st.subheader("Podsumowanie")
+    st.dataframe(
+        frame,
+        hide_index=True,
+        width="stretch",
+        column_config={
+            "Zmiana od początku [%]": st.column_config.NumberColumn(format="%+.0f%%"),
+            "Średnia 4 tyg.": st.column_config.NumberColumn(format="%.1f"),
+            "Trend [pkt/tydz.]": st.column_config.NumberColumn(format="%+.2f"),
+        },
+    )
+
+
+def cold_toggle(username: str, key: str) -> bool:
+    """Switch for the patient's cold-tier results (see ``retention``);
+    shown only when there are some. True when they should be loaded."""
+    count = cold_rows(username)
+    if not count:
+        return False
+    show = st.toggle(f"Pokaż wyniki z archiwum ({count})", key=key)
+    if not show:
+        st.caption("Starsze wyniki są w archiwum; na wykresie widać ich średnie miesięczne.")
+    return show
+
+
+def chart_frame(view: pd.DataFrame, username: str, objaw=None, start=None, end=None) -> pd.DataFrame:
+    """``view`` plus the monthly means of the cold tier, for ``trend_png``
+    when the cold results are not loaded."""
+    summary = cold_summary(username)
+    if objaw is not None:
+        summary = summary[summary["objaw"] == objaw]
+    summary = summary[filter_dates(summary, start, end)]
+    if summary.empty:
+        return view
+    return pd.concat([summary[["date", "suma"]], view[["date", "suma"]]], ignore_index=True)
@@ -0,0 +1,89 @@
+"""Symptom lists of all patients in one store (``data/objawy.json``).
+
+The lists are kept in a process-wide ``journal.JournaledMap``: a save
+appends ``{"user": ..., "symptoms": [...]}`` to ``data/objawy.json.journal``
+and every process reads only the new lines, so neither a rerun nor an
+overview of all patients opens one file per patient.
+
+The per-patient ``data/users/<username>/objawy.json`` files of older
+versions are folded into the store once, on first use, and then ignored.
+"""
+import json
+
+from . import metrics, writer
+from .config import SYMPTOMS_FILE, USER_STORE
+from .journal import JournaledMap
+
+COMPACT_AFTER = 500
+
+
+class _Symptoms(JournaledMap):
+    def __init__(self):
+        super().__init__(SYMPTOMS_FILE, COMPACT_AFTER)
+
+    def load_base(self) -> dict:
+        try:
+            data = json.loads(self.base_file.read_text(encoding="utf-8"))
+        except FileNotFoundError:
+            return {}
+        return data["users"]
+
+    def dump_base(self) -> bytes:
+        data = {"version": 1, "users": self.records}
+        return json.dumps(data, ensure_ascii=False, indent=1).encode("utf-8")
+
+    def apply(self, entry: dict):
+        self.records[entry["user"]] = entry["symptoms"]
+
+
+_store = _Symptoms()
+_initialized = False
+
+
+def _migrate():
+    if SYMPTOMS_FILE.exists():
+        return
+    users = {}
+    for fp in sorted(USER_STORE.glob("*/objawy.json")):
+        try:
+            users[fp.parent.name] = json.loads(fp.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            continue
+    data = {"version": 1, "users": users}
+    writer.atomic_write(SYMPTOMS_FILE, json.dumps(data, ensure_ascii=False, indent=1).encode("utf-8"))
+
+
+def _ensure_store():
+    global _initialized
+    if not _initialized:
+        writer.run_serialized(_migrate, lock=_store.journal_file)
+        _initialized = True
+    _store.refresh()
+
+
+def load_user_symptoms(username: str) -> list:
+    _ensure_store()
+    return list(_store.records.get(username, ()))
+
+
+def load_symptom_sets(usernames=None) -> dict:
+    """``{username: symptoms}`` for ``usernames`` (all patients if None)."""
+    _ensure_store()
+    with _store.lock:
+        if usernames is None:
+            return {u: list(s) for u, s in _store.records.items()}
+        return {u: list(_store.records.get(u, ())) for u in usernames}
+
+
+@metrics.timed("symptoms.save")
+def save_user_symptoms(username: str, symptoms: list):
+    save_symptom_sets({username: symptoms})
+
+
+def save_symptom_sets(sets: dict):
+    """Replace the lists of several patients (``{username: symptoms}``) with one write."""
+    if not sets:
+        return
+    _ensure_store()
+    entries = [{"user": u, "symptoms": list(s)} for u, s in sets.items()]
+    writer.run_serialized(lambda: _store.append_many(entries), lock=_store.journal_file)
@@ -0,0 +1,128 @@
+"""Change notification for files shared between app replicas.
+
+Each watched file has a generation counter that is bumped whenever the file
+changes — by this process (the writer calls ``touch``) or by another replica
+(reported by ``watchdog``, i.e. inotify on Linux, or by a polling thread when
+``watchdog`` is not installed or ``YBOCS_WATCH=poll``; polling stats every
+file each ``YBOCS_WATCH_INTERVAL``, 1 s by default, so other replicas'
+changes show up that much later). Caches remember the generation they were
+filled at; while it is unchanged they can answer without touching the disk
+at all.
+"""
+import logging
+import os
+import threading
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+
+POLL_INTERVAL = float(os.environ.get("YBOCS_WATCH_INTERVAL", "1.0"))
+_CHANGE_EVENTS = {"created", "modified", "moved", "deleted", "closed"}
+
+_lock = threading.Lock()
+_generations = {}
+_watcher = None
+
+
+def _key(path) -> str:
+    return os.path.abspath(path)
+
+
+def _bump(key: str):
+    with _lock:
+        if key in _generations:
+            _generations[key] += 1
+
+
+def touch(path):
+    """Record a change to ``path`` made by this process."""
+    _bump(_key(path))
+
+
+def generation(path) -> int:
+    """Current generation of ``path``; starts watching it on first use."""
+    key = _key(path)
+    with _lock:
+        gen = _generations.get(key)
+        if gen is not None:
+            return gen
+        _generations[key] = 0
+    _ensure_watcher().add(key)
+    return 0
+
+
+class _PollingWatcher:
+    def __init__(self):
+        self._stats = {}
+        self._thread = threading.Thread(target=self._run, name="ybocs-watch", daemon=True)
+        self._thread.start()
+
+    @staticmethod
+    def _identity(key):
+        try:
+            st = os.stat(key)
+        except FileNotFoundError:
+            return None
+        return st.st_ino, st.st_size, st.st_mtime_ns
+
+    def add(self, key: str):
+        with _lock:
+            self._stats[key] = self._identity(key)
+
+    def _run(self):
+        stop = threading.Event()
+        while not stop.wait(POLL_INTERVAL):
+            with _lock:
+                keys = list(self._stats)
+            for key in keys:
+                ident = self._identity(key)
+                if ident != self._stats[key]:
+                    self._stats[key] = ident
+                    _bump(key)
+
+
+class _WatchdogWatcher:
+    def __init__(self):
+        from watchdog.events import FileSystemEventHandler
+        from watchdog.observers import Observer
+
+        class Handler(FileSystemEventHandler):
+            def on_any_event(self, event):
+                # inotify also reports plain opens and reads; those would
+                # invalidate a cache every time it reads its own file.
+                if event.event_type not in _CHANGE_EVENTS:
+                    return
+                for p in (event.src_path, getattr(event, "dest_path", "")):
+                    if p:
+                        _bump(_key(os.fsdecode(p)))
+
+        self._handler = Handler()
+        self._observer = Observer()
+        self._observer.daemon = True
+        self._dirs = set()
+        self._observer.start()
+
+    def add(self, key: str):
+        directory = str(Path(key).parent)
+        with _lock:
+            if directory in self._dirs:
+                return
+            self._dirs.add(directory)
+        os.makedirs(directory, exist_ok=True)
+        self._observer.schedule(self._handler, directory, recursive=False)
+
+
+def _ensure_watcher():
+    global _watcher
+    if _watcher is not None:
+        return _watcher
+    with _lock:
+        if _watcher is None:
+            watcher = None
+            if os.environ.get("YBOCS_WATCH", "auto") != "poll":
+                try:
+                    watcher = _WatchdogWatcher()
+                except Exception:  # not installed, or no inotify slots left
+                    logger.info("watchdog unavailable, polling for file changes")
+            _watcher = watcher or _PollingWatcher()
+    return _watcher
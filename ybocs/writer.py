@@ -0,0 +1,199 @@
+"""Single-writer commit queue for every file the app modifies.
+
+Streamlit runs each session on its own thread. All writes — result appends,
+symptom files, ``users.yaml``, compaction — are handed to one writer thread
+instead of being done in place, so they can never interleave:
+
+* appends to the same file that are waiting together are written with one
+  ``write`` and made durable with a single ``fsync`` (group commit);
+* whole-file writes go to a temporary file that is fsynced and renamed over
+  the target, so readers see either the old or the new contents;
+* read-modify-write updates run as a function on the writer thread, so two
+  sessions editing the same file cannot overwrite each other's changes.
+
+Callers block on a future until their data is durable. Each write also
+holds the cross-process lock of its file (see ``locking``) and bumps the
+file's generation (see ``watch``) so caches in this process notice at once.
+"""
+import os
+import queue
+import threading
+from concurrent.futures import Future
+
+from . import metrics, watch
+from .locking import file_lock
+
+DEFAULT_TIMEOUT = 30.0
+MAX_BATCH = 512
+
+
+def _fsync_dir(path):
+    try:
+        fd = os.open(path.parent or ".", os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+def atomic_write(path, data: bytes):
+    """Replace ``path`` with ``data`` via fsynced temp file and rename."""
+    with file_lock(path):
+        tmp = path.with_name(path.name + ".tmp")
+        with open(tmp, "wb") as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, path)
+        _fsync_dir(path)
+    watch.touch(path)
+
+
+def _append(path, data: bytes):
+    with file_lock(path):
+        with open(path, "ab") as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+    watch.touch(path)
+
+
+def _call(fn, path):
+    if path is None:
+        return fn()
+    with file_lock(path):
+        result = fn()
+    watch.touch(path)
+    return result
+
+
+class _Op:
+    __slots__ = ("kind", "path", "data", "fn", "future")
+
+    def __init__(self, kind, path=None, data=None, fn=None):
+        self.kind = kind
+        self.path = path
+        self.data = data
+        self.fn = fn
+        self.future = Future()
+
+
+class CommitQueue:
+    def __init__(self, max_batch: int = MAX_BATCH):
+        self.max_batch = max_batch
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._thread = None
+        self._pid = None
+        self.batches = 0
+        self.ops = 0
+        self.fsyncs = 0
+
+    def _ensure_thread(self):
+        # A forked child inherits the queue object but not the thread.
+        if self._thread is not None and self._thread.is_alive() and self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid != os.getpid():
+                self._queue = queue.Queue()
+            if self._thread is None or not self._thread.is_alive() or self._pid != os.getpid():
+                self._thread = threading.Thread(target=self._run, name="ybocs-writer", daemon=True)
+                self._pid = os.getpid()
+                self._thread.start()
+
+    def in_writer(self) -> bool:
+        return threading.current_thread() is self._thread
+
+    def submit(self, op: _Op) -> Future:
+        self._ensure_thread()
+        self._queue.put(op)
+        return op.future
+
+    def depth(self) -> int:
+        return self._queue.qsize()
+
+    def _run(self):
+        while True:
+            batch = [self._queue.get()]
+            while len(batch) < self.max_batch:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            self._commit(batch)
+
+    def _commit(self, batch: list):
+        self.batches += 1
+        self.ops += len(batch)
+        i = 0
+        while i < len(batch):
+            op = batch[i]
+            j = i + 1
+            if op.kind != "call":
+                while j < len(batch) and batch[j].kind == op.kind and batch[j].path == op.path:
+                    j += 1
+            group = batch[i:j]
+            result = None
+            try:
+                if op.kind == "append":
+                    _append(op.path, b"".join(o.data for o in group))
+                    self.fsyncs += 1
+                elif op.kind == "replace":
+                    # Only the newest contents matter; older ones are superseded.
+                    atomic_write(op.path, group[-1].data)
+                    self.fsyncs += 1
+                else:
+                    result = _call(op.fn, op.path)
+            except BaseException as exc:
+                for o in group:
+                    o.future.set_exception(exc)
+            else:
+                for o in group:
+                    o.future.set_result(result)
+            i = j
+
+
+_queue = CommitQueue()
+
+
+def append_bytes(path, data: bytes, timeout: float = DEFAULT_TIMEOUT):
+    """Append ``data`` to ``path``; returns once it is fsynced."""
+    if _queue.in_writer():
+        _append(path, data)
+        return
+    _queue.submit(_Op("append", path=path, data=data)).result(timeout)
+
+
+def replace_file(path, data: bytes, timeout: float = DEFAULT_TIMEOUT):
+    """Atomically replace ``path``; returns once the new file is durable."""
+    if _queue.in_writer():
+        atomic_write(path, data)
+        return
+    _queue.submit(_Op("replace", path=path, data=data)).result(timeout)
+
+
+def run_serialized(fn, lock=None, timeout: float = DEFAULT_TIMEOUT):
+    """Run ``fn`` on the writer thread, after all writes queued before it.
+
+    ``lock`` names the file ``fn`` reads and rewrites; its cross-process lock
+    is held for the whole call.
+    """
+    if _queue.in_writer():
+        return _call(fn, lock)
+    return _queue.submit(_Op("call", path=lock, fn=fn)).result(timeout)
+
+
+def stats() -> dict:
+    return {
+        "queue_depth": _queue.depth(),
+        "batches": _queue.batches,
+        "ops": _queue.ops,
+        "fsyncs": _queue.fsyncs,
+    }
+
+
+metrics.register("writer", stats)